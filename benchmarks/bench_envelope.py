@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2014, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+"""
+Compare the memory held by parsed ENVELOPE responses using the slotted
+Envelope and Address classes with the previous __dict__ based
+dataclasses, which also didn't share repeated mailbox/host values.
+
+Usage: PYTHONPATH=. python benchmarks/bench_envelope.py [number-of-messages]
+"""
+
+import dataclasses
+import datetime
+import sys
+import tracemalloc
+from typing import Optional, Tuple
+
+from imapclient.response_parser import parse_fetch_response
+
+
+@dataclasses.dataclass
+class LegacyEnvelope:
+    date: Optional[datetime.datetime]
+    subject: bytes
+    from_: Optional[Tuple["LegacyAddress", ...]]
+    sender: Optional[Tuple["LegacyAddress", ...]]
+    reply_to: Optional[Tuple["LegacyAddress", ...]]
+    to: Optional[Tuple["LegacyAddress", ...]]
+    cc: Optional[Tuple["LegacyAddress", ...]]
+    bcc: Optional[Tuple["LegacyAddress", ...]]
+    in_reply_to: bytes
+    message_id: bytes
+
+
+@dataclasses.dataclass
+class LegacyAddress:
+    name: bytes
+    route: bytes
+    mailbox: bytes
+    host: bytes
+
+
+def to_legacy(envelope):
+    """Rebuild an Envelope as the old classes, with unshared bytes."""
+
+    def addrs(addr_list):
+        if addr_list is None:
+            return None
+        return tuple(
+            LegacyAddress(
+                a.name,
+                a.route,
+                a.mailbox and bytes(bytearray(a.mailbox)),
+                a.host and bytes(bytearray(a.host)),
+            )
+            for a in addr_list
+        )
+
+    return LegacyEnvelope(
+        envelope.date,
+        envelope.subject,
+        addrs(envelope.from_),
+        addrs(envelope.sender),
+        addrs(envelope.reply_to),
+        addrs(envelope.to),
+        addrs(envelope.cc),
+        addrs(envelope.bcc),
+        envelope.in_reply_to,
+        envelope.message_id,
+    )
+
+
+def make_response(count):
+    lines = []
+    for i in range(1, count + 1):
+        sender = b'("Sender %d" NIL "user%d" "example.com")' % (i % 50, i % 50)
+        lines.append(
+            b'%d (UID %d ENVELOPE ("Sun, 24 Mar 2013 22:06:10 +0200" '
+            b'"Subject %d" (%s) (%s) (%s) '
+            b'(("Me" NIL "me" "example.org")) NIL NIL NIL "<%d@example.com>"))'
+            % (i, i, i, sender, sender, sender, i)
+        )
+    return lines
+
+
+def measure(label, build):
+    tracemalloc.start()
+    held = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print("%-8s %8.1f MB" % (label, size / 1e6))
+    del held
+    return size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    response = make_response(count)
+
+    def parse(convert):
+        parsed = parse_fetch_response(response)
+        return [convert(msg[b"ENVELOPE"]) for msg in parsed.values()]
+
+    print("Memory held by %d parsed envelopes" % count)
+    legacy = measure("legacy", lambda: parse(to_legacy))
+    current = measure("current", lambda: parse(lambda e: e))
+    print("reduction: %.1fx" % (legacy / current))
+
+
+if __name__ == "__main__":
+    main()
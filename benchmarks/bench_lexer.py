@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2014, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+"""
+Compare the throughput (tokens/second) of the regex based response
+lexer with the previous byte-at-a-time implementation, using large
+synthetic FETCH responses.
+
+Usage: PYTHONPATH=. python benchmarks/bench_lexer.py [number-of-messages]
+"""
+
+import sys
+import time
+
+from imapclient.response_lexer import (
+    BACKSLASH,
+    CLOSE_SQUARE,
+    DOUBLE_QUOTE,
+    NON_SPECIALS,
+    OPEN_SQUARE,
+    TokenSource,
+    WHITESPACE,
+)
+from imapclient.util import assert_imap_protocol
+
+HEADER = (
+    b"From: Some One <some.one@example.com>\r\n"
+    b"To: Another Person <another@example.org>\r\n"
+    b"Subject: Re: quarterly figures\r\n"
+    b"Date: Mon, 3 Apr 2023 10:11:12 +0000\r\n"
+    b"Message-ID: <abc123@example.com>\r\n\r\n"
+)
+
+
+def make_fetch_response(count):
+    """Build an imaplib style FETCH response for *count* messages."""
+    out = []
+    for i in range(1, count + 1):
+        out.append(
+            (
+                b"%d (UID %d FLAGS (\\Seen \\Answered $Label1) "
+                b'INTERNALDATE "03-Apr-2023 10:11:12 +0000" RFC822.SIZE %d '
+                b'ENVELOPE ("Mon, 3 Apr 2023 10:11:12 +0000" "Re: quarterly figures" '
+                b'(("Some One" NIL "some.one" "example.com")) NIL NIL '
+                b'(("Another Person" NIL "another" "example.org")) NIL NIL NIL '
+                b'"<abc123@example.com>") BODY[HEADER.FIELDS (FROM TO SUBJECT)] {%d}'
+                % (i, 1000 + i, 4000 + i, len(HEADER)),
+                HEADER,
+            )
+        )
+        out.append(b")")
+    return out
+
+
+class LegacyLexer:
+    """The per-byte lexer that the regex based implementation replaced."""
+
+    def __init__(self, text):
+        self.text = text
+
+    def read_until(self, stream_i, end_char, escape=True):
+        token = bytearray()
+        try:
+            for nextchar in stream_i:
+                if escape and nextchar == BACKSLASH:
+                    escaper = nextchar
+                    nextchar = next(stream_i)
+                    if nextchar not in (escaper, end_char):
+                        token.append(escaper)
+                elif nextchar == end_char:
+                    break
+                token.append(nextchar)
+            else:
+                raise ValueError("No closing '%s'" % chr(end_char))
+        except StopIteration:
+            raise ValueError("No closing '%s'" % chr(end_char))
+        token.append(end_char)
+        return token
+
+    def read_token_stream(self, stream_i):
+        whitespace = WHITESPACE
+        wordchars = NON_SPECIALS
+        read_until = self.read_until
+
+        while True:
+            for nextchar in stream_i:
+                if nextchar not in whitespace:
+                    stream_i.push(nextchar)
+                    break
+
+            token = bytearray()
+            for nextchar in stream_i:
+                if nextchar in wordchars:
+                    token.append(nextchar)
+                elif nextchar == OPEN_SQUARE:
+                    token.append(nextchar)
+                    token.extend(read_until(stream_i, CLOSE_SQUARE, escape=False))
+                else:
+                    if nextchar in whitespace:
+                        yield token
+                    elif nextchar == DOUBLE_QUOTE:
+                        assert_imap_protocol(not token)
+                        token.append(nextchar)
+                        token.extend(read_until(stream_i, nextchar))
+                        yield token
+                    else:
+                        if token:
+                            yield token
+                        yield bytearray([nextchar])
+                    break
+            else:
+                if token:
+                    yield token
+                break
+
+    def __iter__(self):
+        for chunk in self.text:
+            line = chunk[0] if isinstance(chunk, tuple) else chunk
+            for tok in self.read_token_stream(PushableIterator(line)):
+                yield bytes(tok)
+
+
+class PushableIterator:
+    def __init__(self, it):
+        self.it = iter(it)
+        self.pushed = []
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.pushed:
+            return self.pushed.pop()
+        return next(self.it)
+
+    def push(self, item):
+        self.pushed.append(item)
+
+
+def run(name, make_lexer, data, repeat=3):
+    best = None
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = sum(1 for _ in make_lexer(data))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(
+        "%-8s %9d tokens in %7.3fs  %12.0f tokens/s" % (name, count, best, count / best)
+    )
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    data = make_fetch_response(count)
+    assert list(LegacyLexer(data)) == list(TokenSource(data))
+
+    print("Lexing FETCH response for %d messages" % count)
+    legacy = run("legacy", LegacyLexer, data)
+    current = run("current", TokenSource, data)
+    print("speedup: %.1fx" % (legacy / current))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2014, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+"""
+Compare the time taken to parse large SEARCH responses using
+parse_message_list with the previous implementation, which decoded
+the response to str and extracted the ids with a regex.
+
+Usage: PYTHONPATH=. python benchmarks/bench_message_list.py [number-of-ids]
+"""
+
+import re
+import sys
+import time
+
+from imapclient.response_parser import parse_message_list, parse_response
+from imapclient.response_types import SearchIds
+
+_legacy_msg_id_pattern = re.compile("(\\d+(?: +\\d+)*)")
+
+
+def legacy_parse_message_list(data):
+    """The str/regex based parse_message_list that was replaced."""
+    if len(data) != 1:
+        raise ValueError("unexpected message list data")
+    message_data = data[0]
+    if not message_data:
+        return SearchIds()
+    if isinstance(message_data, bytes):
+        message_data = message_data.decode("ascii")
+    m = _legacy_msg_id_pattern.match(message_data)
+    if not m:
+        raise ValueError("unexpected message list format")
+    ids = SearchIds(int(n) for n in m.group(1).split())
+    extra = message_data[m.end(1) :]
+    if extra:
+        for item in parse_response([extra.encode("ascii")]):
+            if (
+                isinstance(item, tuple)
+                and len(item) == 2
+                and item[0].lower() == b"modseq"
+            ):
+                ids.modseq = item[1]
+            elif isinstance(item, int):
+                ids.append(item)
+    return ids
+
+
+def run(name, func, data, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(data)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print("%-16s %8.3fs" % (name, best))
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    for label, suffix in [("plain", b""), ("with MODSEQ", b" (MODSEQ 917162500)")]:
+        data = [b" ".join(b"%d" % i for i in range(1, count + 1)) + suffix]
+        expected = legacy_parse_message_list(data)
+        assert parse_message_list(data) == expected
+        assert parse_message_list(data).modseq == expected.modseq
+
+        print("Parsing SEARCH response with %d ids (%s)" % (count, label))
+        legacy = run("legacy", legacy_parse_message_list, data)
+        current = run("current", parse_message_list, data)
+        run("current compact", lambda d: parse_message_list(d, compact=True), data)
+        print("speedup: %.1fx" % (legacy / current))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2014, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+"""
+Compare the time taken to read a large FETCH response using imaplib's
+own line reading with the buffered ResponseReader used by IMAPClient's
+connection classes. Both are configured the way IMAPClient configures
+them (debug level 5, logging to a disabled logger).
+
+Usage: PYTHONPATH=. python benchmarks/bench_reader.py [number-of-messages]
+"""
+
+import imaplib
+import re
+import socket
+import sys
+import threading
+import time
+from logging import getLogger
+
+from imapclient.imap4 import IMAP4WithTimeout
+
+
+class StockIMAP4(imaplib.IMAP4):
+    def read(self, size):
+        return self.file.read(size)
+
+    def readline(self):
+        return self.file.readline()
+
+
+def make_response(count):
+    lines = []
+    for i in range(1, count + 1):
+        header = b"Subject: message %d\r\nFrom: someone@example.com\r\n\r\n" % i
+        lines.append(
+            b"* %d FETCH (UID %d FLAGS (\\Seen) RFC822.SIZE 1234 "
+            b"BODY[HEADER] {%d}\r\n%s)\r\n" % (i, i, len(header), header)
+        )
+    lines.append(b"A1 OK done\r\n")
+    return b"".join(lines)
+
+
+def prepare(imap):
+    imap.debug = 5
+    imap._mesg = getLogger("bench.disabled").debug
+    imap._encoding = "ascii"
+    imap._mode_ascii()
+    imap.tagre = re.compile(rb"(?P<tag>A\d+) (?P<type>[A-Z]+) (?P<data>.*)", re.ASCII)
+    imap.tagged_commands = {b"A1": None}
+    imap.untagged_responses = {}
+    imap.memoryview_literals = False
+    return imap
+
+
+def measure(label, cls, response):
+    imap = prepare(cls.__new__(cls))
+    imap.sock, server = socket.socketpair()
+    imap.file = imap.sock.makefile("rb")
+    sender = threading.Thread(target=server.sendall, args=(response,))
+    sender.start()
+    start = time.perf_counter()
+    while imap.tagged_commands[b"A1"] is None:
+        imap._get_response()
+    elapsed = time.perf_counter() - start
+    sender.join()
+    server.close()
+    imap.sock.close()
+    print("%-8s %6.3fs" % (label, elapsed))
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    response = make_response(count)
+    print("Reading FETCH responses for %d messages" % count)
+    stock = measure("imaplib", StockIMAP4, response)
+    ours = measure("reader", IMAP4WithTimeout, response)
+    print("speedup: %.1fx" % (stock / ours))
+
+
+if __name__ == "__main__":
+    main()
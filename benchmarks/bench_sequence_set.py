@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2014, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+"""
+Compare the size and encoding time of message id sets joined with
+commas (the previous behaviour of join_message_ids) against the range
+compressed sequence-set encoding, for a few realistic UID layouts.
+
+Usage: PYTHONPATH=. python benchmarks/bench_sequence_set.py [number-of-ids]
+"""
+
+import random
+import sys
+import time
+
+from imapclient.sequence_set import decode, encode
+
+
+def contiguous_with_gaps(count, rng):
+    """A mailbox where roughly 2% of messages have been expunged."""
+    out = []
+    uid = 1
+    while len(out) < count:
+        if rng.random() >= 0.02:
+            out.append(uid)
+        uid += 1
+    return out
+
+
+def clustered(count, rng):
+    """Search results: short bursts of adjacent UIDs (threads, days)."""
+    out = []
+    uid = 1
+    while len(out) < count:
+        uid += rng.randint(1, 500)
+        run = rng.randint(1, 20)
+        out.extend(range(uid, uid + run))
+        uid += run
+    return out[:count]
+
+
+def random_sparse(count, rng):
+    """Worst case: ids scattered uniformly over a large mailbox."""
+    return sorted(rng.sample(range(1, count * 20), count))
+
+
+def comma_join(ids):
+    return b",".join(b"%d" % i for i in ids)
+
+
+def run(func, ids, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = func(ids)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return out, best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rng = random.Random(42)
+
+    print("Encoding %d message ids" % count)
+    print(
+        "%-22s %12s %12s %8s %10s %10s"
+        % ("layout", "joined", "ranges", "ratio", "join (s)", "ranges (s)")
+    )
+    for name, make in [
+        ("contiguous-with-gaps", contiguous_with_gaps),
+        ("clustered", clustered),
+        ("random-sparse", random_sparse),
+    ]:
+        ids = make(count, rng)
+        joined, join_time = run(comma_join, ids)
+        encoded, encode_time = run(encode, ids)
+        assert decode(encoded) == ids
+        print(
+            "%-22s %12d %12d %7.1fx %10.4f %10.4f"
+            % (
+                name,
+                len(joined),
+                len(encoded),
+                len(joined) / len(encoded),
+                join_time,
+                encode_time,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -5,8 +5,15 @@
 # version_info provides the version number in programmer friendly way.
 # The 4th part will be either alpha, beta or final.
 
+from .async_imapclient import *  # noqa: F401,F403
+from .fetch_cache import *  # noqa: F401,F403
 from .imapclient import *  # noqa: F401,F403
+from .local_index import *  # noqa: F401,F403
+from .parallel import *  # noqa: F401,F403
+from .pool import *  # noqa: F401,F403
 from .response_parser import *  # noqa: F401,F403
+from .search_cache import *  # noqa: F401,F403
+from .sync import *  # noqa: F401,F403
 from .tls import *  # noqa: F401,F403
 from .version import author as __author__  # noqa: F401
 from .version import version as __version__  # noqa: F401
@@ -0,0 +1,751 @@
+"""
+An asyncio based IMAP client.
+
+AsyncIMAPClient talks to the server over asyncio streams rather than
+through imaplib, so a single event loop can drive many connections.
+Responses are decoded with the same parser as IMAPClient.
+"""
+import asyncio
+import re
+import ssl as ssl_lib
+from logging import getLogger
+from typing import Any, AsyncIterator, cast, Dict, List, Optional, Tuple, Union
+from . import exceptions
+from .datetime_util import datetime_to_INTERNALDATE
+from .imap_utf7 import decode as decode_utf7
+from .imap_utf7 import encode as encode_utf7
+from .imapclient import _is8bit, _iter_with_last, _literal, _normalise_search_criteria, _quoted, as_pairs, join_message_ids, seq_to_parenstr, seq_to_parenstr_upper, SocketTimeout
+from .response_parser import parse_fetch_response, parse_message_list, parse_response
+from .util import chunk, to_bytes, to_unicode
+logger = getLogger(__name__)
+__all__ = ['AsyncIMAPClient']
+
+# Upper bound on the length of a single response line. SEARCH responses
+# for very large folders can run to many megabytes.
+_READ_LIMIT = 256 * 1024 * 1024
+# How long idle_check() waits for responses beyond the first before
+# deciding that no more have already arrived.
+_BUFFERED_WAIT = 0.01
+_LITERAL_RE = re.compile(b'\\{(\\d+)\\}$')
+_RESP_CODE_RE = re.compile(b'\\[(?P<key>[A-Z-]+)(?: (?P<data>[^\\]]*))?\\]')
+_Chunk = Union[bytes, Tuple[bytes, bytes]]
+
+
+class AsyncIMAPClient:
+    """An IMAP client for use with :py:mod:`asyncio`.
+
+    The arguments are as per :py:class:`IMAPClient <imapclient.IMAPClient>`
+    except that *stream* isn't supported. No connection is made until
+    :py:meth:`.connect` is awaited, or the client is used as an async
+    context manager::
+
+        async with AsyncIMAPClient(host="imap.foo.org") as client:
+            await client.login("bar@foo.org", "passwd")
+            await client.select_folder("INBOX")
+            messages = await client.search(["UNSEEN"])
+            response = await client.fetch(messages, ["ENVELOPE"])
+
+    The methods mirror those of IMAPClient, take the same arguments
+    and return the same values, but are coroutines. Responses are
+    decoded using the same parser as IMAPClient and the
+    *normalise_times* and *lazy_fetch_structures* attributes have the
+    same meaning.
+
+    Commands issued concurrently from different tasks are sent one at
+    a time, in the order they were issued.
+    """
+    Error = exceptions.IMAPClientError
+    AbortError = exceptions.IMAPClientAbortError
+    ReadOnlyError = exceptions.IMAPClientReadOnlyError
+
+    def __init__(self, host: str, port: Optional[int]=None, use_uid: bool=
+        True, ssl: bool=True, ssl_context: Optional[ssl_lib.SSLContext]=
+        None, timeout: Union[None, float, SocketTimeout]=None):
+        if port is None:
+            port = ssl and 993 or 143
+        self.host = host
+        self.port = port
+        self.ssl = ssl
+        self.ssl_context = ssl_context
+        self.use_uid = use_uid
+        self.folder_encode = True
+        self.normalise_times = True
+        self.lazy_fetch_structures = False
+        if not isinstance(timeout, SocketTimeout):
+            timeout = SocketTimeout(timeout, timeout)  # type: ignore[arg-type]
+        self._timeout = timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._tagnum = 0
+        self._welcome: Optional[bytes] = None
+        self._cached_capabilities: Optional[Tuple[bytes, ...]] = None
+        self._idle_tag: Optional[bytes] = None
+        self._idle_responses: List[List[_Chunk]] = []
+        self._peeked_line: Optional[bytes] = None
+
+    async def __aenter__(self) ->'AsyncIMAPClient':
+        if self._writer is None:
+            await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type: Any, exc_val: Any, exc_tb: Any
+        ) ->None:
+        """Logout and close the connection when exiting the context
+        manager, ignoring errors as for IMAPClient."""
+        try:
+            await self.logout()
+        except Exception:
+            try:
+                await self.shutdown()
+            except Exception as e:
+                logger.info('Could not close the connection cleanly: %s', e)
+
+    async def connect(self) ->None:
+        """Connect to the server and read its greeting."""
+        ssl_context = None
+        if self.ssl:
+            ssl_context = self.ssl_context or ssl_lib.create_default_context()
+        self._reader, self._writer = await asyncio.wait_for(self.
+            _open_connection(ssl_context), self._timeout.connect)
+        self._lock = asyncio.Lock()
+        greeting = await self._read_response()
+        line = _first_line(greeting)
+        if line.startswith(b'* BYE'):
+            raise self.AbortError('server refused connection: %s' %
+                to_unicode(line))
+        self._welcome = line
+        self._cached_capabilities = _capabilities_from_code(line)
+        logger.debug('Connected to host %s over %s', self.host, 'SSL/TLS' if
+            self.ssl else 'plain text')
+
+    async def _open_connection(self, ssl_context: Optional[ssl_lib.
+        SSLContext]) ->Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        return await asyncio.open_connection(self.host, self.port, ssl=
+            ssl_context, limit=_READ_LIMIT)
+
+    @property
+    def welcome(self) ->Optional[bytes]:
+        """access the server greeting message"""
+        return self._welcome
+
+    async def login(self, username: str, password: str) ->str:
+        """Login using *username* and *password*, returning the
+        server response.
+        """
+        try:
+            text, _ = await self._command(b'LOGIN', [_quote(to_bytes(
+                username)), _quote(to_bytes(password))], uid=False,
+                secret=True)
+        except self.Error as e:
+            raise exceptions.LoginError(str(e))
+        self._cached_capabilities = _capabilities_from_code(text)
+        return to_unicode(text)
+
+    async def logout(self) ->bytes:
+        """Logout, returning the server response."""
+        text, _ = await self._command(b'LOGOUT', uid=False)
+        await self.shutdown()
+        return text
+
+    async def shutdown(self) ->None:
+        """Close the connection to the IMAP server (without logging
+        out).
+        """
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (OSError, AttributeError):
+                pass
+            self._writer = None
+        logger.debug('Connection closed')
+
+    async def capabilities(self) ->Tuple[bytes, ...]:
+        """Returns the server capability list.
+
+        As for IMAPClient, the capabilities sent by the server with
+        its greeting or at login are used if available. Otherwise the
+        CAPABILITY command is issued and the result cached.
+        """
+        if self._cached_capabilities is None:
+            _, untagged = await self._command(b'CAPABILITY', uid=False)
+            caps = _untagged_data(untagged, b'CAPABILITY')
+            self._cached_capabilities = tuple(_first_line(caps).upper().
+                split()) if caps else ()
+        return self._cached_capabilities
+
+    async def has_capability(self, capability: Union[str, bytes]) ->bool:
+        """Return ``True`` if the IMAP server has the given *capability*."""
+        return to_bytes(capability).upper() in await self.capabilities()
+
+    async def _require_capability(self, capability: str) ->None:
+        if not await self.has_capability(capability):
+            raise exceptions.CapabilityError(
+                'Server does not support {} capability'.format(capability))
+
+    async def list_folders(self, directory: str='', pattern: str='*') ->List[
+        Tuple[Tuple[bytes, ...], bytes, str]]:
+        """Get a listing of folders on the server as a list of
+        ``(flags, delimiter, name)`` tuples, as per
+        :py:meth:`IMAPClient.list_folders <imapclient.IMAPClient.list_folders>`.
+        """
+        _, untagged = await self._command(b'LIST', [self._normalise_folder
+            (directory), self._normalise_folder(pattern)], uid=False)
+        return self._proc_folder_list(_untagged_data(untagged, b'LIST'))
+
+    async def select_folder(self, folder: str, readonly: bool=False) ->Dict[
+        bytes, Any]:
+        """Set the current folder on the server, returning a dictionary
+        containing the ``SELECT`` response as per
+        :py:meth:`IMAPClient.select_folder <imapclient.IMAPClient.select_folder>`.
+        """
+        command = b'EXAMINE' if readonly else b'SELECT'
+        text, untagged = await self._command(command, [self.
+            _normalise_folder(folder)], uid=False)
+        return _process_select_response(text, untagged)
+
+    async def close_folder(self) ->bytes:
+        """Close the currently selected folder, returning the server
+        response string.
+        """
+        text, _ = await self._command(b'CLOSE', uid=False)
+        return text
+
+    async def folder_status(self, folder: str, what: Optional[List[str]]=None
+        ) ->Dict[bytes, Any]:
+        """Return the status of *folder* as per
+        :py:meth:`IMAPClient.folder_status <imapclient.IMAPClient.folder_status>`.
+        """
+        if what is None:
+            what = ['MESSAGES', 'RECENT', 'UIDNEXT', 'UIDVALIDITY', 'UNSEEN']
+        what_ = seq_to_parenstr(what).encode('ascii')
+        _, untagged = await self._command(b'STATUS', [self.
+            _normalise_folder(folder), what_], uid=False)
+        response = parse_response(_lines(_untagged_data(untagged, b'STATUS')))
+        return dict(as_pairs(cast(Tuple[Any, ...], response[-1])))
+
+    async def create_folder(self, folder: str) ->bytes:
+        """Create *folder* on the server returning the server response string."""
+        text, _ = await self._command(b'CREATE', [self._normalise_folder(
+            folder)], uid=False)
+        return text
+
+    async def delete_folder(self, folder: str) ->bytes:
+        """Delete *folder* on the server returning the server response string."""
+        text, _ = await self._command(b'DELETE', [self._normalise_folder(
+            folder)], uid=False)
+        return text
+
+    async def noop(self) ->Tuple[bytes, List[Tuple[Any, ...]]]:
+        """Execute the NOOP command, returning the server command
+        response message followed by a list of parsed status
+        responses, as per :py:meth:`IMAPClient.noop <imapclient.IMAPClient.noop>`.
+        """
+        text, untagged = await self._command(b'NOOP', uid=False)
+        return text, [_parse_untagged_response(resp) for resp in untagged]
+
+    async def search(self, criteria: Any='ALL', charset: Optional[str]=None,
+        compact: bool=False) ->Any:
+        """Return a list of messages ids from the currently selected
+        folder matching *criteria*, as per
+        :py:meth:`IMAPClient.search <imapclient.IMAPClient.search>`.
+        """
+        args = []
+        if charset:
+            args.extend([b'CHARSET', to_bytes(charset)])
+        args.extend(_normalise_search_criteria(criteria, charset))
+        line, untagged = await self._command_response(b'SEARCH', args)
+        if _tagged_status(line) == b'BAD':
+            raise exceptions.InvalidCriteriaError('SEARCH failed: %s' %
+                to_unicode(_tagged_text(line)))
+        self._check_tagged(b'SEARCH', line)
+        data = _untagged_data(untagged, b'SEARCH')
+        return parse_message_list([b' '.join(_lines(data))] if data else [b''],
+            compact=compact)
+
+    async def fetch(self, messages: Any, data: Any, modifiers: Any=None
+        ) ->Dict[int, Dict[bytes, Any]]:
+        """Retrieve selected *data* associated with one or more
+        *messages* in the currently selected folder, as per
+        :py:meth:`IMAPClient.fetch <imapclient.IMAPClient.fetch>`.
+        """
+        if not messages:
+            return {}
+        _, untagged = await self._command(b'FETCH', self._fetch_args(
+            messages, data, modifiers))
+        return self._parse_fetch_response(_untagged_data(untagged, b'FETCH'))
+
+    async def iter_fetch(self, messages: Any, data: Any, modifiers: Any=None
+        ) ->AsyncIterator[Tuple[int, Dict[bytes, Any]]]:
+        """Retrieve selected *data* associated with *messages*,
+        yielding ``(msgid, data)`` pairs as the server's FETCH
+        responses arrive, as per
+        :py:meth:`IMAPClient.iter_fetch <imapclient.IMAPClient.iter_fetch>`.
+
+        Use with ``async for``. Other commands issued while iterating
+        wait until the iteration has finished.
+        """
+        if not messages:
+            return
+        assert self._lock is not None
+        async with self._lock:
+            tag = await self._send_command(b'FETCH', self._fetch_args(
+                messages, data, modifiers), uid=True)
+            try:
+                while True:
+                    resp = await self._read_response()
+                    line = _first_line(resp)
+                    if line.startswith(tag + b' '):
+                        break
+                    if line.startswith(b'* '):
+                        name, fetch_data = _split_untagged(resp)
+                        if name == b'FETCH':
+                            for item in self._parse_fetch_response(
+                                fetch_data).items():
+                                yield item
+            except GeneratorExit:
+                await self._read_until_tagged(tag)
+                raise
+        self._check_tagged(b'FETCH', line)
+
+    def _fetch_args(self, messages: Any, data: Any, modifiers: Any) ->List[
+        bytes]:
+        args = [join_message_ids(messages), seq_to_parenstr_upper(data).
+            encode('ascii')]
+        if modifiers:
+            args.append(seq_to_parenstr_upper(modifiers).encode('ascii'))
+        return args
+
+    def _parse_fetch_response(self, data: List[_Chunk]) ->Dict[int, Dict[
+        bytes, Any]]:
+        return parse_fetch_response(_lines(data), self.normalise_times, self.
+            use_uid, self.lazy_fetch_structures)
+
+    async def get_flags(self, messages: Any) ->Dict[int, Tuple[bytes, ...]]:
+        """Return the flags set for each message in *messages* from
+        the currently selected folder.
+        """
+        response = await self.fetch(messages, ['FLAGS'])
+        return _filter_fetch_dict(response, b'FLAGS')
+
+    async def add_flags(self, messages: Any, flags: Any, silent: bool=False
+        ) ->Optional[Dict[int, Tuple[bytes, ...]]]:
+        """Add *flags* to *messages* in the currently selected folder."""
+        return await self._store(b'+FLAGS', messages, flags, b'FLAGS', silent)
+
+    async def remove_flags(self, messages: Any, flags: Any, silent: bool=False
+        ) ->Optional[Dict[int, Tuple[bytes, ...]]]:
+        """Remove one or more *flags* from *messages* in the currently
+        selected folder.
+        """
+        return await self._store(b'-FLAGS', messages, flags, b'FLAGS', silent)
+
+    async def set_flags(self, messages: Any, flags: Any, silent: bool=False
+        ) ->Optional[Dict[int, Tuple[bytes, ...]]]:
+        """Set the *flags* for *messages* in the currently selected
+        folder.
+        """
+        return await self._store(b'FLAGS', messages, flags, b'FLAGS', silent)
+
+    async def _store(self, cmd: bytes, messages: Any, flags: Any, fetch_key:
+        bytes, silent: bool) ->Optional[Dict[int, Tuple[bytes, ...]]]:
+        if not messages:
+            return {}
+        if silent:
+            cmd += b'.SILENT'
+        flags_list = seq_to_parenstr(flags).encode('ascii')
+        _, untagged = await self._command(b'STORE', [join_message_ids(
+            messages), cmd, flags_list])
+        if silent:
+            return None
+        return _filter_fetch_dict(self._parse_fetch_response(_untagged_data
+            (untagged, b'FETCH')), fetch_key)
+
+    async def copy(self, messages: Any, folder: str) ->bytes:
+        """Copy one or more messages from the current folder to
+        *folder*. Returns the COPY response string returned by the
+        server.
+        """
+        text, _ = await self._command(b'COPY', [join_message_ids(messages),
+            self._normalise_folder(folder)])
+        return text
+
+    async def expunge(self, messages: Any=None) ->Tuple[bytes, List[Tuple[
+        Any, ...]]]:
+        """Use of the *messages* argument requires the UIDPLUS
+        capability. Returns the server response message followed by a
+        list of expunge responses, as per
+        :py:meth:`IMAPClient.expunge <imapclient.IMAPClient.expunge>`.
+        """
+        if messages:
+            text, untagged = await self._command(b'EXPUNGE', [
+                join_message_ids(messages)])
+        else:
+            text, untagged = await self._command(b'EXPUNGE', uid=False)
+        return text, [_parse_untagged_response(resp) for resp in untagged]
+
+    async def append(self, folder: str, msg: Union[str, bytes], flags: Any=
+        (), msg_time: Any=None) ->bytes:
+        """Append a message to *folder*, returning the APPEND response
+        string, as per :py:meth:`IMAPClient.append <imapclient.IMAPClient.append>`.
+        """
+        args = [self._normalise_folder(folder), seq_to_parenstr(flags).
+            encode('ascii')]
+        if msg_time:
+            args.append(_quote(datetime_to_INTERNALDATE(msg_time).encode(
+                'ascii')))
+        args.append(_literal(to_bytes(msg)))
+        text, _ = await self._command(b'APPEND', args, uid=False)
+        return text
+
+    async def idle(self) ->None:
+        """Put the server into IDLE mode.
+
+        Use :py:meth:`.idle_check` to wait for IDLE responses and
+        :py:meth:`.idle_done` to stop IDLE mode. No other commands may
+        be issued in the meantime.
+        """
+        await self._require_capability('IDLE')
+        assert self._lock is not None
+        await self._lock.acquire()
+        try:
+            self._idle_tag = await self._send_command(b'IDLE', [], uid=False)
+            while True:
+                resp = await self._read_response()
+                line = _first_line(resp)
+                if line.startswith(b'+'):
+                    return
+                if line.startswith(self._idle_tag + b' '):
+                    self._check_tagged(b'IDLE', line)
+                    raise self.Error('idle failed: %s' % to_unicode(line))
+                self._idle_responses.append(resp)
+        except BaseException:
+            self._idle_tag = None
+            self._lock.release()
+            raise
+
+    async def idle_check(self, timeout: Optional[float]=None) ->List[Tuple[
+        Any, ...]]:
+        """Wait for IDLE responses from the server, returning them in
+        parsed form as per
+        :py:meth:`IMAPClient.idle_check <imapclient.IMAPClient.idle_check>`.
+
+        Waits until at least one response is available, or at most
+        *timeout* seconds if given. Any further responses which have
+        already been received are returned as well.
+        """
+        if self._idle_tag is None:
+            raise self.Error('not in IDLE mode')
+        assert self._reader is not None
+        responses = self._idle_responses
+        self._idle_responses = []
+        if not responses:
+            # Only the wait for the first line is timed out, so a
+            # response is never abandoned part way through its literals.
+            if not await self._response_ready(timeout):
+                return []
+            responses.append(await self._read_response())
+        while await self._response_ready():
+            responses.append(await self._read_response())
+        return [_parse_untagged_response(resp) for resp in responses]
+
+    async def idle_done(self) ->Tuple[bytes, List[Tuple[Any, ...]]]:
+        """Take the server out of IDLE mode, returning the text of the
+        IDLE command completion and any IDLE responses not yet
+        returned by :py:meth:`.idle_check`.
+        """
+        if self._idle_tag is None:
+            raise self.Error('not in IDLE mode')
+        assert self._lock is not None
+        tag, self._idle_tag = self._idle_tag, None
+        try:
+            await self._write(b'DONE\r\n')
+            text, untagged = await self._read_until_tagged(tag)
+            self._check_tagged(b'IDLE', text)
+        finally:
+            self._lock.release()
+        untagged = self._idle_responses + untagged
+        self._idle_responses = []
+        return _tagged_text(text), [_parse_untagged_response(resp) for resp in
+            untagged]
+
+    def _normalise_folder(self, folder_name: Union[str, bytes]) ->bytes:
+        if isinstance(folder_name, bytes):
+            folder_name = folder_name.decode('ascii')
+        if self.folder_encode:
+            return _quote(encode_utf7(folder_name))
+        return _quote(folder_name.encode('utf-8'))
+
+    def _proc_folder_list(self, folder_data: List[_Chunk]) ->List[Tuple[
+        Tuple[bytes, ...], bytes, str]]:
+        folder_data = [item for item in folder_data if item not in (b'', None)]
+        ret = []
+        for flags, delim, name in chunk(parse_response(_lines(folder_data)),
+            size=3):
+            if isinstance(name, int):
+                folder_name = str(name)
+            elif self.folder_encode:
+                folder_name = decode_utf7(cast(bytes, name))
+            else:
+                folder_name = to_unicode(cast(bytes, name))
+            ret.append((cast(Tuple[bytes, ...], flags), cast(bytes, delim),
+                folder_name))
+        return ret
+
+    async def _command(self, command: bytes, args: Optional[List[bytes]]=
+        None, uid: bool=True, secret: bool=False) ->Tuple[bytes, List[List[
+        _Chunk]]]:
+        """Send a command and wait for its completion.
+
+        Returns the text of the tagged OK response and the untagged
+        responses received while waiting for it. Raises
+        AsyncIMAPClient.Error if the command failed.
+        """
+        line, untagged = await self._command_response(command, args, uid,
+            secret)
+        self._check_tagged(command, line)
+        return _tagged_text(line), untagged
+
+    async def _command_response(self, command: bytes, args: Optional[List[
+        bytes]]=None, uid: bool=True, secret: bool=False) ->Tuple[bytes,
+        List[List[_Chunk]]]:
+        """Send a command and return its tagged response line and the
+        untagged responses, without checking whether it succeeded.
+        """
+        if self._idle_tag is not None:
+            raise self.Error('%s not allowed in IDLE mode' % to_unicode(
+                command))
+        assert self._lock is not None, 'not connected'
+        async with self._lock:
+            tag = await self._send_command(command, args or [], uid, secret)
+            return await self._read_until_tagged(tag)
+
+    async def _send_command(self, command: bytes, args: List[bytes], uid:
+        bool, secret: bool=False) ->bytes:
+        self._tagnum += 1
+        tag = b'A%d' % self._tagnum
+        prefix = [tag]
+        if uid and self.use_uid:
+            prefix.append(b'UID')
+        prefix.append(command)
+        line: List[bytes] = []
+        for item, is_last in _iter_with_last(prefix + args):
+            if _is8bit(item):
+                if isinstance(item, _quoted):
+                    item = item.original
+                literal_plus = b'LITERAL+' in (self._cached_capabilities or ())
+                line.append(b'{%d+}' % len(item) if literal_plus else
+                    b'{%d}' % len(item))
+                await self._write(b' '.join(line) + b'\r\n', secret)
+                line = []
+                if not literal_plus:
+                    await self._wait_for_continuation(tag)
+                await self._write(item, secret=True)
+                if not is_last:
+                    line.append(b'')
+            else:
+                line.append(item)
+        await self._write(b' '.join(line) + b'\r\n', secret)
+        return tag
+
+    async def _wait_for_continuation(self, tag: bytes) ->None:
+        while True:
+            resp = await self._read_response()
+            line = _first_line(resp)
+            if line.startswith(b'+'):
+                return
+            if line.startswith(tag + b' '):
+                raise self.AbortError(
+                    'unexpected response while waiting for continuation response: '
+                     + repr(line))
+
+    async def _read_until_tagged(self, tag: bytes) ->Tuple[bytes, List[List
+        [_Chunk]]]:
+        untagged: List[List[_Chunk]] = []
+        while True:
+            resp = await self._read_response()
+            line = _first_line(resp)
+            if line.startswith(tag + b' '):
+                return line, untagged
+            if line.startswith(b'* '):
+                untagged.append(resp)
+            else:
+                logger.debug('Ignoring unexpected response: %r', line)
+
+    async def _write(self, data: bytes, secret: bool=False) ->None:
+        if self._writer is None:
+            raise self.AbortError('not connected')
+        if not secret:
+            logger.debug('> %r', data)
+        self._writer.write(data)
+        await self._writer.drain()
+
+    async def _read_response(self) ->List[_Chunk]:
+        """Read one complete response from the server.
+
+        The response is returned as a list of chunks in the form
+        produced by imaplib: response lines ending in a literal are
+        returned as ``(line, literal)`` tuples followed by the rest of
+        the response.
+        """
+        if self._reader is None:
+            raise self.AbortError('not connected')
+        chunks: List[_Chunk] = []
+        while True:
+            if self._peeked_line is not None:
+                line, self._peeked_line = self._peeked_line, None
+            else:
+                line = await self._read_line(self._timeout.read)
+            if not line.endswith(b'\n'):
+                raise self.AbortError('connection closed by server')
+            line = line.rstrip(b'\r\n')
+            m = _LITERAL_RE.search(line)
+            if m is None:
+                chunks.append(line)
+                logger.debug('< %r', line)
+                return chunks
+            try:
+                literal = await asyncio.wait_for(self._reader.readexactly(
+                    int(m.group(1))), self._timeout.read)
+            except (OSError, asyncio.IncompleteReadError) as e:
+                raise self.AbortError('socket error: %s' % e)
+            chunks.append((line, literal))
+
+    async def _read_line(self, timeout: Optional[float]) ->bytes:
+        assert self._reader is not None
+        try:
+            return await asyncio.wait_for(self._reader.readline(), timeout)
+        except asyncio.TimeoutError:
+            # A subclass of OSError from Python 3.11.
+            raise
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            raise self.AbortError('socket error: %s' % e)
+
+    async def _response_ready(self, timeout: Optional[float]=_BUFFERED_WAIT
+        ) ->bool:
+        """Return True if the start of another response is received
+        within *timeout* seconds, keeping its first line for
+        :py:meth:`_read_response`.
+        """
+        if self._peeked_line is None:
+            try:
+                self._peeked_line = await self._read_line(timeout)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    def _check_tagged(self, command: bytes, line: bytes) ->None:
+        status = _tagged_status(line)
+        if status != b'OK':
+            text = _tagged_text(line)
+            if status == b'NO' and b'[READ-ONLY]' in text:
+                raise self.ReadOnlyError('%s failed: %s' % (to_unicode(
+                    command), to_unicode(text)))
+            raise self.Error('%s failed: %s %s' % (to_unicode(command),
+                to_unicode(status), to_unicode(text)))
+
+
+def _quote(value: bytes) ->bytes:
+    """Quote *value* for use as an IMAP string, keeping the original
+    so that 8-bit values can be sent as a literal instead."""
+    quoted = value.replace(b'\\', b'\\\\').replace(b'"', b'\\"')
+    out = _quoted(b'"' + quoted + b'"')
+    out.original = value
+    return out
+
+
+def _first_line(resp: List[_Chunk]) ->bytes:
+    first = resp[0]
+    return first[0] if isinstance(first, tuple) else first
+
+
+def _lines(resp: List[_Chunk]) ->List[bytes]:
+    # The parser accepts imaplib style (header, literal) tuples as well
+    # as plain lines even though it is only annotated for the latter.
+    return cast(List[bytes], resp)
+
+
+def _tagged_status(line: bytes) ->bytes:
+    parts = line.split(b' ', 2)
+    return parts[1].upper() if len(parts) > 1 else b''
+
+
+def _tagged_text(line: bytes) ->bytes:
+    parts = line.split(b' ', 2)
+    return parts[2] if len(parts) > 2 else b''
+
+
+def _split_untagged(resp: List[_Chunk]) ->Tuple[bytes, List[_Chunk]]:
+    """Split an untagged response into its name and data as imaplib
+    does, eg. ``* 3 FETCH (...)`` becomes ``(b'FETCH', [b'3 (...)'])``.
+    """
+    line = _first_line(resp)[2:]
+    word, _, rest = line.partition(b' ')
+    if word.isdigit():
+        name, _, rest = rest.partition(b' ')
+        data = word + b' ' + rest if rest else word
+    else:
+        name, data = word, rest
+    first = resp[0]
+    head: _Chunk = (data, first[1]) if isinstance(first, tuple) else data
+    return name.upper(), [head] + resp[1:]
+
+
+def _untagged_data(untagged: List[List[_Chunk]], name: bytes) ->List[_Chunk]:
+    out: List[_Chunk] = []
+    for resp in untagged:
+        resp_name, data = _split_untagged(resp)
+        if resp_name == name:
+            out.extend(data)
+    return out
+
+
+def _parse_untagged_response(resp: List[_Chunk]) ->Tuple[Any, ...]:
+    line = _first_line(resp)[2:]
+    if line.startswith((b'OK ', b'NO ')) and len(resp) == 1:
+        return tuple(line.split(b' ', 1))
+    first = resp[0]
+    head: _Chunk = (line, first[1]) if isinstance(first, tuple) else line
+    return parse_response(_lines([head] + resp[1:]))
+
+
+def _capabilities_from_code(text: bytes) ->Optional[Tuple[bytes, ...]]:
+    for m in _RESP_CODE_RE.finditer(text):
+        if m.group('key') == b'CAPABILITY' and m.group('data'):
+            return tuple(m.group('data').upper().split())
+    return None
+
+
+def _process_select_response(text: bytes, untagged: List[List[_Chunk]]
+    ) ->Dict[bytes, Any]:
+    out: Dict[bytes, Any] = {}
+    codes = [text]
+    for resp in untagged:
+        name, rest = _split_untagged(resp)
+        value = _first_line(rest)
+        if name == b'OK':
+            codes.append(value)
+        elif name in (b'EXISTS', b'RECENT'):
+            out[name] = int(value)
+        elif name == b'FLAGS':
+            out[name] = tuple(value.strip()[1:-1].split())
+    for code in codes:
+        for m in _RESP_CODE_RE.finditer(code):
+            key, data = m.group('key'), m.group('data')
+            if key in (b'UIDNEXT', b'UIDVALIDITY', b'HIGHESTMODSEQ', b'UNSEEN'
+                ) and data:
+                out[key] = int(data)
+            elif key == b'PERMANENTFLAGS' and data:
+                out[key] = tuple(data.strip()[1:-1].split())
+            elif key in (b'READ-WRITE', b'READ-ONLY'):
+                out[b'READ-WRITE'] = key == b'READ-WRITE'
+            elif key == b'NOMODSEQ':
+                out[key] = True
+    return out
+
+
+def _filter_fetch_dict(fetch_dict: Dict[int, Dict[bytes, Any]], key: bytes
+    ) ->Dict[int, Any]:
+    return dict((msgid, data[key]) for msgid, data in fetch_dict.items() if
+        key in data)
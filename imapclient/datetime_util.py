@@ -1,8 +1,16 @@
 import re
-from datetime import datetime
+from datetime import datetime, timedelta
 from email.utils import parsedate_tz
+from typing import Dict, Iterable, List, Optional, Tuple
 from .fixed_offset import FixedOffset
 _SHORT_MONTHS = ' Jan Feb Mar Apr May Jun Jul Aug Sep Oct Nov Dec'.split(' ')
+_MONTH_NUMBERS = {m.lower().encode('ascii'): i for i, m in enumerate(
+    _SHORT_MONTHS) if m}
+
+# The fixed INTERNALDATE format from RFC 3501: "DD-Mon-YYYY HH:MM:SS +ZZZZ"
+# (the day may be space padded).
+_INTERNALDATE_RE = re.compile(
+    b' ?(\\d{1,2})-([A-Za-z]{3})-(\\d{4}) (\\d\\d):(\\d\\d):(\\d\\d) ([-+])(\\d\\d)(\\d\\d)')
 
 
 def parse_to_datetime(timestamp: bytes, normalise: bool=True) ->datetime:
@@ -14,19 +22,83 @@ def parse_to_datetime(timestamp: bytes, normalise: bool=True) ->datetime:
     If normalise is False, then the returned datetime will be
     unadjusted but will contain timezone information as per the input.
     """
-    if isinstance(timestamp, bytes):
-        timestamp = timestamp.decode('ascii')
-    
-    tt = parsedate_tz(timestamp)
-    if tt is None:
-        raise ValueError("Could not parse datetime string: %r" % timestamp)
+    dt, offset = _parse_with_offset(timestamp)
+    if offset is None:
+        return dt
+    dt = dt.replace(tzinfo=FixedOffset.for_minutes(offset))
+    if normalise:
+        dt = datetime_to_native(dt)
+    return dt
+
 
-    tz = tt[-1]
-    dt = datetime(*tt[:6], tzinfo=FixedOffset(tz) if tz else None)
+def parse_to_datetimes(timestamps: Iterable[Optional[bytes]], normalise:
+    bool=True) ->List[Optional[datetime]]:
+    """Convert a batch of IMAP datetime strings (eg. the INTERNALDATE
+    values from a FETCH response) to datetimes.
 
+    Datetimes are returned as per :py:func:`parse_to_datetime` but
+    values which are None or can't be parsed are returned as None
+    instead of raising an error. Repeated values are only parsed once
+    and, when normalising, the system timezone is only looked up once.
+    """
+    local_offset = None
     if normalise:
-        return dt.astimezone().replace(tzinfo=None)
-    return dt
+        utcoffset = FixedOffset.for_system().utcoffset(None)
+        local_offset = utcoffset.days * 1440 + utcoffset.seconds // 60
+    seen: Dict[bytes, Optional[datetime]] = {}
+    out: List[Optional[datetime]] = []
+    for timestamp in timestamps:
+        if timestamp is None:
+            out.append(None)
+            continue
+        try:
+            dt = seen[timestamp]
+        except KeyError:
+            dt = seen[timestamp] = _convert_in_batch(timestamp, local_offset)
+        out.append(dt)
+    return out
+
+
+def _convert_in_batch(timestamp: bytes, local_offset: Optional[int]
+    ) ->Optional[datetime]:
+    try:
+        dt, offset = _parse_with_offset(timestamp)
+    except ValueError:
+        return None
+    if offset is None:
+        return dt
+    if local_offset is None:
+        return dt.replace(tzinfo=FixedOffset.for_minutes(offset))
+    return dt + timedelta(minutes=local_offset - offset)
+
+
+def _parse_with_offset(timestamp: bytes) ->Tuple[datetime, Optional[float]]:
+    """Parse *timestamp* to a naive datetime and its offset east of
+    UTC in minutes (None if no timezone was given).
+    """
+    m = _INTERNALDATE_RE.fullmatch(timestamp)
+    if m is not None:
+        month = _MONTH_NUMBERS.get(m.group(2).lower())
+        if month is not None:
+            day, _, year, hour, minute, second, sign, tz_hours, tz_mins = (
+                m.groups())
+            minutes = int(tz_hours) * 60 + int(tz_mins)
+            if sign == b'-':
+                minutes = -minutes
+            return datetime(int(year), month, int(day), int(hour), int(
+                minute), int(second)), minutes
+    time_tuple = parsedate_tz(_munge(timestamp))
+    if time_tuple is None:
+        raise ValueError("couldn't parse datetime %r" % timestamp)
+    tz_offset_seconds = time_tuple[-1]
+    offset: Optional[float] = None
+    if tz_offset_seconds is not None:
+        offset = tz_offset_seconds / 60
+    return datetime(*time_tuple[:6]), offset
+
+
+def datetime_to_native(dt: datetime) ->datetime:
+    return dt.astimezone(FixedOffset.for_system()).replace(tzinfo=None)
 
 
 def datetime_to_INTERNALDATE(dt: datetime) ->str:
@@ -35,18 +107,24 @@ def datetime_to_INTERNALDATE(dt: datetime) ->str:
     If timezone information is missing the current system
     timezone is used.
     """
-    if dt.tzinfo is None:
-        dt = dt.astimezone()
-    
-    return dt.strftime("%d-%b-%Y %H:%M:%S %z")
+    if not dt.tzinfo:
+        dt = dt.replace(tzinfo=FixedOffset.for_system())
+    fmt = '%d-' + _SHORT_MONTHS[dt.month] + '-%Y %H:%M:%S %z'
+    return dt.strftime(fmt)
 
 
 _rfc822_dotted_time = re.compile(
     '\\w+, ?\\d{1,2} \\w+ \\d\\d(\\d\\d)? \\d\\d?\\.\\d\\d?\\.\\d\\d?.*')
 
 
+def _munge(timestamp: bytes) ->str:
+    s = timestamp.decode('latin-1')
+    if _rfc822_dotted_time.match(s):
+        return s.replace('.', ':')
+    return s
+
+
 def format_criteria_date(dt: datetime) ->bytes:
     """Format a date or datetime instance for use in IMAP search criteria."""
-    if isinstance(dt, datetime):
-        dt = dt.date()
-    return dt.strftime("%d-%b-%Y").encode('ascii')
+    out = '%02d-%s-%d' % (dt.day, _SHORT_MONTHS[dt.month], dt.year)
+    return out.encode('ascii')
@@ -33,5 +33,13 @@ class InvalidCriteriaError(IMAPClientError):
     """
 
 
+class UnsupportedCriteriaError(IMAPClientError):
+    """The search criteria can't be evaluated without the server."""
+
+
 class ProtocolError(IMAPClientError):
     """The server replied with a response that violates the IMAP protocol."""
+
+
+class PoolTimeoutError(IMAPClientError):
+    """No pooled connection became available within the time allowed."""
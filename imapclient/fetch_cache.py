@@ -0,0 +1,188 @@
+"""
+Caches for the immutable parts of FETCH responses.
+
+A message's headers, envelope, body structure, internal date and size
+never change once it has been given a UID, so they can be kept on the
+client and reused for as long as the folder's UIDVALIDITY stays the
+same. Set :py:attr:`IMAPClient.fetch_cache
+<imapclient.IMAPClient.fetch_cache>` to one of the caches here to
+have :py:meth:`IMAPClient.fetch <imapclient.IMAPClient.fetch>` use it.
+"""
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+__all__ = ['FetchCache', 'MemoryFetchCache', 'SQLiteFetchCache']
+_Fields = Dict[bytes, Any]
+_Key = Tuple[str, int, int]
+
+
+class FetchCache:
+    """Interface for caches usable as :py:attr:`IMAPClient.fetch_cache
+    <imapclient.IMAPClient.fetch_cache>`.
+
+    Entries are stored per message, keyed by folder name, UIDVALIDITY
+    and UID. Each entry maps FETCH response keys (eg. ``b'ENVELOPE'``)
+    to parsed values.
+    """
+
+    def validate(self, folder: str, uidvalidity: int) ->None:
+        """Called when *folder* is selected. Drops all entries for the
+        folder if *uidvalidity* differs from the value last seen.
+        """
+        raise NotImplementedError
+
+    def get_many(self, folder: str, uidvalidity: int, uids: Iterable[int],
+        fields: List[bytes]) ->Dict[int, _Fields]:
+        """Return the cached *fields* for those of *uids* which have
+        all of them.
+        """
+        raise NotImplementedError
+
+    def put_many(self, folder: str, uidvalidity: int, entries: Dict[int,
+        _Fields]) ->None:
+        """Add the fields in *entries* (a dict mapping UIDs to fields)
+        to the cache.
+        """
+        raise NotImplementedError
+
+    def invalidate(self, folder: Optional[str]=None) ->None:
+        """Drop all entries for *folder*, or all entries if *folder* is
+        None.
+        """
+        raise NotImplementedError
+
+
+class MemoryFetchCache(FetchCache):
+    """An in-memory cache holding the entries for at most
+    *max_messages* messages, discarding the least recently used ones
+    first.
+    """
+
+    def __init__(self, max_messages: int=10000) ->None:
+        self.max_messages = max_messages
+        self._entries: 'OrderedDict[_Key, _Fields]' = OrderedDict()
+        self._uidvalidity: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) ->int:
+        return len(self._entries)
+
+    def validate(self, folder: str, uidvalidity: int) ->None:
+        with self._lock:
+            if self._uidvalidity.get(folder, uidvalidity) != uidvalidity:
+                self._drop(folder)
+            self._uidvalidity[folder] = uidvalidity
+
+    def get_many(self, folder: str, uidvalidity: int, uids: Iterable[int],
+        fields: List[bytes]) ->Dict[int, _Fields]:
+        out: Dict[int, _Fields] = {}
+        with self._lock:
+            for uid in uids:
+                key = folder, uidvalidity, uid
+                entry = self._entries.get(key)
+                if entry is None or not all(f in entry for f in fields):
+                    continue
+                self._entries.move_to_end(key)
+                out[uid] = {f: entry[f] for f in fields}
+        return out
+
+    def put_many(self, folder: str, uidvalidity: int, entries: Dict[int,
+        _Fields]) ->None:
+        with self._lock:
+            for uid, fields in entries.items():
+                key = folder, uidvalidity, uid
+                entry = self._entries.get(key)
+                if entry is None:
+                    self._entries[key] = dict(fields)
+                else:
+                    entry.update(fields)
+                    self._entries.move_to_end(key)
+            while len(self._entries) > self.max_messages:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, folder: Optional[str]=None) ->None:
+        with self._lock:
+            if folder is None:
+                self._entries.clear()
+                self._uidvalidity.clear()
+            else:
+                self._drop(folder)
+                self._uidvalidity.pop(folder, None)
+
+    def _drop(self, folder: str) ->None:
+        for key in [k for k in self._entries if k[0] == folder]:
+            del self._entries[key]
+
+
+class SQLiteFetchCache(FetchCache):
+    """A cache stored in the SQLite database at *path*, so entries
+    survive between processes. Values are stored pickled.
+    """
+    _QUERY_CHUNK = 500
+
+    def __init__(self, path: str) ->None:
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS folders (folder TEXT PRIMARY KEY, uidvalidity INTEGER NOT NULL)'
+                )
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS fields (folder TEXT NOT NULL, uidvalidity INTEGER NOT NULL, uid INTEGER NOT NULL, field BLOB NOT NULL, value BLOB NOT NULL, PRIMARY KEY (folder, uidvalidity, uid, field))'
+                )
+
+    def close(self) ->None:
+        self._db.close()
+
+    def validate(self, folder: str, uidvalidity: int) ->None:
+        with self._lock, self._db:
+            row = self._db.execute(
+                'SELECT uidvalidity FROM folders WHERE folder = ?', (folder,)
+                ).fetchone()
+            if row is not None and row[0] != uidvalidity:
+                self._db.execute('DELETE FROM fields WHERE folder = ?', (
+                    folder,))
+            self._db.execute(
+                'INSERT OR REPLACE INTO folders (folder, uidvalidity) VALUES (?, ?)'
+                , (folder, uidvalidity))
+
+    def get_many(self, folder: str, uidvalidity: int, uids: Iterable[int],
+        fields: List[bytes]) ->Dict[int, _Fields]:
+        uid_list = list(uids)
+        wanted = set(fields)
+        found: Dict[int, _Fields] = {}
+        with self._lock:
+            for i in range(0, len(uid_list), self._QUERY_CHUNK):
+                batch = uid_list[i:i + self._QUERY_CHUNK]
+                rows = self._db.execute(
+                    'SELECT uid, field, value FROM fields WHERE folder = ? AND uidvalidity = ? AND uid IN (%s)'
+                     % ','.join('?' * len(batch)), [folder, uidvalidity] +
+                    batch)
+                for uid, field, value in rows:
+                    field = bytes(field)
+                    if field in wanted:
+                        found.setdefault(uid, {})[field] = value
+        return {uid: {f: pickle.loads(v) for f, v in entry.items()} for uid,
+            entry in found.items() if len(entry) == len(wanted)}
+
+    def put_many(self, folder: str, uidvalidity: int, entries: Dict[int,
+        _Fields]) ->None:
+        rows = [(folder, uidvalidity, uid, field, pickle.dumps(value)) for
+            uid, fields in entries.items() for field, value in fields.items()]
+        with self._lock, self._db:
+            self._db.executemany(
+                'INSERT OR REPLACE INTO fields (folder, uidvalidity, uid, field, value) VALUES (?, ?, ?, ?, ?)'
+                , rows)
+
+    def invalidate(self, folder: Optional[str]=None) ->None:
+        with self._lock, self._db:
+            if folder is None:
+                self._db.execute('DELETE FROM fields')
+                self._db.execute('DELETE FROM folders')
+            else:
+                self._db.execute('DELETE FROM fields WHERE folder = ?', (
+                    folder,))
+                self._db.execute('DELETE FROM folders WHERE folder = ?', (
+                    folder,))
@@ -1,6 +1,6 @@
 import datetime
 import time
-from typing import Optional
+from typing import Callable, Dict, Optional, Tuple
 ZERO = datetime.timedelta(0)
 
 
@@ -11,6 +11,7 @@ class FixedOffset(datetime.tzinfo):
     """
 
     def __init__(self, minutes: float) ->None:
+        self.__minutes = minutes
         self.__offset = datetime.timedelta(minutes=minutes)
         sign = '+'
         if minutes < 0:
@@ -18,13 +19,40 @@ class FixedOffset(datetime.tzinfo):
         hours, remaining_mins = divmod(abs(minutes), 60)
         self.__name = '%s%02d%02d' % (sign, hours, remaining_mins)
 
+    def utcoffset(self, _: Optional[datetime.datetime]) ->datetime.timedelta:
+        return self.__offset
+
+    def tzname(self, _: Optional[datetime.datetime]) ->str:
+        return self.__name
+
+    def dst(self, _: Optional[datetime.datetime]) ->datetime.timedelta:
+        return ZERO
+
+    def __reduce__(self) ->Tuple[Callable[[float], 'FixedOffset'], Tuple[
+        float]]:
+        return FixedOffset.for_minutes, (self.__minutes,)
+
+    @classmethod
+    def for_minutes(cls, minutes: float) ->'FixedOffset':
+        """Return a shared FixedOffset instance for *minutes* east from
+        UTC, creating it on first use.
+        """
+        try:
+            return _instances[minutes]
+        except KeyError:
+            offset = _instances[minutes] = cls(minutes)
+            return offset
+
     @classmethod
     def for_system(cls) ->'FixedOffset':
         """Return a FixedOffset instance for the current working timezone and
         DST conditions.
         """
-        if time.daylight:
+        if time.daylight and time.localtime().tm_isdst:
             offset = time.altzone
         else:
             offset = time.timezone
         return cls(-offset // 60)
+
+
+_instances: Dict[float, FixedOffset] = {}
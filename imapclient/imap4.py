@@ -1,11 +1,24 @@
 import imaplib
 import socket
 from typing import Optional
+from .response_reader import ResponseReaderMixin
 
 
-class IMAP4WithTimeout(imaplib.IMAP4):
+class IMAP4WithTimeout(ResponseReaderMixin, imaplib.IMAP4):
 
     def __init__(self, address: str, port: int, timeout: Optional[float]
         ) ->None:
         self._timeout = timeout
+        self.memoryview_literals = False
         imaplib.IMAP4.__init__(self, address, port)
+
+    def open(self, host: str='', port: int=143, timeout: Optional[float]=None
+        ) ->None:
+        self.host = host
+        self.port = port
+        self.sock = self._create_socket(timeout)
+        self.file = self.sock.makefile('rb')
+
+    def _create_socket(self, timeout: Optional[float]=None) ->socket.socket:
+        return socket.create_connection((self.host, self.port), timeout if
+            timeout is not None else self._timeout)
@@ -1,29 +1,37 @@
 import dataclasses
 import functools
 import imaplib
+import io
 import itertools
+import os
 import re
 import select
 import socket
 import ssl as ssl_lib
 import sys
+import time
 import warnings
+from collections import defaultdict
 from datetime import date, datetime
 from logging import getLogger, LoggerAdapter
 from operator import itemgetter
-from typing import List, Optional
+from typing import (Any, Dict, Iterable, Iterator, List, Optional, Sequence,
+                    Tuple)
 from . import exceptions, imap4, response_lexer, tls
 from .datetime_util import datetime_to_INTERNALDATE, format_criteria_date
 from .imap_utf7 import decode as decode_utf7
 from .imap_utf7 import encode as encode_utf7
 from .response_parser import parse_fetch_response, parse_message_list, parse_response
+from .sequence_set import decode as decode_sequence_set
+from .sequence_set import encode as encode_sequence_set
 from .util import assert_imap_protocol, chunk, to_bytes, to_unicode
 if hasattr(select, 'poll'):
     POLL_SUPPORT = True
 else:
     POLL_SUPPORT = False
 logger = getLogger(__name__)
-__all__ = ['IMAPClient', 'SocketTimeout', 'DELETED', 'SEEN', 'ANSWERED',
+__all__ = ['IMAPClient', 'AppendProgress', 'BodyStream', 'MessageStream',
+    'Pipeline', 'PipelineResult', 'SocketTimeout', 'DELETED', 'SEEN', 'ANSWERED',
     'FLAGGED', 'DRAFT', 'RECENT']
 if 'XLIST' not in imaplib.Commands:
     imaplib.Commands['XLIST'] = 'NONAUTH', 'AUTH', 'SELECTED'
@@ -57,6 +65,15 @@ _POPULAR_SPECIAL_FOLDERS = {SENT: ('Sent', 'Sent Items', 'Sent items'),
     'Deleted Items', 'Deleted Messages', 'Deleted'), JUNK: ('Junk', 'Spam')}
 _RE_SELECT_RESPONSE = re.compile(
     b'\\[(?P<key>[A-Z-]+)( \\((?P<data>.*)\\))?\\]')
+_FETCH_BATCH_TARGET_BYTES = 1024 * 1024
+_FETCH_BATCH_INITIAL_SIZE = 25
+_FETCH_BATCH_MAX_SIZE = 1000
+_FETCH_BATCH_MAX_GROWTH = 4
+_BODY_STREAM_CHUNK_SIZE = 1024 * 1024
+_CACHEABLE_FETCH_ITEMS = frozenset(['ENVELOPE', 'BODYSTRUCTURE', 'BODY',
+    'INTERNALDATE', 'RFC822.SIZE', 'RFC822.HEADER'])
+_BULK_APPEND_BATCH_BYTES = 8 * 1024 * 1024
+_RE_APPENDUID = re.compile(b'\\[APPENDUID (\\d+) ([0-9:,]+)\\]')
 
 
 class Namespace(tuple):
@@ -113,9 +130,39 @@ class Quota:
     limit: bytes
 
 
+@dataclasses.dataclass
+class AppendProgress:
+    """Progress of :py:meth:`IMAPClient.bulk_append`.
+
+    :ivar messages: the number of messages appended so far
+    :ivar bytes: the number of bytes of message data appended so far
+    :ivar elapsed: the number of seconds since the first command was sent
+    """
+    messages: int
+    bytes: int
+    elapsed: float
+
+    @property
+    def bytes_per_second(self) ->float:
+        """The average rate at which message data has been appended."""
+        if not self.elapsed:
+            return 0.0
+        return self.bytes / self.elapsed
+
+
 def require_capability(capability):
     """Decorator raising CapabilityError when a capability is not available."""
-    pass
+
+    def actual_decorator(func):
+
+        @functools.wraps(func)
+        def wrapper(client, *args, **kwargs):
+            if not client.has_capability(capability):
+                raise exceptions.CapabilityError(
+                    'Server does not support {} capability'.format(capability))
+            return func(client, *args, **kwargs)
+        return wrapper
+    return actual_decorator
 
 
 class IMAPClient:
@@ -162,6 +209,48 @@ class IMAPClient:
     system time). This attribute can be changed between ``fetch()``
     calls if required.
 
+    The *memoryview_literals* attribute specifies whether literal
+    values returned by ``fetch()`` (eg. ``RFC822`` or ``BODY[]``
+    data) are returned as ``memoryview`` instances over the buffer
+    the data was received into instead of as bytes. This avoids
+    copying large message bodies and keeps peak memory use close to
+    the size of the data fetched. It defaults to False and is only
+    honoured for socket based connections (not when *stream* is
+    True).
+
+    The *lazy_fetch_structures* attribute specifies whether ENVELOPE,
+    BODY and BODYSTRUCTURE values returned by ``fetch()`` are only
+    converted when first used. When True these are returned as
+    :py:class:`LazyEnvelope <imapclient.response_types.LazyEnvelope>`
+    and :py:class:`LazyBodyData <imapclient.response_types.LazyBodyData>`
+    instances, which saves time when many messages are fetched but
+    only a few of the values are looked at. It defaults to False.
+
+    The *fetch_parse_executor* attribute may be set to a
+    :py:class:`concurrent.futures.Executor` (typically a
+    ``ProcessPoolExecutor``) to parse the responses to ``fetch()`` in.
+    Responses are handed to the executor in batches of
+    *fetch_parse_batch_size* messages while the rest of the response is
+    still being read, so network I/O overlaps with parsing and parsing
+    can use several cores. *lazy_fetch_structures* and
+    *memoryview_literals* are ignored when an executor is used, so
+    values are always converted eagerly, as the parsed data must be
+    sent back from the executor. It defaults to
+    None (responses are parsed in the calling thread).
+
+    The *fetch_cache* attribute may be set to a
+    :py:class:`FetchCache <imapclient.fetch_cache.FetchCache>` such as
+    :py:class:`MemoryFetchCache <imapclient.fetch_cache.MemoryFetchCache>`
+    to keep the parts of messages which never change (ENVELOPE,
+    BODYSTRUCTURE, BODY, INTERNALDATE, RFC822.SIZE and headers fetched
+    with ``BODY.PEEK[HEADER...]`` or ``RFC822.HEADER``) on the client.
+    ``fetch()`` then only requests these from the server for messages
+    which aren't already cached. Cached entries are keyed by folder,
+    UIDVALIDITY and UID, so the cache is only used when *use_uid* is
+    True, a folder has been selected with ``select_folder()``, no
+    *modifiers* are given and messages are given as UIDs rather than
+    ranges. It defaults to None (no caching).
+
     Can be used as a context manager to automatically close opened connections:
 
     >>> with IMAPClient(host="imap.foo.org") as client:
@@ -194,12 +283,18 @@ class IMAPClient:
         self.use_uid = use_uid
         self.folder_encode = True
         self.normalise_times = True
+        self.memoryview_literals = False
+        self.lazy_fetch_structures = False
+        self.fetch_parse_executor = None
+        self.fetch_parse_batch_size = 500
+        self.fetch_cache = None
         if not isinstance(timeout, SocketTimeout):
             timeout = SocketTimeout(timeout, timeout)
         self._timeout = timeout
         self._starttls_done = False
         self._cached_capabilities = None
         self._idle_tag = None
+        self._selected_folder = None
         self._imap = self._create_IMAP4()
         logger.debug('Connected to host %s over %s', self.host, 'SSL/TLS' if
             ssl else 'plain text')
@@ -212,6 +307,19 @@ class IMAPClient:
     def __enter__(self):
         return self
 
+    def _create_IMAP4(self):
+        if self.stream:
+            return imaplib.IMAP4_stream(self.host)
+        connect_timeout = getattr(self._timeout, 'connect', None)
+        if self.ssl:
+            return tls.IMAP4_TLS(self.host, self.port, self.ssl_context,
+                connect_timeout)
+        return imap4.IMAP4WithTimeout(self.host, self.port, connect_timeout)
+
+    def _set_read_timeout(self):
+        if self._timeout is not None:
+            self.socket().settimeout(self._timeout.read)
+
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Logout and closes the connection when exiting the context manager.
 
@@ -370,9 +478,12 @@ class IMAPClient:
         """
         pass
 
-    def logout(self):
+    def logout(self) ->bytes:
         """Logout, returning the server response."""
-        pass
+        typ, data = self._imap.logout()
+        self._check_resp('BYE', 'logout', typ, data)
+        logger.info('Logged out, connection closed')
+        return data[0]
 
     def shutdown(self) ->None:
         """Close the connection to the IMAP server (without logging out)
@@ -380,7 +491,8 @@ class IMAPClient:
         In most cases, :py:meth:`.logout` should be used instead of
         this. The logout method also shutdown down the connection.
         """
-        pass
+        self._imap.shutdown()
+        logger.info('Connection closed')
 
     @require_capability('ENABLE')
     def enable(self, *capabilities):
@@ -399,7 +511,14 @@ class IMAPClient:
 
         See :rfc:`5161` for more details.
         """
-        pass
+        if self._imap.state != 'AUTH':
+            raise exceptions.IllegalStateError(
+                'ENABLE command illegal in state %s' % self._imap.state)
+        resp = self._raw_command_untagged(b'ENABLE', [to_bytes(c) for c in
+            capabilities], uid=False, response_name='ENABLED', unpack=True)
+        if not resp:
+            return []
+        return resp.split()
 
     @require_capability('ID')
     def id_(self, parameters=None):
@@ -423,11 +542,33 @@ class IMAPClient:
         If the session is not yet authenticated, the capabilities
         requested at connection time will be returned.
         """
-        pass
+        if self._starttls_done and self._imap.state == 'NONAUTH':
+            self._cached_capabilities = None
+            return self._do_capabilites()
+        if self._cached_capabilities:
+            return self._cached_capabilities
+        untagged = _dict_bytes_normaliser(self._imap.untagged_responses)
+        response = untagged.pop('CAPABILITY', None)
+        if response:
+            self._cached_capabilities = self._normalise_capabilites(response[0]
+                )
+            return self._cached_capabilities
+        if self._imap.state in ('SELECTED', 'AUTH'):
+            self._cached_capabilities = self._do_capabilites()
+            return self._cached_capabilities
+        return tuple(to_bytes(c) for c in self._imap.capabilities)
+
+    def _do_capabilites(self):
+        raw_response = self._command_and_check('capability', unpack=True)
+        return self._normalise_capabilites(raw_response)
+
+    def _normalise_capabilites(self, raw_response):
+        raw_response = to_bytes(raw_response)
+        return tuple(raw_response.upper().split())
 
     def has_capability(self, capability):
         """Return ``True`` if the IMAP server has the given *capability*."""
-        pass
+        return to_bytes(capability).upper() in self.capabilities()
 
     @require_capability('NAMESPACE')
     def namespace(self):
@@ -523,7 +664,8 @@ class IMAPClient:
         """
         pass
 
-    def select_folder(self, folder, readonly=False):
+    def select_folder(self, folder: str, readonly: bool=False) ->Dict[
+        bytes, Any]:
         """Set the current folder on the server.
 
         Future calls to methods such as search and fetch will act on
@@ -541,7 +683,42 @@ class IMAPClient:
              b'UIDNEXT': 11,
              b'UIDVALIDITY': 1239278212}
         """
-        pass
+        self._selected_folder = None
+        self._command_and_check('select', self._normalise_folder(folder),
+            readonly)
+        return self._folder_selected(folder, self._imap.untagged_responses)
+
+    def _folder_selected(self, folder, resp):
+        out = self._process_select_response(resp)
+        uidvalidity = out.get(b'UIDVALIDITY')
+        if uidvalidity is not None:
+            self._selected_folder = folder, uidvalidity
+            if self.fetch_cache is not None:
+                self.fetch_cache.validate(folder, uidvalidity)
+        return out
+
+    def _process_select_response(self, resp):
+        untagged = _dict_bytes_normaliser(resp)
+        out = {}
+        for line in untagged.get('OK', []):
+            match = _RE_SELECT_RESPONSE.match(line)
+            if match:
+                key = match.group('key')
+                if key == b'PERMANENTFLAGS':
+                    out[key] = tuple(match.group('data').split())
+        for key, value in untagged.items():
+            key = key.upper()
+            if key in (b'OK', b'PERMANENTFLAGS'):
+                continue
+            if key in (b'EXISTS', b'RECENT', b'UIDNEXT', b'UIDVALIDITY',
+                b'HIGHESTMODSEQ'):
+                value = int(value[0])
+            elif key == b'READ-WRITE':
+                value = True
+            elif key == b'FLAGS':
+                value = tuple(value[0][1:-1].split())
+            out[key] = value
+        return out
 
     @require_capability('UNSELECT')
     def unselect_folder(self):
@@ -552,9 +729,12 @@ class IMAPClient:
 
         Returns the UNSELECT response string returned by the server.
         """
-        pass
+        logger.debug('< UNSELECT')
+        self._selected_folder = None
+        _typ, data = self._imap._simple_command('UNSELECT')
+        return data[0]
 
-    def noop(self):
+    def noop(self) ->Tuple[bytes, List[Any]]:
         """Execute the NOOP command.
 
         This command returns immediately, returning any server side
@@ -570,7 +750,8 @@ class IMAPClient:
               (6, b'FETCH', (b'FLAGS', (b'sne',)))])
 
         """
-        pass
+        tag = self._imap._command('NOOP')
+        return self._consume_until_tagged_response(tag, 'NOOP')
 
     @require_capability('IDLE')
     def idle(self):
@@ -655,13 +836,17 @@ class IMAPClient:
         Returns a dictionary of the status items for the folder with
         keys matching *what*.
         """
-        pass
+        what_ = _status_items(what)
+        fname = self._normalise_folder(folder)
+        data = self._command_and_check('status', fname, what_)
+        return _parse_status(data)
 
     def close_folder(self):
         """Close the currently selected folder, returning the server
         response string.
         """
-        pass
+        self._selected_folder = None
+        return self._command_and_check('close', unpack=True)
 
     def create_folder(self, folder):
         """Create *folder* on the server returning the server response string."""
@@ -687,7 +872,8 @@ class IMAPClient:
         """Unsubscribe to *folder*, returning the server response string."""
         pass
 
-    def search(self, criteria='ALL', charset=None):
+    def search(self, criteria='ALL', charset=None, compact=False, save=False
+        ):
         """Return a list of messages ids from the currently selected
         folder matching *criteria*.
 
@@ -746,8 +932,25 @@ class IMAPClient:
         to the search response (i.e. if a MODSEQ criteria was included
         in the search).
 
+        If *compact* is ``True`` the message ids are returned as a
+        :py:class:`~imapclient.response_types.CompactSearchIds` which
+        stores them in an array rather than as a list of Python ints.
+        This greatly reduces memory usage for very large results.
+
+        If *save* is ``True`` the server keeps the result instead of
+        returning it and ``None`` is returned. Later commands may then
+        refer to the matching messages by passing ``'$'`` as their
+        *messages* argument, saving the transfer of the result and
+        back again::
+
+            c.search(['FROM', 'spammer'], save=True)
+            c.move('$', 'Junk')
+
+        Combined with :py:meth:`.pipeline` the search and the commands
+        using its result are sent in one round trip. This requires the
+        SEARCHRES capability, see :rfc:`5182`.
         """
-        pass
+        return self._search(criteria, charset, compact, save)
 
     @require_capability('X-GM-EXT-1')
     def gmail_search(self, query, charset='UTF-8'):
@@ -764,7 +967,63 @@ class IMAPClient:
         See https://developers.google.com/gmail/imap_extensions#extension_of_the_search_command_x-gm-raw
         for more info.
         """
-        pass
+        return self._search([b'X-GM-RAW', query], charset)
+
+    @require_capability('ESEARCH')
+    def esearch(self, criteria='ALL', charset=None, return_=('MIN', 'MAX',
+        'COUNT', 'ALL')):
+        """Search the currently selected folder as per
+        :py:meth:`.search`, but only return the information about the
+        matching messages given by *return_*, using the extended
+        ``SEARCH RETURN (...)`` form.
+
+        *return_* is a sequence of one or more of ``'MIN'`` (the
+        lowest matching message id), ``'MAX'`` (the highest),
+        ``'COUNT'`` (the number of matches) and ``'ALL'`` (all of the
+        matching ids). A dictionary is returned, with a key for each
+        item the server returned. ``b'ALL'`` is given in the compact
+        sequence-set form used on the wire (eg. ``b'2,10:15'``); use
+        :py:func:`imapclient.sequence_set.decode` to expand it.
+        Example::
+
+            >> c.esearch(['UNSEEN'], return_=['COUNT', 'MAX'])
+            {b'COUNT': 12, b'MAX': 3411}
+
+        Keys for which there are no matches (eg. ``b'MIN'`` when
+        nothing matches) are left out. A ``b'MODSEQ'`` key is included
+        if the server returns one.
+
+        See :rfc:`4731` for more details.
+        """
+        args = [b'RETURN', to_bytes(seq_to_parenstr_upper(return_))]
+        if charset:
+            args.extend([b'CHARSET', to_bytes(charset)])
+        args.extend(_normalise_search_criteria(criteria, charset))
+        data = self._search_command(args, criteria, response_name='ESEARCH')
+        return _parse_esearch(data)
+
+    def _search(self, criteria, charset, compact=False, save=False):
+        args = _search_args(criteria, charset, save, self.has_capability)
+        data = self._search_command(args, criteria)
+        if save:
+            return None
+        return parse_message_list(data, compact=compact)
+
+    def _search_command(self, args, criteria, **kwargs):
+        try:
+            return self._raw_command_untagged(b'SEARCH', args, **kwargs)
+        except imaplib.IMAP4.error as e:
+            m = re.match('SEARCH command error: BAD \\[(.+)\\]', str(e))
+            if m:
+                raise exceptions.InvalidCriteriaError(
+                    """{original_msg}
+
+This error may have been caused by a syntax error in the criteria: {criteria}
+Please refer to the documentation for more information about search criteria syntax..
+https://imapclient.readthedocs.io/en/master/#imapclient.IMAPClient.search"""
+                    .format(original_msg=m.group(1), criteria='"%s"' %
+                    criteria if not isinstance(criteria, list) else criteria))
+            raise
 
     @require_capability('SORT')
     def sort(self, sort_criteria, criteria='ALL', charset='UTF-8'):
@@ -817,7 +1076,8 @@ class IMAPClient:
         The return value is a dictionary structured like this: ``{
         msgid1: (flag1, flag2, ... ), }``.
         """
-        pass
+        response = self.fetch(messages, ['FLAGS'])
+        return self._filter_fetch_dict(response, b'FLAGS')
 
     def add_flags(self, messages, flags, silent=False):
         """Add *flags* to *messages* in the currently selected folder.
@@ -827,7 +1087,7 @@ class IMAPClient:
         Returns the flags set for each modified message (see
         *get_flags*), or None if *silent* is true.
         """
-        pass
+        return self._store(b'+FLAGS', messages, flags, b'FLAGS', silent=silent)
 
     def remove_flags(self, messages, flags, silent=False):
         """Remove one or more *flags* from *messages* in the currently
@@ -838,7 +1098,7 @@ class IMAPClient:
         Returns the flags set for each modified message (see
         *get_flags*), or None if *silent* is true.
         """
-        pass
+        return self._store(b'-FLAGS', messages, flags, b'FLAGS', silent=silent)
 
     def set_flags(self, messages, flags, silent=False):
         """Set the *flags* for *messages* in the currently selected
@@ -849,7 +1109,7 @@ class IMAPClient:
         Returns the flags set for each modified message (see
         *get_flags*), or None if *silent* is true.
         """
-        pass
+        return self._store(b'FLAGS', messages, flags, b'FLAGS', silent=silent)
 
     def get_gmail_labels(self, messages):
         """Return the label set for each message in *messages* in the
@@ -913,7 +1173,8 @@ class IMAPClient:
         """
         pass
 
-    def fetch(self, messages, data, modifiers=None):
+    def fetch(self, messages: Any, data: Any, modifiers: Any=None) ->Dict[
+        int, Dict[bytes, Any]]:
         """Retrieve selected *data* associated with one or more
         *messages* in the currently selected folder.
 
@@ -940,7 +1201,8 @@ class IMAPClient:
         returned for each message also contains a *SEQ* key containing
         the sequence number for the message. This allows for mapping
         between the UID and sequence number (when the *use_uid*
-        property is ``True``).
+        property is ``True``). Messages served entirely from the
+        *fetch_cache* have no *SEQ* entry.
 
         Example::
 
@@ -953,13 +1215,252 @@ class IMAPClient:
                     b'SEQ': 110}}
 
         """
-        pass
+        if not isinstance(messages, (int, str, bytes)):
+            # Iterated more than once below.
+            messages = list(messages)
+        if not messages:
+            return {}
+        if self._selected_folder is not None and self.fetch_cache is not None:
+            items = [item.upper() for item in normalise_text_list(data)]
+            cached = _cached_fetch_items(items, self.normalise_times)
+            uids = _cacheable_uids(messages)
+            if self.use_uid and not modifiers and cached and uids:
+                return self._fetch_cached(uids, items, cached)
+        return self._fetch_uncached(messages, data, modifiers)
+
+    def _fetch_uncached(self, messages, data, modifiers):
+        if self.fetch_parse_executor is not None:
+            return self._fetch_with_executor(messages, data, modifiers)
+        data = self._fetch_response(messages, data, modifiers)
+        return self._parse_fetch_response(data)
+
+    def _fetch_cached(self, uids, items, cached):
+        folder, uidvalidity = self._selected_folder
+        cache = self.fetch_cache
+        keys = list(cached.values())
+        hits = cache.get_many(folder, uidvalidity, uids, keys)
+        misses = [uid for uid in uids if uid not in hits]
+        out = defaultdict(dict)
+        if misses:
+            fetched = self._fetch_uncached(misses, items, None)
+            cache.put_many(folder, uidvalidity, {uid: {key: msg_data[key] for
+                key in keys if key in msg_data} for uid, msg_data in
+                fetched.items()})
+            out.update(fetched)
+        if not hits:
+            return out
+        rest = [item for item in items if item not in cached]
+        if not rest:
+            # Nothing to ask the server for, so these aren't checked
+            # against the folder's current contents.
+            out.update(hits)
+            return out
+        for uid, msg_data in self._fetch_uncached(sorted(hits), rest, None
+            ).items():
+            msg_data.update(hits.get(uid, {}))
+            out[uid] = msg_data
+        return out
+
+    def fetch_batched(self, messages, data, modifiers=None, batch_size=
+        'auto', target_bytes=_FETCH_BATCH_TARGET_BYTES):
+        """Retrieve selected *data* associated with *messages* as per
+        :py:meth:`.fetch`, using a series of FETCH commands which each
+        cover a range of the message ids (sorted, if they are all
+        ints).
+
+        This keeps the length of each command and the size of each
+        response bounded when fetching from very large numbers of
+        messages. The results of all the commands are merged and
+        returned in the same form as ``fetch()``.
+
+        *batch_size* gives the number of messages to request per
+        command. If it is ``'auto'`` (the default) the batch size is
+        adjusted after each command, based on the size of the responses
+        seen so far, so that each response is around *target_bytes*
+        long.
+        """
+        if isinstance(messages, (int, str, bytes)):
+            return self.fetch(messages, data, modifiers)
+        messages = list(dict.fromkeys(messages))
+        if not messages:
+            return {}
+        if all(isinstance(msg, int) for msg in messages):
+            messages.sort()
+        if batch_size == 'auto':
+            batches = _adaptive_batches(messages, target_bytes)
+        else:
+            batches = chunk(messages, batch_size)
+        out = defaultdict(dict)
+        response_size = None
+        while True:
+            try:
+                batch = batches.send(response_size)
+            except StopIteration:
+                return out
+            resp = self._fetch_response(batch, data, modifiers)
+            response_size = _fetch_response_size(resp)
+            parsed = self._parse_fetch_response(resp)
+            for msgid, msg_data in parsed.items():
+                out[msgid].update(msg_data)
+
+    def _fetch_response(self, messages, data, modifiers):
+        return self._finish_fetch(self._start_fetch(messages, data, modifiers))
+
+    def _finish_fetch(self, tag):
+        self._imap.memoryview_literals = self.memoryview_literals
+        try:
+            typ, data = self._imap._command_complete('FETCH', tag)
+        finally:
+            self._imap.memoryview_literals = False
+        self._checkok('fetch', typ, data)
+        typ, data = self._imap._untagged_response(typ, data, 'FETCH')
+        return data
+
+    def fetch_body_stream(self, msgid, section='', chunk_size=
+        _BODY_STREAM_CHUNK_SIZE, prefetch=False, peek=True):
+        """Return a read-only file-like :py:class:`BodyStream` giving
+        the body of message *msgid* (or the part of it given by
+        *section*, eg. ``'1.2'`` or ``'HEADER'``).
+
+        The data is fetched on demand with successive partial fetches
+        (``BODY[section]<offset.chunk_size>``), so messages of any size
+        can be copied elsewhere in constant memory::
+
+            with client.fetch_body_stream(uid) as body:
+                shutil.copyfileobj(body, destination)
+
+        If *prefetch* is True the request for the next chunk is sent as
+        soon as a chunk arrives, so the server can send it while the
+        current chunk is being consumed. No other commands may be
+        issued on the client until the stream is exhausted or closed.
+
+        ``BODY.PEEK`` is used unless *peek* is False, so the message
+        isn't marked as seen.
+        """
+        return BodyStream(self, msgid, section, chunk_size, prefetch, peek)
+
+    def _fetch_with_executor(self, messages, data, modifiers):
+        imap = self._imap
+        parse = functools.partial(parse_fetch_response, normalise_times=
+            self.normalise_times, uid_is_key=self.use_uid)
+        futures = []
+        pending = []
+        pending_count = 0
+        tag = self._start_fetch(messages, data, modifiers)
+        try:
+            while imap.tagged_commands[tag] is None:
+                imap._check_bye()
+                imap._get_response()
+                responses = imap.untagged_responses.pop('FETCH', None)
+                if not responses:
+                    continue
+                # Each read adds all the parts of one FETCH response so
+                # batches never split a message's data.
+                pending.extend(responses)
+                pending_count += 1
+                if pending_count >= self.fetch_parse_batch_size:
+                    futures.append(self.fetch_parse_executor.submit(parse,
+                        pending))
+                    pending = []
+                    pending_count = 0
+            typ, data = imap._command_complete('FETCH', tag)
+            self._checkok('fetch', typ, data)
+            if pending:
+                futures.append(self.fetch_parse_executor.submit(parse, pending)
+                    )
+            out = defaultdict(dict)
+            for future in futures:
+                for msgid, msg_data in future.result().items():
+                    out[msgid].update(msg_data)
+            return out
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    def _parse_fetch_response(self, data):
+        return parse_fetch_response(data, self.normalise_times, self.
+            use_uid, self.lazy_fetch_structures)
+
+    def pipeline(self):
+        """Return a :py:class:`Pipeline` which sends several commands
+        to the server without waiting for each to complete first.
+
+        This saves a network round trip per command, which matters on
+        high latency links. For example, to select a folder and get the
+        status of many others in one round trip::
+
+            with client.pipeline() as p:
+                p.select_folder('INBOX')
+                statuses = [p.folder_status(f) for f in folders]
+
+        No other commands may be issued on the client while the
+        pipeline is being executed.
+        """
+        return Pipeline(self)
+
+    def iter_fetch(self, messages, data, modifiers=None):
+        """Retrieve selected *data* associated with one or more
+        *messages* in the currently selected folder, yielding
+        ``(msgid, data)`` pairs as the server's FETCH responses arrive.
+
+        The arguments and the structure of each yielded pair are as
+        per :py:meth:`.fetch`. Unlike ``fetch()``, each response is
+        parsed as soon as it has been read from the connection so
+        processing can start before the whole response has been
+        received and memory use doesn't grow with the number of
+        messages. If the server sends more than one FETCH response for
+        a message, the message will be yielded more than once.
+
+        No other commands may be issued until the iteration is
+        finished. If the generator is closed early, the remaining
+        responses for the command are read and discarded.
+
+        Example::
+
+            >> for msgid, data in c.iter_fetch(messages, ['RFC822']):
+            ..     index(msgid, data[b'RFC822'])
+
+        """
+        if not messages:
+            return
+        imap = self._imap
+        tag = self._start_fetch(messages, data, modifiers)
+        try:
+            while imap.tagged_commands[tag] is None:
+                imap._check_bye()
+                imap.memoryview_literals = self.memoryview_literals
+                try:
+                    imap._get_response()
+                finally:
+                    imap.memoryview_literals = False
+                responses = imap.untagged_responses.pop('FETCH', None)
+                if responses:
+                    yield from self._parse_fetch_response(responses).items()
+        except GeneratorExit:
+            while imap.tagged_commands[tag] is None:
+                imap._get_response()
+                imap.untagged_responses.pop('FETCH', None)
+            imap._command_complete('FETCH', tag)
+            raise
+        typ, data = imap._command_complete('FETCH', tag)
+        self._checkok('fetch', typ, data)
+
+    def _start_fetch(self, messages, data, modifiers):
+        args = ['FETCH', join_message_ids(messages), seq_to_parenstr_upper(
+            data), seq_to_parenstr_upper(modifiers) if modifiers else None]
+        if self.use_uid:
+            args.insert(0, 'UID')
+        return self._imap._command(*args)
 
     def append(self, folder, msg, flags=(), msg_time=None):
         """Append a message to *folder*.
 
         *msg* should be a string contains the full message including
-        headers.
+        headers. Large messages may instead be given as a binary file
+        object, or as a :py:class:`MessageStream`, in which case the
+        message is streamed to the server from the file or chunks
+        without being loaded into memory.
 
         *flags* should be a sequence of message flags to set. If not
         specified no flags will be set.
@@ -972,7 +1473,23 @@ class IMAPClient:
 
         Returns the APPEND response as returned by the server.
         """
-        pass
+        if msg_time:
+            time_val = '"%s"' % datetime_to_INTERNALDATE(msg_time)
+            time_val = to_unicode(time_val)
+        else:
+            time_val = None
+        if _is_stream(msg):
+            args = [self._normalise_folder(folder), to_bytes(
+                seq_to_parenstr(flags))]
+            if time_val:
+                args.append(to_bytes(time_val))
+            args.append(MessageStream.of(msg))
+            typ, data = self._raw_command(b'APPEND', args, uid=False)
+            self._checkok('append', typ, data)
+            return data[0]
+        return self._command_and_check('append', self._normalise_folder(
+            folder), seq_to_parenstr(flags), time_val, to_bytes(msg),
+            unpack=True)
 
     @require_capability('MULTIAPPEND')
     def multiappend(self, folder, msgs):
@@ -982,18 +1499,66 @@ class IMAPClient:
         full message including headers, or a dict containing the keys "msg" with the
         full message as before, "flags" with a sequence of message flags to set, and
         "date" with a datetime instance specifying the internal date to set.
-        The keys "flags" and "date" are optional.
+        The keys "flags" and "date" are optional. Messages may be given as
+        file objects or :py:class:`MessageStream` instances, as per
+        :py:meth:`.append`.
 
         Returns the APPEND response from the server.
         """
-        pass
+        args = [self._normalise_folder(folder)]
+        for m in msgs:
+            args.extend(_append_args(m)[0])
+        return self._raw_command(b'APPEND', args, uid=False)
+
+    def bulk_append(self, folder, msgs, max_batch_bytes=
+        _BULK_APPEND_BATCH_BYTES, progress=None):
+        """Append a large number of messages to *folder*.
+
+        *msgs* may be any iterable, including a generator, of messages
+        in the forms accepted by :py:meth:`.multiappend`. Messages are
+        consumed as they are sent, so only one batch is held at a time.
+
+        If the server supports MULTIAPPEND (:rfc:`3502`) messages are
+        grouped into APPEND commands carrying up to *max_batch_bytes*
+        of message data each (a larger message is sent on its own).
+        Otherwise each message is sent with its own APPEND command.
+        Literals are sent without waiting for the server's go-ahead
+        when it supports LITERAL+.
+
+        If *progress* is given it is called with an
+        :py:class:`AppendProgress` after each command completes.
+
+        Returns a list with an entry for each message, in order. If the
+        server supports UIDPLUS (:rfc:`4315`) each entry is a
+        ``(uidvalidity, uid)`` tuple taken from the APPENDUID response,
+        otherwise it is None.
+        """
+        folder = self._normalise_folder(folder)
+        if not self.has_capability('MULTIAPPEND'):
+            max_batch_bytes = 0
+        results = []
+        sent = AppendProgress(0, 0, 0.0)
+        started = time.monotonic()
+        for batch in _append_batches(msgs, max_batch_bytes):
+            args = [folder]
+            for msg_args, _ in batch:
+                args.extend(msg_args)
+            typ, data = self._raw_command(b'APPEND', args, uid=False)
+            self._checkok('append', typ, data)
+            results.extend(_parse_appenduid(data[0], len(batch)))
+            sent = AppendProgress(sent.messages + len(batch), sent.bytes +
+                sum(size for _, size in batch), time.monotonic() - started)
+            if progress is not None:
+                progress(sent)
+        return results
 
     def copy(self, messages, folder):
         """Copy one or more messages from the current folder to
         *folder*. Returns the COPY response string returned by the
         server.
         """
-        pass
+        return self._command_and_check('copy', join_message_ids(messages),
+            self._normalise_folder(folder), uid=True, unpack=True)
 
     @require_capability('MOVE')
     def move(self, messages, folder):
@@ -1004,7 +1569,8 @@ class IMAPClient:
         :param messages: List of message UIDs to move.
         :param folder: The destination folder name.
         """
-        pass
+        return self._raw_command_untagged(b'MOVE', [join_message_ids(
+            messages), self._normalise_folder(folder)], uid=True, unpack=True)
 
     def expunge(self, messages=None):
         """Use of the *messages* argument is discouraged.
@@ -1109,12 +1675,41 @@ class IMAPClient:
         """
         pass
 
+    def _checkok(self, command, typ, data):
+        self._check_resp('OK', command, typ, data)
+
     def _check_resp(self, expected, command, typ, data):
         """Check command responses for errors.
 
         Raises IMAPClient.Error if the command fails.
         """
-        pass
+        if typ != expected:
+            raise exceptions.IMAPClientError('%s failed: %s' % (command,
+                to_unicode(data[0])))
+
+    def _consume_until_tagged_response(self, tag, command):
+        tagged_commands = self._imap.tagged_commands
+        resps = []
+        while True:
+            line = self._imap._get_response()
+            if tagged_commands[tag]:
+                break
+            resps.append(_parse_untagged_response(line))
+        typ, data = tagged_commands.pop(tag)
+        self._checkok(command, typ, data)
+        return data[0], resps
+
+    def _raw_command_untagged(self, command, args, response_name=None,
+        unpack=False, uid=True):
+        typ, data = self._raw_command(command, args, uid=uid)
+        if response_name is None:
+            response_name = command
+        typ, data = self._imap._untagged_response(typ, data, to_unicode(
+            response_name))
+        self._checkok(to_unicode(command), typ, data)
+        if unpack:
+            return data[0]
+        return data
 
     def _raw_command(self, command, args, uid=True):
         """Run the specific command with the arguments given. 8-bit arguments
@@ -1127,18 +1722,130 @@ class IMAPClient:
         *command* should be specified as bytes.
         *args* should be specified as a list of bytes.
         """
-        pass
+        command = command.upper()
+        if isinstance(args, tuple):
+            args = list(args)
+        if not isinstance(args, list):
+            args = [args]
+        tag = self._imap._new_tag()
+        prefix = [to_bytes(tag)]
+        if uid and self.use_uid:
+            prefix.append(b'UID')
+        prefix.append(command)
+        line = []
+        for item, is_last in _iter_with_last(prefix + args):
+            if not isinstance(item, (bytes, MessageStream)):
+                raise ValueError('command args must be passed as bytes')
+            if isinstance(item, MessageStream) or _is8bit(item):
+                if line:
+                    out = b' '.join(line)
+                    logger.debug('> %s', out)
+                    self._imap.send(out)
+                    line = []
+                if isinstance(item, _quoted):
+                    item = item.original
+                self._send_literal(tag, item)
+                if not is_last:
+                    self._imap.send(b' ')
+            else:
+                line.append(item)
+        if line:
+            out = b' '.join(line)
+            logger.debug('> %s', out)
+            self._imap.send(out)
+        self._imap.send(b'\r\n')
+        return self._imap._command_complete(to_unicode(command), tag)
 
     def _send_literal(self, tag, item):
-        """Send a single literal for the command with *tag*."""
-        pass
+        """Send a single literal for the command with *tag*.
+
+        *item* may be bytes or a :py:class:`MessageStream`.
+        """
+        is_stream = isinstance(item, MessageStream)
+        size = item.size if is_stream else len(item)
+        if self._can_send_non_sync_literal(size):
+            out = b' {' + str(size).encode('ascii') + b'+}\r\n'
+            if not is_stream:
+                out += item
+            logger.debug('> %s', debug_trunc(out, 64))
+            self._imap.send(out)
+        else:
+            out = b' {' + str(size).encode('ascii') + b'}\r\n'
+            logger.debug('> %s', out)
+            self._imap.send(out)
+            while self._imap._get_response():
+                tagged_resp = self._imap.tagged_commands.get(tag)
+                if tagged_resp:
+                    raise exceptions.IMAPClientAbortError(
+                        'unexpected response while waiting for continuation response: '
+                         + repr(tagged_resp))
+            if not is_stream:
+                logger.debug('   (literal) > %s', debug_trunc(item, 256))
+                self._imap.send(item)
+        if is_stream:
+            logger.debug('   (literal) > <%d bytes streamed>', size)
+            self._send_stream(item)
+
+    def _can_send_non_sync_literal(self, size):
+        """Return True if a literal of *size* bytes may be sent without
+        waiting for a continuation response (:rfc:`7888`).
+        """
+        capabilities = self._cached_capabilities or ()
+        return b'LITERAL+' in capabilities or (b'LITERAL-' in capabilities and
+            size <= 4096)
+
+    def _send_stream(self, stream):
+        sock = getattr(self._imap, 'sock', None)
+        if isinstance(sock, socket.socket) and stream.fileno() is not None:
+            # sendfile() avoids copying the data through Python for plain
+            # connections, falling back to a send loop for TLS.
+            sent = sock.sendfile(stream.source, stream.source.tell(), stream.
+                size)
+            if sent != stream.size:
+                raise exceptions.IMAPClientAbortError(
+                    'message stream ended %d bytes short of %d' % (stream.
+                    size - sent, stream.size))
+            return
+        for data in stream.chunks():
+            self._imap.send(data)
+
+    def _command_and_check(self, command, *args, unpack: bool=False, uid:
+        bool=False):
+        if uid and self.use_uid:
+            command = to_unicode(command)
+            typ, data = self._imap.uid(command, *args)
+        else:
+            meth = getattr(self._imap, to_unicode(command))
+            typ, data = meth(*args)
+        self._checkok(command, typ, data)
+        if unpack:
+            return data[0]
+        return data
 
     def _store(self, cmd, messages, flags, fetch_key, silent):
         """Worker function for the various flag manipulation methods.
 
         *cmd* is the STORE command to use (eg. '+FLAGS').
         """
-        pass
+        if not messages:
+            return {}
+        if silent:
+            cmd += b'.SILENT'
+        data = self._command_and_check('store', join_message_ids(messages),
+            cmd, seq_to_parenstr(flags), uid=True)
+        if silent:
+            return None
+        return self._filter_fetch_dict(parse_fetch_response(data), fetch_key)
+
+    def _filter_fetch_dict(self, fetch_dict, key):
+        return dict((msgid, data[key]) for msgid, data in fetch_dict.items())
+
+    def _normalise_folder(self, folder_name):
+        if isinstance(folder_name, bytes):
+            folder_name = folder_name.decode('ascii')
+        if self.folder_encode:
+            folder_name = encode_utf7(folder_name)
+        return _quote(folder_name)
 
     @property
     def welcome(self):
@@ -1146,6 +1853,497 @@ class IMAPClient:
         pass
 
 
+class BodyStream(io.RawIOBase):
+    """A message body read with successive partial fetches, as returned
+    by :py:meth:`IMAPClient.fetch_body_stream`.
+    """
+
+    def __init__(self, client, msgid, section, chunk_size, prefetch, peek):
+        super().__init__()
+        self._client = client
+        self._msgid = msgid
+        self._item = '%s[%s]' % ('BODY.PEEK' if peek else 'BODY', section)
+        self._key = to_bytes('BODY[%s]' % section).upper()
+        self._chunk_size = chunk_size
+        self._prefetch = prefetch
+        self._offset = 0
+        self._chunk = memoryview(b'')
+        self._pos = 0
+        self._eof = False
+        self._pending = None
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def tell(self):
+        """Return the number of bytes read so far."""
+        return self._position
+
+    def readinto(self, b):
+        if self.closed:
+            raise ValueError('I/O operation on closed stream')
+        while self._pos == len(self._chunk):
+            if self._eof:
+                return 0
+            self._next_chunk()
+        n = min(len(b), len(self._chunk) - self._pos)
+        b[:n] = self._chunk[self._pos:self._pos + n]
+        self._pos += n
+        self._position += n
+        return n
+
+    def close(self):
+        if not self.closed and self._pending is not None:
+            # The prefetched response must be read before other commands
+            # can be issued.
+            tag, self._pending = self._pending, None
+            try:
+                self._client._finish_fetch(tag)
+            finally:
+                super().close()
+            return
+        super().close()
+
+    def _start_chunk(self):
+        item = '%s<%d.%d>' % (self._item, self._offset, self._chunk_size)
+        tag = self._client._start_fetch([self._msgid], [item], None)
+        self._offset += self._chunk_size
+        return tag
+
+    def _next_chunk(self):
+        tag, self._pending = self._pending, None
+        if tag is None:
+            tag = self._start_chunk()
+        offset = self._offset - self._chunk_size
+        parsed = self._client._parse_fetch_response(self._client.
+            _finish_fetch(tag))
+        msg = parsed.get(self._msgid)
+        if msg is None:
+            raise exceptions.IMAPClientError('message %s not found' % self.
+                _msgid)
+        key = self._key + b'<%d>' % offset
+        data = msg.get(key)
+        if data is None:
+            # Servers may not echo the section name in the same case.
+            data = next((value for name, value in msg.items() if name.
+                upper() == key), None)
+        data = data or b''
+        self._chunk = memoryview(data)
+        self._pos = 0
+        if len(data) < self._chunk_size:
+            self._eof = True
+        elif self._prefetch:
+            self._pending = self._start_chunk()
+
+
+class PipelineResult:
+    """The result of a command queued on a :py:class:`Pipeline`.
+
+    Once the pipeline has been executed *value* gives the value the
+    equivalent IMAPClient method would have returned, or raises the
+    error it would have raised.
+    """
+
+    def __init__(self):
+        self._value = _not_present
+        self._error = None
+
+    @property
+    def value(self):
+        if self._error is not None:
+            raise self._error
+        if self._value is _not_present:
+            raise exceptions.IllegalStateError(
+                'pipeline has not been executed')
+        return self._value
+
+    @property
+    def ok(self):
+        """True if the command completed successfully."""
+        return self._value is not _not_present and self._error is None
+
+
+class Pipeline:
+    """Queue several commands and send them to the server together,
+    without waiting for each command to complete before sending the
+    next. Created using :py:meth:`IMAPClient.pipeline`.
+
+    Each queuing method takes the same arguments as the IMAPClient
+    method with the same name and returns a :py:class:`PipelineResult`.
+    The commands are sent when the ``with`` block exits (or when
+    :py:meth:`execute` is called) and the results are filled in as the
+    responses arrive::
+
+        with client.pipeline() as p:
+            statuses = {f: p.folder_status(f, ['UIDNEXT']) for f in folders}
+        for folder, status in statuses.items():
+            print(folder, status.value)
+
+    A failed command only affects its own result. The commands are
+    still executed in order by the server.
+
+    With ``search(..., save=True)`` (see :py:meth:`IMAPClient.search`)
+    later commands in the same pipeline can act on the search result
+    by passing ``'$'`` as their messages, without waiting for it::
+
+        with client.pipeline() as p:
+            p.search(['UNSEEN', 'FROM', 'alice'], save=True)
+            headers = p.fetch('$', ['ENVELOPE'])
+            p.add_flags('$', [SEEN], silent=True)
+
+    The results of ``copy`` and ``move`` are ``None``.
+
+    Untagged responses are assigned to the earliest command that
+    hasn't completed yet, which relies on the server not interleaving
+    the responses of commands whose responses could be confused (see
+    :rfc:`3501#section-5.5`). For the same reason, when message
+    sequence numbers are in use (*use_uid* is False) FETCH, STORE,
+    SEARCH and COPY may only be queued after other FETCH, STORE, SEARCH
+    and COPY commands, and arguments which must be sent as literals aren't
+    supported.
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self._calls = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.execute()
+
+    def select_folder(self, folder, readonly=False):
+        client = self._client
+        client._selected_folder = None
+
+        def process(untagged):
+            # Keep imaplib's state in step, as IMAP4.select() does.
+            client._imap.state = 'SELECTED'
+            client._imap.is_readonly = readonly
+            return client._folder_selected(folder, untagged)
+
+        def failed():
+            client._imap.state = 'AUTH'
+        return self._queue('EXAMINE' if readonly else 'SELECT', [client.
+            _normalise_folder(folder)], process, failed=failed)
+
+    def folder_status(self, folder, what=None):
+        return self._queue('STATUS', [self._client._normalise_folder(folder
+            ), _status_items(what)], lambda untagged: _parse_status(
+            untagged.get('STATUS', [])))
+
+    def search(self, criteria='ALL', charset=None, save=False):
+        args = _search_args(criteria, charset, save, self._client.
+            has_capability)
+        if save:
+            return self._queue('SEARCH', args, lambda untagged: None, uid=True)
+        return self._queue('SEARCH', args, lambda untagged:
+            parse_message_list(untagged.get('SEARCH', [b''])[-1:]), uid=True)
+
+    def fetch(self, messages, data, modifiers=None):
+        args = [join_message_ids(messages), seq_to_parenstr_upper(data)]
+        if modifiers:
+            args.append(seq_to_parenstr_upper(modifiers))
+        return self._queue('FETCH', args, lambda untagged: self._client.
+            _parse_fetch_response(untagged.get('FETCH', [])), uid=True)
+
+    def copy(self, messages, folder):
+        return self._queue('COPY', [join_message_ids(messages), self.
+            _client._normalise_folder(folder)], lambda untagged: None, uid=True)
+
+    def move(self, messages, folder):
+        if not self._client.has_capability('MOVE'):
+            raise exceptions.CapabilityError(
+                'Server does not support MOVE capability')
+        return self._queue('MOVE', [join_message_ids(messages), self.
+            _client._normalise_folder(folder)], lambda untagged: None, uid=True)
+
+    def add_flags(self, messages, flags, silent=False):
+        return self._store(b'+FLAGS', messages, flags, silent)
+
+    def remove_flags(self, messages, flags, silent=False):
+        return self._store(b'-FLAGS', messages, flags, silent)
+
+    def set_flags(self, messages, flags, silent=False):
+        return self._store(b'FLAGS', messages, flags, silent)
+
+    def _store(self, cmd, messages, flags, silent):
+        if silent:
+            cmd += b'.SILENT'
+
+        def process(untagged):
+            if silent:
+                return None
+            return self._client._filter_fetch_dict(parse_fetch_response(
+                untagged.get('FETCH', [])), b'FLAGS')
+        return self._queue('STORE', [join_message_ids(messages), cmd,
+            seq_to_parenstr(flags)], process, uid=True)
+
+    def _queue(self, command, args, process, uid=False, failed=None):
+        args = [to_bytes(arg) for arg in args]
+        if any(_is8bit(arg) for arg in args):
+            raise ValueError("can't pipeline %s with 8-bit arguments" %
+                command)
+        uid = uid and self._client.use_uid
+        if command in _SEQUENCE_SET_COMMANDS and not uid:
+            for call in self._calls:
+                if call.command not in _SEQUENCE_SET_COMMANDS:
+                    raise ValueError(
+                        "can't pipeline %s using sequence numbers after %s" %
+                        (command, call.command))
+        result = PipelineResult()
+        self._calls.append(_PipelineCall(command, args, uid, process,
+            result, failed))
+        return result
+
+    def execute(self):
+        """Send the queued commands and wait for all of them to
+        complete, filling in their results.
+        """
+        calls, self._calls = self._calls, []
+        if not calls:
+            return
+        imap = self._client._imap
+        for typ in ('OK', 'NO', 'BAD'):
+            imap.untagged_responses.pop(typ, None)
+        out = []
+        for call in calls:
+            call.tag = imap._new_tag()
+            prefix = [call.tag, b'UID'] if call.uid else [call.tag]
+            out.append(b' '.join(prefix + [to_bytes(call.command)] + call.
+                args) + b'\r\n')
+        out = b''.join(out)
+        logger.debug('> %s', debug_trunc(out, 256))
+        imap.send(out)
+        for call in calls:
+            untagged = {}
+            while imap.tagged_commands[call.tag] is None:
+                imap._get_response()
+                _take_untagged(imap.untagged_responses, untagged)
+            typ, data = imap.tagged_commands.pop(call.tag)
+            call.complete(typ, data, untagged)
+
+
+_SEQUENCE_SET_COMMANDS = 'FETCH', 'STORE', 'SEARCH', 'COPY'
+
+
+class _PipelineCall:
+
+    def __init__(self, command, args, uid, process, result, failed=None):
+        self.command = command
+        self.args = args
+        self.uid = uid
+        self.process = process
+        self.result = result
+        self.failed = failed
+        self.tag = None
+
+    def complete(self, typ, data, untagged):
+        if typ != 'OK':
+            if self.failed is not None:
+                self.failed()
+            self.result._error = exceptions.IMAPClientError('%s failed: %s' %
+                (self.command.lower(), to_unicode(data[0])))
+            return
+        try:
+            self.result._value = self.process(untagged)
+        except exceptions.IMAPClientError as e:
+            self.result._error = e
+
+
+def _parse_untagged_response(text):
+    assert_imap_protocol(text.startswith(b'* '))
+    text = text[2:]
+    if text.startswith((b'OK ', b'NO ')):
+        return tuple(text.split(b' ', 1))
+    return parse_response([text])
+
+
+def _take_untagged(source, dest):
+    for key, value in source.items():
+        dest.setdefault(key, []).extend(value)
+    source.clear()
+
+
+def _status_items(what):
+    if what is None:
+        what = 'MESSAGES', 'RECENT', 'UIDNEXT', 'UIDVALIDITY', 'UNSEEN'
+    else:
+        what = normalise_text_list(what)
+    return '(%s)' % ' '.join(what)
+
+
+def _parse_status(data):
+    response = parse_response(data)
+    status_items = response[-1]
+    return dict(as_pairs(status_items))
+
+
+def _quote(arg):
+    if isinstance(arg, str):
+        arg = arg.replace('\\', '\\\\')
+        arg = arg.replace('"', '\\"')
+        q = '"'
+    else:
+        arg = arg.replace(b'\\', b'\\\\')
+        arg = arg.replace(b'"', b'\\"')
+        q = b'"'
+    return q + arg + q
+
+
+def _normalise_search_criteria(criteria: Any, charset: Optional[str]=None
+                               ) ->List[bytes]:
+    if not criteria:
+        raise exceptions.InvalidCriteriaError('no criteria specified')
+    if not charset:
+        charset = 'us-ascii'
+    if isinstance(criteria, (str, bytes)):
+        return [to_bytes(criteria, charset)]
+    out = []
+    for item in criteria:
+        if isinstance(item, int):
+            out.append(str(item).encode('ascii'))
+        elif isinstance(item, (datetime, date)):
+            out.append(format_criteria_date(item))
+        elif isinstance(item, (list, tuple)):
+            inner = _normalise_search_criteria(item)
+            inner[0] = b'(' + inner[0]
+            inner[-1] = inner[-1] + b')'
+            out.extend(inner)
+        else:
+            out.append(_quoted.maybe(to_bytes(item, charset)))
+    return out
+
+
+class MessageStream:
+    """A message to be sent to the server without first being loaded
+    into memory, for :py:meth:`IMAPClient.append` and
+    :py:meth:`IMAPClient.multiappend`.
+
+    *source* is either a binary file object or an iterable of bytes
+    chunks. *size* is the number of bytes that will be sent. It may be
+    omitted for files whose size can be found, in which case everything
+    from the file's current position to its end is sent.
+    """
+    chunk_size = 64 * 1024
+
+    def __init__(self, source, size=None):
+        if size is None:
+            size = _remaining_size(source)
+        self.source = source
+        self.size = size
+
+    @classmethod
+    def of(cls, msg):
+        if isinstance(msg, cls):
+            return msg
+        return cls(msg)
+
+    def fileno(self):
+        """Return the file descriptor of the source if it is a file on
+        the local filesystem, otherwise None.
+        """
+        try:
+            return self.source.fileno()
+        except (AttributeError, OSError, ValueError):
+            return None
+
+    def chunks(self):
+        """Yield the data in chunks, checking that exactly *size* bytes
+        are produced.
+        """
+        remaining = self.size
+        if hasattr(self.source, 'read'):
+            while remaining:
+                data = self.source.read(min(self.chunk_size, remaining))
+                if not data:
+                    break
+                remaining -= len(data)
+                yield data
+        else:
+            for data in self.source:
+                if len(data) > remaining:
+                    raise exceptions.IMAPClientAbortError(
+                        'message stream is longer than %d bytes' % self.size)
+                remaining -= len(data)
+                yield data
+        if remaining:
+            raise exceptions.IMAPClientAbortError(
+                'message stream ended %d bytes short of %d' % (remaining,
+                self.size))
+
+
+def _append_args(msg):
+    """Return the APPEND arguments for a message given in one of the
+    forms accepted by multiappend(), and the size of its data.
+    """
+    args = []
+    if isinstance(msg, dict):
+        if 'flags' in msg:
+            args.append(to_bytes(seq_to_parenstr(msg['flags'])))
+        if 'date' in msg:
+            args.append(to_bytes('"%s"' % datetime_to_INTERNALDATE(msg[
+                'date'])))
+        msg = msg['msg']
+    if _is_stream(msg):
+        msg = MessageStream.of(msg)
+        size = msg.size
+    else:
+        msg = _literal(to_bytes(msg))
+        size = len(msg)
+    args.append(msg)
+    return args, size
+
+
+def _append_batches(msgs, max_bytes):
+    batch = []
+    batch_bytes = 0
+    for msg in msgs:
+        args, size = _append_args(msg)
+        if batch and batch_bytes + size > max_bytes:
+            yield batch
+            batch = []
+            batch_bytes = 0
+        batch.append((args, size))
+        batch_bytes += size
+    if batch:
+        yield batch
+
+
+def _parse_appenduid(text, count):
+    match = _RE_APPENDUID.search(to_bytes(text))
+    if not match:
+        return [None] * count
+    uidvalidity = int(match.group(1))
+    uids = decode_sequence_set(match.group(2))
+    if len(uids) != count:
+        return [None] * count
+    return [(uidvalidity, uid) for uid in uids]
+
+
+def _is_stream(msg):
+    return isinstance(msg, MessageStream) or hasattr(msg, 'read')
+
+
+def _remaining_size(source):
+    try:
+        return os.fstat(source.fileno()).st_size - source.tell()
+    except (AttributeError, OSError, ValueError):
+        pass
+    try:
+        if source.seekable():
+            pos = source.tell()
+            end = source.seek(0, io.SEEK_END)
+            source.seek(pos)
+            return end - pos
+    except AttributeError:
+        pass
+    raise ValueError('size must be given for %r' % (source,))
+
+
 class _literal(bytes):
     """Hold message data that should always be sent as a literal."""
 
@@ -1158,6 +2356,8 @@ class _quoted(bytes):
     They should be created via the *maybe* classmethod.
     """
 
+    original: bytes
+
     @classmethod
     def maybe(cls, original):
         """Maybe quote a bytes value.
@@ -1168,14 +2368,188 @@ class _quoted(bytes):
         holds the quoted version of the input while also providing
         access to the original unquoted source.
         """
-        pass
+        quoted = original.replace(b'\\', b'\\\\')
+        quoted = quoted.replace(b'"', b'\\"')
+        if quoted != original or b' ' in quoted or not quoted:
+            out = cls(b'"' + quoted + b'"')
+            out.original = original
+            return out
+        return original
+
+
+def _adaptive_batches(messages, target_bytes):
+    """Yield successive slices of *messages* for fetch_batched().
+
+    The size in bytes of the response for each slice should be passed
+    back using send(). Subsequent slices are sized using the average
+    response size per message seen so far, aiming for responses of
+    around *target_bytes*.
+    """
+    size = _FETCH_BATCH_INITIAL_SIZE
+    total_messages = total_bytes = 0
+    pos = 0
+    while pos < len(messages):
+        batch = messages[pos:pos + size]
+        pos += len(batch)
+        response_size = yield batch
+        total_messages += len(batch)
+        total_bytes += response_size or 0
+        max_size = min(len(batch) * _FETCH_BATCH_MAX_GROWTH,
+            _FETCH_BATCH_MAX_SIZE)
+        if total_bytes:
+            size = int(target_bytes * total_messages / total_bytes)
+        else:
+            size = max_size
+        size = max(1, min(size, max_size))
+
+
+def _cached_fetch_items(items, normalise_times):
+    """Map those of the (upper case) FETCH *items* whose values can be
+    cached to the keys their values are returned under.
+    """
+    out = {}
+    for item in items:
+        if item in _CACHEABLE_FETCH_ITEMS:
+            if item != 'INTERNALDATE' or normalise_times:
+                out[item] = to_bytes(item)
+        elif item.startswith('BODY.PEEK[HEADER') and item.endswith(']'):
+            out[item] = b'BODY' + to_bytes(item[9:])
+    return out
+
+
+def _search_args(criteria, charset, save, has_capability):
+    args = []
+    if save:
+        if not has_capability('SEARCHRES'):
+            raise exceptions.CapabilityError(
+                'Server does not support SEARCHRES capability')
+        args.extend([b'RETURN', b'(SAVE)'])
+    if charset:
+        args.extend([b'CHARSET', to_bytes(charset)])
+    args.extend(_normalise_search_criteria(criteria, charset))
+    return args
+
+
+def _cacheable_uids(messages):
+    if isinstance(messages, int):
+        messages = messages,
+    elif isinstance(messages, (str, bytes)):
+        return None
+    uids = list(messages)
+    if all(isinstance(uid, int) for uid in uids):
+        return uids
+    return None
+
+
+def _parse_esearch(data):
+    out = {}
+    for response in data:
+        if response is None:
+            continue
+        items = list(parse_response([response]))
+        # Skip the correlator, eg. (TAG "A282"), and the UID marker.
+        if items and isinstance(items[0], tuple):
+            items.pop(0)
+        if items and items[0] == b'UID':
+            items.pop(0)
+        for key, value in as_pairs(items):
+            key = key.upper()
+            if key == b'ALL' and isinstance(value, int):
+                value = b'%d' % value
+            out[key] = value
+    return out
+
+
+def _fetch_response_size(data):
+    size = 0
+    for item in data:
+        if isinstance(item, tuple):
+            size += len(item[0]) + len(item[1])
+        elif item:
+            size += len(item)
+    return size
+
+
+def _parse_quota(quota_rep):
+    quota_rep = parse_response(quota_rep)
+    rv = []
+    for quota_root, quota_resource_infos in as_pairs(quota_rep):
+        for quota_resource_info in as_triplets(quota_resource_infos):
+            rv.append(Quota(quota_root=to_unicode(quota_root), resource=
+                to_unicode(quota_resource_info[0]), usage=quota_resource_info
+                [1], limit=quota_resource_info[2]))
+    return rv
+
+
+def _is8bit(data: bytes) ->bool:
+    return isinstance(data, _literal) or any(b > 127 for b in data)
+
+
+def _iter_with_last(items: Sequence[Any]) ->Iterator[Tuple[Any, bool]]:
+    last_i = len(items) - 1
+    for i, item in enumerate(items):
+        yield item, i == last_i
+
+
+def as_pairs(items: Iterable[Any]) ->Iterator[Tuple[Any, Any]]:
+    i = 0
+    last_item = None
+    for item in items:
+        if i % 2:
+            yield last_item, item
+        else:
+            last_item = item
+        i += 1
+
 
+def as_triplets(items):
+    a = iter(items)
+    return zip(a, a, a)
 
-def join_message_ids(messages):
+
+def normalise_text_list(items):
+    return list(_normalise_text_list(items))
+
+
+def seq_to_parenstr(items: Any) ->str:
+    return _join_and_paren(normalise_text_list(items))
+
+
+def seq_to_parenstr_upper(items: Any) ->str:
+    return _join_and_paren(item.upper() for item in normalise_text_list(items))
+
+
+def _join_and_paren(items):
+    return '(' + ' '.join(items) + ')'
+
+
+def _normalise_text_list(items):
+    if isinstance(items, (str, bytes)):
+        items = items,
+    return (to_unicode(c) for c in items)
+
+
+def join_message_ids(messages: Any) ->bytes:
     """Convert a sequence of messages ids or a single integer message id
     into an id byte string for use with IMAP commands
+
+    If all the message ids are integers they are sorted, deduplicated
+    and runs of consecutive ids are collapsed into ranges
+    (eg. ``b"1:4,7"``).
     """
-    pass
+    if isinstance(messages, (str, bytes, int)):
+        messages = to_bytes(messages),
+    else:
+        messages = list(messages)
+    if all(isinstance(m, int) for m in messages):
+        return encode_sequence_set(messages)
+    return b','.join(_maybe_int_to_bytes(m) for m in messages)
+
+
+def _maybe_int_to_bytes(val):
+    if isinstance(val, int):
+        return str(val).encode('ascii')
+    return to_bytes(val)
 
 
 _not_present = object()
@@ -1188,6 +2562,10 @@ class _dict_bytes_normaliser:
 
     def __init__(self, d):
         self._d = d
+
+    def iteritems(self):
+        for key, value in self._d.items():
+            yield to_bytes(key), value
     items = iteritems
 
     def __contains__(self, ink):
@@ -1196,6 +2574,40 @@ class _dict_bytes_normaliser:
                 return True
         return False
 
+    def get(self, ink, default=_not_present):
+        for k in self._gen_keys(ink):
+            try:
+                return self._d[k]
+            except KeyError:
+                pass
+        if default == _not_present:
+            raise KeyError(ink)
+        return default
+
+    def pop(self, ink, default=_not_present):
+        for k in self._gen_keys(ink):
+            try:
+                return self._d.pop(k)
+            except KeyError:
+                pass
+        if default == _not_present:
+            raise KeyError(ink)
+        return default
+
+    def _gen_keys(self, k):
+        yield k
+        if isinstance(k, bytes):
+            yield to_unicode(k)
+        else:
+            yield to_bytes(k)
+
+
+def debug_trunc(v, maxlen):
+    if len(v) < maxlen:
+        return repr(v)
+    hl = maxlen // 2
+    return repr(v[:hl]) + '...' + repr(v[-hl:])
+
 
 class IMAPlibLoggerAdapter(LoggerAdapter):
     """Adapter preventing IMAP secrets from going to the logging facility."""
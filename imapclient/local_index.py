@@ -0,0 +1,260 @@
+"""
+A local SQLite index of the messages in an account's folders.
+
+The index holds the UID, FLAGS, INTERNALDATE, RFC822.SIZE and the main
+ENVELOPE fields of each message, is brought up to date with
+:py:class:`FolderSync <imapclient.FolderSync>`, and answers searches
+using the same criteria as :py:meth:`IMAPClient.search
+<imapclient.IMAPClient.search>` without contacting the server.
+"""
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+from datetime import datetime
+from logging import getLogger
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from .exceptions import UnsupportedCriteriaError
+from .search_criteria import _addresses_text, _header_text, And, Node, Not, Or, parse_criteria, SearchKey
+from .sync import FolderState, FolderSync, SyncResult
+from .util import to_bytes, to_unicode
+logger = getLogger(__name__)
+__all__ = ['LocalIndex']
+_INDEX_FETCH_ITEMS = ['FLAGS', 'INTERNALDATE', 'RFC822.SIZE', 'ENVELOPE']
+_SCHEMA = ['CREATE TABLE IF NOT EXISTS folders (folder TEXT PRIMARY KEY, uidvalidity INTEGER NOT NULL, highestmodseq INTEGER)'
+    ,
+    'CREATE TABLE IF NOT EXISTS messages (folder TEXT NOT NULL, uid INTEGER NOT NULL, internaldate TEXT, size INTEGER, sent TEXT, subject TEXT, from_ TEXT, to_ TEXT, cc TEXT, bcc TEXT, message_id TEXT, PRIMARY KEY (folder, uid))'
+    ,
+    'CREATE TABLE IF NOT EXISTS flags (folder TEXT NOT NULL, uid INTEGER NOT NULL, flag TEXT NOT NULL, PRIMARY KEY (folder, uid, flag))'
+    ]
+_SYSTEM_FLAG_KEYS = {'ANSWERED': '\\Answered', 'DELETED': '\\Deleted',
+    'DRAFT': '\\Draft', 'FLAGGED': '\\Flagged', 'RECENT': '\\Recent',
+    'SEEN': '\\Seen'}
+_TEXT_COLUMNS = {'SUBJECT': 'subject', 'FROM': 'from_', 'TO': 'to_', 'CC':
+    'cc', 'BCC': 'bcc', 'MESSAGE-ID': 'message_id'}
+_DATE_COMPARISONS = {'BEFORE': '<', 'ON': '=', 'SINCE': '>='}
+_SQL = Tuple[str, List[Any]]
+
+
+class LocalIndex:
+    """An index of the folders of the account *client* is logged in
+    to, stored in the SQLite database at *path*.
+
+    Folders are added to the index, and brought up to date, with
+    :py:meth:`refresh`. :py:meth:`search` then answers searches from
+    the index::
+
+        index = LocalIndex(client, "index.sqlite")
+        index.refresh("INBOX")
+        unread = index.search("INBOX", ["UNSEEN", "FROM", "alice"])
+
+    Searches on the flags, dates, size, addresses, subject and
+    Message-ID of messages, and on UIDs, are supported, combined with
+    ``NOT``, ``OR`` and parenthesised groups. Searching the text or
+    body of messages, on other headers, or by message sequence number
+    raises :py:exc:`UnsupportedCriteriaError
+    <imapclient.exceptions.UnsupportedCriteriaError>`. As for the
+    server, string matches are case insensitive substring matches and
+    dates are compared without their time or time zone.
+
+    A database should only hold the folders of one account.
+    """
+
+    def __init__(self, client: Any, path: str) ->None:
+        self.client = client
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            for statement in _SCHEMA:
+                self._db.execute(statement)
+        # Dates are indexed in their own time zone, as the server
+        # compares them.
+        self._sync = FolderSync(client, _IndexedFolders(self._db),
+            fetch_items=_INDEX_FETCH_ITEMS, normalise_times=False)
+
+    def close(self) ->None:
+        self._db.close()
+
+    def refresh(self, folder: str) ->SyncResult:
+        """Bring the index of *folder* up to date with the server,
+        returning the changes found.
+
+        The first refresh of a folder fetches the indexed data for
+        all of its messages. Later ones only fetch what changed, as
+        described for :py:class:`FolderSync <imapclient.FolderSync>`.
+        """
+        with self._lock, self._db:
+            result = self._sync.sync(folder)
+            self._apply(result)
+        return result
+
+    def folders(self) ->List[str]:
+        """Return the names of the folders in the index."""
+        with self._lock:
+            return [row[0] for row in self._db.execute(
+                'SELECT folder FROM folders ORDER BY folder')]
+
+    def search(self, folder: str, criteria: Any='ALL', charset: Optional[str]
+        =None) ->List[int]:
+        """Return the UIDs of the indexed messages in *folder* matching
+        *criteria*, as given to :py:meth:`IMAPClient.search
+        <imapclient.IMAPClient.search>`.
+        """
+        where, params = _to_sql(parse_criteria(criteria, charset))
+        with self._lock:
+            return [row[0] for row in self._db.execute(
+                'SELECT uid FROM messages m WHERE folder = ? AND (%s) ORDER BY uid'
+                 % where, [folder] + params)]
+
+    def _apply(self, result: SyncResult) ->None:
+        db = self._db
+        folder = result.folder
+        if result.reset:
+            db.execute('DELETE FROM messages WHERE folder = ?', (folder,))
+            db.execute('DELETE FROM flags WHERE folder = ?', (folder,))
+        for uid in result.vanished:
+            db.execute('DELETE FROM messages WHERE folder = ? AND uid = ?',
+                (folder, uid))
+            db.execute('DELETE FROM flags WHERE folder = ? AND uid = ?', (
+                folder, uid))
+        db.executemany(
+            'INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'
+            , [_message_row(folder, uid, data) for uid, data in result.new.
+            items()])
+        for uid, data in list(result.new.items()) + list(result.changed.
+            items()):
+            db.execute('DELETE FROM flags WHERE folder = ? AND uid = ?', (
+                folder, uid))
+            db.executemany('INSERT OR IGNORE INTO flags VALUES (?, ?, ?)',
+                [(folder, uid, to_unicode(flag)) for flag in data.get(
+                b'FLAGS', ())])
+
+
+class _IndexedFolders(MutableMapping[str, FolderState]):
+    """The state :py:class:`FolderSync` keeps for each folder, read
+    from and written to the index.
+    """
+
+    def __init__(self, db: sqlite3.Connection) ->None:
+        self._db = db
+
+    def __getitem__(self, folder: str) ->FolderState:
+        row = self._db.execute(
+            'SELECT uidvalidity, highestmodseq FROM folders WHERE folder = ?',
+            (folder,)).fetchone()
+        if row is None:
+            raise KeyError(folder)
+        uidvalidity, highestmodseq = row
+        uids = {r[0] for r in self._db.execute(
+            'SELECT uid FROM messages WHERE folder = ?', (folder,))}
+        flags: Optional[Dict[int, Tuple[bytes, ...]]] = None
+        if highestmodseq is None:
+            flags = {uid: () for uid in uids}
+            for uid, flag in self._db.execute(
+                'SELECT uid, flag FROM flags WHERE folder = ?', (folder,)):
+                flags[uid] += to_bytes(flag),
+        return FolderState(uidvalidity, highestmodseq, uids, flags)
+
+    def __setitem__(self, folder: str, state: FolderState) ->None:
+        # Messages and flags are updated from the SyncResult.
+        self._db.execute('INSERT OR REPLACE INTO folders VALUES (?, ?, ?)',
+            (folder, state.uidvalidity, state.highestmodseq))
+
+    def __delitem__(self, folder: str) ->None:
+        self._db.execute('DELETE FROM folders WHERE folder = ?', (folder,))
+
+    def __iter__(self) ->Iterator[str]:
+        return iter([row[0] for row in self._db.execute(
+            'SELECT folder FROM folders')])
+
+    def __len__(self) ->int:
+        count: int = self._db.execute('SELECT count(*) FROM folders'
+            ).fetchone()[0]
+        return count
+
+
+def _message_row(folder: str, uid: int, data: Dict[bytes, Any]) ->List[Any]:
+    internaldate = data.get(b'INTERNALDATE')
+    envelope = data.get(b'ENVELOPE')
+    row = [folder, uid, internaldate.isoformat() if isinstance(
+        internaldate, datetime) else None, data.get(b'RFC822.SIZE')]
+    if envelope is None:
+        return row + [None] * 7
+    sent = envelope.date
+    return row + [sent.isoformat() if isinstance(sent, datetime) else None,
+        _header_text(envelope.subject), _addresses_text(envelope.from_),
+        _addresses_text(envelope.to), _addresses_text(envelope.cc),
+        _addresses_text(envelope.bcc), _header_text(envelope.message_id)]
+
+
+def _flag_sql(flag: str) ->_SQL:
+    return (
+        'EXISTS (SELECT 1 FROM flags f WHERE f.folder = m.folder AND f.uid = m.uid AND f.flag = ? COLLATE NOCASE)'
+        , [flag])
+
+
+def _to_sql(node: Node) ->_SQL:
+    """Translate a parsed search criteria node into a WHERE clause
+    over the messages table (aliased ``m``) and its parameters.
+    """
+    if isinstance(node, And):
+        parts = [_to_sql(operand) for operand in node.operands]
+        return ' AND '.join('(%s)' % sql for sql, _ in parts), [p for _,
+            params in parts for p in params]
+    if isinstance(node, Or):
+        left, left_params = _to_sql(node.left)
+        right, right_params = _to_sql(node.right)
+        return '(%s) OR (%s)' % (left, right), left_params + right_params
+    if isinstance(node, Not):
+        sql, params = _to_sql(node.operand)
+        return 'NOT (%s)' % sql, params
+    name, args = node.name, node.args
+    if name == 'ALL':
+        return '1', []
+    if name in _SYSTEM_FLAG_KEYS:
+        return _flag_sql(_SYSTEM_FLAG_KEYS[name])
+    if name.startswith('UN') and name[2:] in _SYSTEM_FLAG_KEYS:
+        sql, params = _flag_sql(_SYSTEM_FLAG_KEYS[name[2:]])
+        return 'NOT ' + sql, params
+    if name == 'NEW':
+        return _to_sql(And((Not(SearchKey('SEEN')), SearchKey('RECENT'))))
+    if name == 'OLD':
+        return _to_sql(Not(SearchKey('RECENT')))
+    if name == 'KEYWORD':
+        return _flag_sql(args[0])
+    if name == 'UNKEYWORD':
+        sql, params = _flag_sql(args[0])
+        return 'NOT ' + sql, params
+    if name in _TEXT_COLUMNS or name == 'HEADER' and args[0
+        ] in _TEXT_COLUMNS:
+        if name == 'HEADER':
+            name, args = args[0], args[1:]
+        return 'instr(lower(coalesce(m.%s, \'\')), ?) > 0' % _TEXT_COLUMNS[
+            name], [args[0].lower()]
+    if name in _DATE_COMPARISONS:
+        return 'substr(m.internaldate, 1, 10) %s ?' % _DATE_COMPARISONS[name
+            ], [args[0].isoformat()]
+    if name.startswith('SENT') and name[4:] in _DATE_COMPARISONS:
+        return 'substr(m.sent, 1, 10) %s ?' % _DATE_COMPARISONS[name[4:]], [
+            args[0].isoformat()]
+    if name == 'LARGER':
+        return 'm.size > ?', [args[0]]
+    if name == 'SMALLER':
+        return 'm.size < ?', [args[0]]
+    if name == 'UID':
+        max_uid = (
+            'm.uid = (SELECT max(uid) FROM messages WHERE folder = m.folder)')
+        tests: List[str] = []
+        params = []
+        for first, last in args[0]:
+            if first is None:
+                tests.append(max_uid)
+            elif last is None:
+                # n:* includes the highest UID even when it is below n.
+                tests.append('m.uid >= ? OR ' + max_uid)
+                params.append(first)
+            else:
+                tests.append('m.uid BETWEEN ? AND ?')
+                params.extend([first, last])
+        return ' OR '.join(tests), params
+    raise UnsupportedCriteriaError(
+        "search key %s can't be answered from the index" % name)
@@ -0,0 +1,124 @@
+"""
+Fetch messages over several connections at once.
+
+A single connection is limited by one TCP stream and by parsing
+responses on one thread. parallel_fetch() spreads a large FETCH over
+several connections, each working through ranges of UIDs on its own
+thread.
+"""
+import queue
+import threading
+from logging import getLogger
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from .imapclient import IMAPClient
+logger = getLogger(__name__)
+__all__ = ['parallel_fetch']
+
+
+def parallel_fetch(connect: Callable[[], IMAPClient], messages: Iterable[
+    int], data: List[str], connections: int=4, folder: Optional[str]=None,
+    modifiers: Optional[List[str]]=None, ordered: bool=True, batch_size:
+    int=500, max_pending: Optional[int]=None) ->Iterator[Tuple[int, Dict[
+    bytes, Any]]]:
+    """Fetch *data* for *messages* using up to *connections* connections
+    in parallel, yielding ``(uid, msg_data)`` pairs as per
+    :py:meth:`IMAPClient.iter_fetch() <imapclient.IMAPClient.iter_fetch>`.
+
+    *connect* is called (once per connection, from that connection's
+    thread) to get a logged in IMAPClient. If *folder* is given it is
+    selected read-only on each connection. The connections are logged
+    out once they have no more work to do. For example::
+
+        def connect():
+            client = IMAPClient("imap.foo.org")
+            client.login("bar@foo.org", "passwd")
+            return client
+
+        for uid, msg_data in parallel_fetch(connect, uids, ["RFC822"],
+                                            folder="INBOX"):
+            ...
+
+    The sorted UIDs are split into batches of *batch_size* consecutive
+    UIDs which are shared out between the connections. If *ordered* is
+    True messages are yielded in UID order, otherwise each batch is
+    yielded as soon as it arrives. At most *max_pending* batches
+    (default: twice the number of connections) are fetched ahead of
+    the consumer, bounding memory use.
+
+    Errors raised while connecting or fetching are re-raised by the
+    generator. Closing the generator early stops the connections after
+    any batch they are currently fetching.
+    """
+    uids = sorted(set(int(m) for m in messages))
+    batches = [uids[i:i + batch_size] for i in range(0, len(uids),
+        batch_size)]
+    if not batches:
+        return
+    connections = max(1, min(connections, len(batches)))
+    if max_pending is None:
+        max_pending = connections * 2
+    todo: 'queue.Queue[int]' = queue.Queue()
+    for index in range(len(batches)):
+        todo.put(index)
+    # (batch index, fetched data, error) from the workers
+    results: 'queue.Queue[Tuple[Any, Any, Optional[Exception]]]' = queue.Queue(
+        )
+    slots = threading.Semaphore(max(max_pending, connections))
+    stop = threading.Event()
+
+    def worker() ->None:
+        client = None
+        try:
+            client = connect()
+            if folder is not None:
+                client.select_folder(folder, readonly=True)
+            while True:
+                slots.acquire()
+                if stop.is_set():
+                    break
+                try:
+                    index = todo.get_nowait()
+                except queue.Empty:
+                    slots.release()
+                    break
+                results.put((index, client.fetch(batches[index], data,
+                    modifiers), None))
+        except Exception as e:
+            results.put((None, None, e))
+        finally:
+            if client is not None:
+                try:
+                    client.logout()
+                except Exception as e:
+                    logger.info('Could not close the connection cleanly: %s',
+                        e)
+    threads = [threading.Thread(target=worker, name=
+        'parallel_fetch-%d' % i, daemon=True) for i in range(connections)]
+    for thread in threads:
+        thread.start()
+    try:
+        done = {}
+        next_index = 0
+        remaining = len(batches)
+        while remaining:
+            index, fetched, error = results.get()
+            if error is not None:
+                raise error
+            if not ordered:
+                remaining -= 1
+                slots.release()
+                yield from fetched.items()
+                continue
+            done[index] = fetched
+            while next_index in done:
+                fetched = done.pop(next_index)
+                next_index += 1
+                remaining -= 1
+                slots.release()
+                yield from sorted(fetched.items())
+    finally:
+        stop.set()
+        for _ in threads:
+            slots.release()
+    for thread in threads:
+        thread.join()
@@ -0,0 +1,233 @@
+"""
+A pool of logged in IMAPClient connections.
+
+Opening a connection costs a TCP handshake, a TLS handshake and a
+LOGIN round trip. IMAPClientPool keeps connections open between jobs
+and hands them out again to later jobs for the same account.
+"""
+import contextlib
+import hashlib
+import threading
+import time
+from logging import getLogger
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from . import exceptions
+from .imapclient import IMAPClient
+from .util import to_bytes
+logger = getLogger(__name__)
+__all__ = ['IMAPClientPool']
+
+
+_Server = Tuple[str, int]
+# (host, port, username, password digest)
+_Key = Tuple[str, int, str, str]
+
+
+class _PooledConnection:
+
+    def __init__(self, client: IMAPClient, key: _Key) ->None:
+        self.client = client
+        self.key = key
+        self.selected: Optional[Tuple[str, bool]] = None
+        self.last_used = time.monotonic()
+
+
+class IMAPClientPool:
+    """A thread-safe pool of authenticated :py:class:`IMAPClient
+    <imapclient.IMAPClient>` connections.
+
+    Connections are keyed by ``(host, port, username)`` and a digest of
+    the password, so a connection is only handed out again to callers
+    giving the same password. They are checked out with
+    :py:meth:`.connection`::
+
+        pool = IMAPClientPool(max_connections=4)
+        with pool.connection("imap.foo.org", "bar@foo.org", "passwd",
+                             folder="INBOX") as client:
+            client.search(["UNSEEN"])
+
+    *max_connections* limits the number of connections open to each
+    server (``(host, port)``), whichever account they are logged in
+    as. *server_limits* may map a host name to a different limit for
+    that server. When a server is at its limit, checking out a
+    connection waits for one to be returned, closing an idle
+    connection for another account if that makes room. If none
+    becomes available within *wait_timeout* seconds (forever if None)
+    :py:exc:`.PoolTimeoutError` is raised.
+
+    A connection that has been idle in the pool for more than
+    *check_interval* seconds is checked with a NOOP before being handed
+    out, and replaced if that fails. Connections that raise
+    :py:exc:`.IMAPClientAbortError` or a socket error while checked out
+    are closed rather than returned to the pool.
+
+    Any other keyword arguments (*ssl*, *ssl_context*, *timeout*, ...)
+    are passed to IMAPClient when new connections are made.
+    """
+
+    def __init__(self, max_connections: int=4, server_limits: Optional[
+        Dict[str, int]]=None, check_interval: float=60.0, wait_timeout:
+        Optional[float]=None, **client_kwargs: Any) ->None:
+        if 'stream' in client_kwargs:
+            raise ValueError("can't pool 'stream' connections")
+        self.max_connections = max_connections
+        self.server_limits = dict(server_limits or {})
+        self.check_interval = check_interval
+        self.wait_timeout = wait_timeout
+        self._client_kwargs = client_kwargs
+        self._cond = threading.Condition()
+        self._idle: Dict[_Key, List[_PooledConnection]] = {}
+        self._open: Dict[_Server, int] = {}
+        self._closed = False
+
+    def __enter__(self) ->'IMAPClientPool':
+        return self
+
+    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) ->None:
+        self.close()
+
+    @contextlib.contextmanager
+    def connection(self, host: str, username: str, password: str, port:
+        Optional[int]=None, folder: Optional[str]=None, readonly: bool=False
+        ) ->Iterator[IMAPClient]:
+        """Check out a logged in connection for *username* on *host*,
+        returning it to the pool when the ``with`` block ends.
+
+        If *folder* is given it is selected (read-only if *readonly* is
+        True) unless the connection already has it selected. Select
+        folders this way rather than by calling ``select_folder()`` on
+        the client so the pool knows which folder is selected.
+        """
+        if port is None:
+            port = 993 if self._client_kwargs.get('ssl', True) else 143
+        key: _Key = host, port, username, hashlib.sha256(to_bytes(password, 'utf-8')
+            ).hexdigest()
+        conn = self._checkout(key, password)
+        try:
+            if folder is not None and conn.selected != (folder, readonly):
+                conn.selected = None
+                conn.client.select_folder(folder, readonly)
+                conn.selected = folder, readonly
+            yield conn.client
+        except (exceptions.IMAPClientAbortError, OSError):
+            self._discard(conn)
+            raise
+        except BaseException:
+            conn.selected = None
+            self._checkin(conn)
+            raise
+        else:
+            self._checkin(conn)
+
+    def close(self) ->None:
+        """Log out of all idle connections. Connections that are checked
+        out are logged out when they are returned.
+        """
+        with self._cond:
+            self._closed = True
+            idle = [conn for conns in self._idle.values() for conn in conns]
+            self._idle.clear()
+        for conn in idle:
+            self._discard(conn, logout=True)
+
+    def _limit(self, server: _Server) ->int:
+        return self.server_limits.get(server[0], self.max_connections)
+
+    def _checkout(self, key: _Key, password: str) ->_PooledConnection:
+        server: _Server = key[:2]
+        deadline = (None if self.wait_timeout is None else time.monotonic() +
+            self.wait_timeout)
+        victim = None
+        conn: Optional[_PooledConnection]
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise exceptions.IllegalStateError('pool is closed')
+                idle = self._idle.get(key)
+                if idle:
+                    conn = idle.pop()
+                    break
+                if self._open.get(server, 0) < self._limit(server):
+                    self._open[server] = self._open.get(server, 0) + 1
+                    conn = None
+                    break
+                victim = self._pop_idle_for_server(server)
+                if victim is not None:
+                    # The victim's slot is handed straight to the new
+                    # connection so the open count is unchanged.
+                    conn = None
+                    break
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise exceptions.PoolTimeoutError(
+                            'no connection to %s:%d available' % server)
+                self._cond.wait(remaining)
+        if victim is not None:
+            self._close_client(victim.client, logout=True)
+        if conn is not None:
+            if time.monotonic() - conn.last_used <= self.check_interval:
+                return conn
+            try:
+                conn.client.noop()
+                return conn
+            except (exceptions.IMAPClientError, OSError) as e:
+                logger.debug('Replacing dead pooled connection: %s', e)
+                self._close_client(conn.client, logout=False)
+        try:
+            return self._connect(key, password)
+        except BaseException:
+            self._release_slot(server)
+            raise
+
+    def _pop_idle_for_server(self, server: _Server) ->Optional[
+        _PooledConnection]:
+        for key, conns in self._idle.items():
+            if key[:2] == server and conns:
+                return conns.pop(0)
+        return None
+
+    def _connect(self, key: _Key, password: str) ->_PooledConnection:
+        host, port, username, _ = key
+        client = self._create_client(host, port)
+        try:
+            client.login(username, password)
+        except BaseException:
+            self._close_client(client, logout=False)
+            raise
+        return _PooledConnection(client, key)
+
+    def _create_client(self, host: str, port: int) ->IMAPClient:
+        return IMAPClient(host, port, **self._client_kwargs)
+
+    def _checkin(self, conn: _PooledConnection) ->None:
+        with self._cond:
+            if not self._closed:
+                conn.last_used = time.monotonic()
+                self._idle.setdefault(conn.key, []).append(conn)
+                self._cond.notify()
+                return
+        self._discard(conn, logout=True)
+
+    def _discard(self, conn: _PooledConnection, logout: bool=False) ->None:
+        self._close_client(conn.client, logout)
+        self._release_slot(conn.key[:2])
+
+    def _release_slot(self, server: _Server) ->None:
+        with self._cond:
+            self._open[server] -= 1
+            self._cond.notify()
+
+    @staticmethod
+    def _close_client(client: IMAPClient, logout: bool) ->None:
+        if logout:
+            try:
+                client.logout()
+                return
+            except Exception:
+                pass
+        try:
+            client.shutdown()
+        except Exception as e:
+            logger.info('Could not close the connection cleanly: %s', e)
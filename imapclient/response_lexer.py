@@ -4,7 +4,8 @@ A lexical analyzer class for IMAP responses.
 Although Lexer does all the work, TokenSource is the class to use for
 external callers.
 """
-from typing import Iterator, List, Optional, Tuple, TYPE_CHECKING, Union
+import re
+from typing import FrozenSet, Iterator, List, Optional, Tuple, TYPE_CHECKING, Union
 from .util import assert_imap_protocol
 __all__ = ['TokenSource']
 CTRL_CHARS = frozenset(c for c in range(32))
@@ -18,6 +19,45 @@ CLOSE_SQUARE = ord(']')
 DOUBLE_QUOTE = ord('"')
 
 
+def _char_class(chars: FrozenSet[int]) ->bytes:
+    """Build a regex character class body matching the bytes in *chars*."""
+    return b''.join(re.escape(bytes([c])) for c in sorted(chars))
+
+
+_WORD = b'(?:[' + _char_class(NON_SPECIALS) + b']+|\\[[^\\]]*\\])+'
+_QUOTED = b'"[^"\\\\]*(?:\\\\.[^"\\\\]*)*"'
+_SINGLE = b'[' + _char_class(ALL_CHARS - NON_SPECIALS - WHITESPACE - frozenset(
+    (OPEN_SQUARE, DOUBLE_QUOTE))) + b']'
+_SKIP = b'[' + _char_class(WHITESPACE) + b']*'
+_NOT_WHITESPACE = b'[^' + _char_class(WHITESPACE) + b']'
+_WORD_END = b'(?![' + _char_class(NON_SPECIALS | {OPEN_SQUARE, DOUBLE_QUOTE}
+    ) + b'])'
+
+# Matches a line only if it can be tokenised without error.
+_VALID_LINE_RE = re.compile(b'(?:' + _SKIP + b'(?:' + _WORD + _WORD_END +
+    b'|' + _QUOTED + b'|' + _SINGLE + b'))*' + _SKIP, re.DOTALL)
+
+# Each match of _TOKEN_RE is exactly one token, for lines that have
+# been checked by _VALID_LINE_RE.
+_TOKEN_RE = re.compile(_SKIP + b'(' + _WORD + b'|' + _QUOTED + b'|' +
+    _SINGLE + b')', re.DOTALL)
+
+# As for _TOKEN_RE but also matches malformed input. The group that
+# matched (m.lastindex) identifies the kind of token:
+#   1: atom, possibly including [...] sections
+#   2: a double quote directly following an atom (a protocol error)
+#   3: quoted string
+#   4: single character token such as "(" or ")"
+#   5: anything else, i.e. an unterminated quoted string or "["
+_CHECKED_TOKEN_RE = re.compile(_SKIP + b'(?:(' + _WORD + b')(")?|(' +
+    _QUOTED + b')|(' + _SINGLE + b')|(' + _NOT_WHITESPACE + b'))', re.DOTALL)
+_WORD_TOKEN = 1
+_BAD_QUOTE = 2
+_QUOTED_TOKEN = 3
+_SINGLE_TOKEN = 4
+_ESCAPED_RE = re.compile(b'\\\\([\\\\"])')
+
+
 class TokenSource:
     """
     A simple iterator for the Lexer class that also provides access to
@@ -28,6 +68,12 @@ class TokenSource:
         self.lex = Lexer(text)
         self.src = iter(self.lex)
 
+    @property
+    def current_literal(self) ->Optional[bytes]:
+        if TYPE_CHECKING:
+            assert self.lex.current_source is not None
+        return self.lex.current_source.literal
+
     def __iter__(self) ->Iterator[bytes]:
         return self.src
 
@@ -35,17 +81,50 @@ class TokenSource:
 class Lexer:
     """
     A lexical analyzer class for IMAP
+
+    Each response line is scanned as a whole with a precompiled regex
+    whose character classes are derived from the SPECIALS and
+    NON_SPECIALS tables. Tokens are returned as slices of the line
+    rather than being assembled a byte at a time.
     """
 
     def __init__(self, text: List[bytes]):
         self.sources = (LiteralHandlingIter(chunk) for chunk in text)
         self.current_source: Optional[LiteralHandlingIter] = None
 
+    @staticmethod
+    def read_token_stream(text: bytes) ->List[bytes]:
+        if _VALID_LINE_RE.fullmatch(text) is None:
+            return list(Lexer.read_checked_token_stream(text))
+        tokens = _TOKEN_RE.findall(text)
+        if b'\\"' in text or b'\\\\' in text:
+            tokens = [_ESCAPED_RE.sub(b'\\1', tok) if tok[0] ==
+                DOUBLE_QUOTE and BACKSLASH in tok else tok for tok in tokens]
+        return tokens
+
+    @staticmethod
+    def read_checked_token_stream(text: bytes) ->Iterator[bytes]:
+        """Slower tokeniser used to report errors in malformed lines."""
+        for m in _CHECKED_TOKEN_RE.finditer(text):
+            kind = m.lastindex
+            if TYPE_CHECKING:
+                assert kind is not None
+            if kind == _WORD_TOKEN or kind == _SINGLE_TOKEN:
+                yield m.group(kind)
+            elif kind == _QUOTED_TOKEN:
+                yield _ESCAPED_RE.sub(b'\\1', m.group(kind))
+            elif kind == _BAD_QUOTE:
+                assert_imap_protocol(False)
+            elif m.group(kind)[0] == DOUBLE_QUOTE:
+                raise ValueError("No closing '\"'")
+            else:
+                raise ValueError("No closing ']'")
+
     def __iter__(self) ->Iterator[bytes]:
+        read_token_stream = self.read_token_stream
         for source in self.sources:
             self.current_source = source
-            for tok in self.read_token_stream(iter(source)):
-                yield bytes(tok)
+            yield from read_token_stream(source.src_text)
 
 
 class LiteralHandlingIter:
@@ -59,23 +138,3 @@ class LiteralHandlingIter:
         else:
             self.src_text = resp_record
             self.literal = None
-
-    def __iter__(self) ->'PushableIterator':
-        return PushableIterator(self.src_text)
-
-
-class PushableIterator:
-    NO_MORE = object()
-
-    def __init__(self, it: bytes):
-        self.it = iter(it)
-        self.pushed: List[int] = []
-
-    def __iter__(self) ->'PushableIterator':
-        return self
-
-    def __next__(self) ->int:
-        if self.pushed:
-            return self.pushed.pop()
-        return next(self.it)
-    next = __next__
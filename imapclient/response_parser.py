@@ -5,14 +5,15 @@ returned by imaplib.
 Initially inspired by http://effbot.org/zone/simple-iterator-parser.htm
 """
 import datetime
+import functools
 import re
 import sys
 from collections import defaultdict
-from typing import cast, Dict, Iterator, List, Optional, Tuple, TYPE_CHECKING, Union
-from .datetime_util import parse_to_datetime
+from typing import cast, Dict, Iterator, List, Optional, Tuple, Type, TYPE_CHECKING, Union
+from .datetime_util import parse_to_datetime, parse_to_datetimes
 from .exceptions import ProtocolError
 from .response_lexer import TokenSource
-from .response_types import Address, BodyData, Envelope, SearchIds
+from .response_types import Address, BodyData, CompactSearchIds, Envelope, LazyBodyData, LazyEnvelope, SearchIds
 from .typing_imapclient import _Atom
 __all__ = ['parse_response', 'parse_message_list']
 
@@ -22,25 +23,14 @@ def parse_response(data: List[bytes]) ->Tuple[_Atom, ...]:
 
     Returns nested tuples of appropriately typed objects.
     """
-    lexer = TokenSource(data)
-    return tuple(_parse_tokens(lexer))
-
-def _parse_tokens(lexer: TokenSource) ->Iterator[_Atom]:
-    for token in lexer:
-        if token == b'(':
-            yield tuple(_parse_tokens(lexer))
-        elif token == b')':
-            return
-        elif isinstance(token, bytes):
-            yield token.decode('ascii')
-        else:
-            yield token
+    return tuple(gen_parsed_response(data))
 
 
-_msg_id_pattern = re.compile('(\\d+(?: +\\d+)*)')
+_msg_id_pattern = re.compile(b'(\\d+(?: +\\d+)*)')
 
 
-def parse_message_list(data: List[Union[bytes, str]]) ->SearchIds:
+def parse_message_list(data: List[Union[bytes, str]], compact: bool=False
+    ) ->Union[SearchIds, CompactSearchIds]:
     """Parse a list of message ids and return them as a list.
 
     parse_response is also capable of doing this but this is
@@ -50,87 +40,248 @@ def parse_message_list(data: List[Union[bytes, str]]) ->SearchIds:
     The returned list is a SearchIds instance which has a *modseq*
     attribute which contains the MODSEQ response (if returned by the
     server).
+
+    If *compact* is True a CompactSearchIds instance is returned
+    instead, which stores the ids in an array rather than as a list of
+    Python ints.
     """
-    data = [item.decode('ascii') if isinstance(item, bytes) else item for item in data]
-    data = ' '.join(data)
-    
-    modseq = None
-    if 'MODSEQ' in data:
-        modseq_index = data.index('MODSEQ')
-        modseq = int(data[modseq_index + 1])
-        data = data[:modseq_index]
-    
-    ids = [int(num) for num in _msg_id_pattern.findall(data)]
-    return SearchIds(ids, modseq)
+    cls: Type[Union[SearchIds, CompactSearchIds]] = (CompactSearchIds if
+        compact else SearchIds)
+    if len(data) != 1:
+        raise ValueError('unexpected message list data')
+    message_data = data[0]
+    if not message_data:
+        return cls()
+    if isinstance(message_data, str):
+        message_data = message_data.encode('ascii')
+    # The common case is a plain run of ids, possibly followed by a
+    # parenthesised MODSEQ. Check that with a single C level pass and
+    # convert the ids straight from bytes, avoiding the regex.
+    end = message_data.find(b'(')
+    if end == -1:
+        end = len(message_data)
+    ids_data = message_data[:end]
+    if not (ids_data[:1].isdigit() and ids_data.replace(b' ', b'').isdigit()
+        ):
+        m = _msg_id_pattern.match(message_data)
+        if not m:
+            raise ValueError('unexpected message list format')
+        end = m.end(1)
+        ids_data = m.group(1)
+    ids = cls(map(int, ids_data.split()))
+    extra = message_data[end:]
+    if extra.strip():
+        for item in parse_response([extra]):
+            if isinstance(item, tuple) and len(item) == 2 and cast(bytes,
+                item[0]).lower() == b'modseq':
+                if TYPE_CHECKING:
+                    assert isinstance(item[1], int)
+                ids.modseq = item[1]
+            elif isinstance(item, int):
+                ids.append(item)
+    return ids
+
+
+def gen_parsed_response(text: List[bytes]) ->Iterator[_Atom]:
+    if not text:
+        return
+    src = TokenSource(text)
+    token = None
+    try:
+        for token in src:
+            yield atom(src, token)
+    except ProtocolError:
+        raise
+    except ValueError:
+        _, err, _ = sys.exc_info()
+        raise ProtocolError('%s: %r' % (str(err), token))
 
 
 _ParseFetchResponseInnerDict = Dict[bytes, Optional[Union[datetime.datetime,
-    int, BodyData, Envelope, _Atom]]]
+    int, BodyData, LazyBodyData, Envelope, _Atom]]]
 
 
 def parse_fetch_response(text: List[bytes], normalise_times: bool=True,
-    uid_is_key: bool=True) ->'defaultdict[int, _ParseFetchResponseInnerDict]':
+    uid_is_key: bool=True, lazy: bool=False
+    ) ->'defaultdict[int, _ParseFetchResponseInnerDict]':
     """Pull apart IMAP FETCH responses as returned by imaplib.
 
     Returns a dictionary, keyed by message ID. Each value a dictionary
     keyed by FETCH field type (eg."RFC822").
-    """
-    response = defaultdict(dict)
-    lexer = TokenSource(text)
 
+    Literal values are returned as the objects found in *text*
+    without being copied, so literals read as memoryviews are
+    returned as memoryviews.
+
+    If *lazy* is True, ENVELOPE values are returned as LazyEnvelope
+    instances and BODY/BODYSTRUCTURE values as LazyBodyData instances,
+    which are only converted when first used.
+    """
+    if text == [None]:
+        return defaultdict()
+    convert_envelope = functools.partial(_convert_ENVELOPE,
+        normalise_times=normalise_times)
+    response = gen_parsed_response(text)
+    parsed_response: 'defaultdict[int, _ParseFetchResponseInnerDict]' = (
+        defaultdict(dict))
+    # INTERNALDATE values are converted together once the whole
+    # response has been parsed. See parse_to_datetimes().
+    internaldate_msgs: List[_ParseFetchResponseInnerDict] = []
     while True:
         try:
-            msg_id = int(next(lexer))
+            msg_id = seq = _int_or_error(next(response), 'invalid message ID')
         except StopIteration:
             break
-
-        if next(lexer) != b'(':
-            raise ProtocolError('Expected "(" in FETCH response')
-
-        for key, value in _parse_fetch_pairs(lexer, normalise_times):
-            if uid_is_key and key == b'UID':
-                msg_id = value
+        try:
+            msg_response = next(response)
+        except StopIteration:
+            raise ProtocolError('unexpected EOF')
+        if not isinstance(msg_response, tuple):
+            raise ProtocolError('bad response type: %s' % repr(msg_response))
+        if len(msg_response) % 2:
+            raise ProtocolError('uneven number of response items: %s' %
+                repr(msg_response))
+        msg_data: _ParseFetchResponseInnerDict = {b'SEQ': seq}
+        for i in range(0, len(msg_response), 2):
+            msg_attribute = msg_response[i]
+            if TYPE_CHECKING:
+                assert isinstance(msg_attribute, bytes)
+            word = msg_attribute.upper()
+            value = msg_response[i + 1]
+            if word == b'UID':
+                uid = _int_or_error(value, 'invalid UID')
+                if uid_is_key:
+                    msg_id = uid
+                else:
+                    msg_data[word] = uid
+            elif word == b'INTERNALDATE':
+                msg_data[word] = value
+            elif word == b'ENVELOPE':
+                if lazy:
+                    if TYPE_CHECKING:
+                        assert isinstance(value, tuple)
+                    msg_data[word] = LazyEnvelope(value, convert_envelope)
+                else:
+                    msg_data[word] = _convert_ENVELOPE(value, normalise_times)
+            elif word in (b'BODY', b'BODYSTRUCTURE'):
+                if TYPE_CHECKING:
+                    assert isinstance(value, tuple)
+                if lazy:
+                    msg_data[word] = LazyBodyData(value)
+                else:
+                    msg_data[word] = BodyData.create(value)
             else:
-                response[msg_id][key] = value
+                msg_data[word] = value
+        if b'INTERNALDATE' in msg_data:
+            internaldate_msgs.append(parsed_response[msg_id])
+        parsed_response[msg_id].update(msg_data)
+    if internaldate_msgs:
+        dates = parse_to_datetimes([cast(Optional[bytes], msg_data[
+            b'INTERNALDATE']) for msg_data in internaldate_msgs],
+            normalise_times)
+        for msg_data, dt in zip(internaldate_msgs, dates):
+            msg_data[b'INTERNALDATE'] = dt
+    return parsed_response
 
-        if next(lexer) != b')':
-            raise ProtocolError('Expected ")" in FETCH response')
 
-    return response
+def _int_or_error(value: _Atom, error_text: str) ->int:
+    if TYPE_CHECKING:
+        assert isinstance(value, (int, bytes))
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ProtocolError('%s: %s' % (error_text, repr(value)))
 
-def _parse_fetch_pairs(lexer: TokenSource, normalise_times: bool) ->Iterator[Tuple[bytes, Union[datetime.datetime, int, BodyData, Envelope, _Atom]]]:
-    while True:
+
+def _convert_ENVELOPE(envelope_response: _Atom, normalise_times: bool=True
+    ) ->Envelope:
+    if TYPE_CHECKING:
+        assert isinstance(envelope_response, tuple)
+    dt = None
+    if envelope_response[0]:
         try:
-            key = next(lexer)
-        except StopIteration:
-            return
-
-        if key == b')':
-            lexer.push(key)
-            return
-
-        value = _parse_fetch_value(lexer, key, normalise_times)
-        yield key, value
-
-def _parse_fetch_value(lexer: TokenSource, key: bytes, normalise_times: bool) ->Union[datetime.datetime, int, BodyData, Envelope, _Atom]:
-    if key in (b'INTERNALDATE', b'ENVELOPE'):
-        value = next(lexer)
-        if key == b'INTERNALDATE' and normalise_times:
-            return parse_to_datetime(value.decode('ascii'))
-        elif key == b'ENVELOPE':
-            return Envelope(*parse_response(value))
-    elif key == b'BODY' and next(lexer) == b'[':
-        section = b''
-        while True:
-            token = next(lexer)
-            if token == b']':
-                break
-            section += token
-        next(lexer)  # Consume the space
-        value = next(lexer)
-        return BodyData(section, value)
-    else:
-        value = next(lexer)
-        if isinstance(value, int):
-            return value
-        return value.decode('ascii')
+            if TYPE_CHECKING:
+                assert isinstance(envelope_response[0], bytes)
+            dt = parse_to_datetime(envelope_response[0], normalise=
+                normalise_times)
+        except ValueError:
+            pass
+    subject = envelope_response[1]
+    if TYPE_CHECKING:
+        assert isinstance(subject, bytes)
+    addresses: List[Optional[Tuple[Address, ...]]] = []
+    for addr_list in envelope_response[2:8]:
+        addrs = []
+        if addr_list:
+            if TYPE_CHECKING:
+                assert isinstance(addr_list, tuple)
+            for addr_tuple in addr_list:
+                if TYPE_CHECKING:
+                    assert isinstance(addr_tuple, tuple)
+                if addr_tuple:
+                    addrs.append(_make_address(addr_tuple))
+            addresses.append(tuple(addrs))
+        else:
+            addresses.append(None)
+    in_reply_to, message_id = envelope_response[8:10]
+    if TYPE_CHECKING:
+        assert isinstance(in_reply_to, bytes)
+        assert isinstance(message_id, bytes)
+    return Envelope(date=dt, subject=subject, from_=addresses[0], sender=
+        addresses[1], reply_to=addresses[2], to=addresses[3], cc=addresses[
+        4], bcc=addresses[5], in_reply_to=in_reply_to, message_id=message_id)
+
+
+def _make_address(addr_tuple: Tuple[_Atom, ...]) ->Address:
+    if len(addr_tuple) == 4:
+        name, route, mailbox, host = addr_tuple
+        return Address(cast(bytes, name), cast(bytes, route), cast(bytes,
+            _intern_bytes(mailbox)), cast(bytes, _intern_bytes(host)))
+    return Address(*cast(Tuple[bytes, ...], addr_tuple))
+
+
+@functools.lru_cache(maxsize=8192)
+def _intern_bytes_cached(value: bytes) ->bytes:
+    return value
+
+
+def _intern_bytes(value: _Atom) ->_Atom:
+    """Return a previously seen bytes object equal to *value* if there
+    is one, so that repeated address parts share storage."""
+    if type(value) is bytes:
+        return _intern_bytes_cached(value)
+    return value
+
+
+def atom(src: TokenSource, token: bytes) ->_Atom:
+    if token == b'(':
+        return parse_tuple(src)
+    if token == b'NIL':
+        return None
+    if token[:1] == b'{':
+        literal_len = int(token[1:-1])
+        literal_text = src.current_literal
+        if literal_text is None:
+            raise ProtocolError('No literal corresponds to %r' % token)
+        if len(literal_text) != literal_len:
+            raise ProtocolError('Expecting literal of size %d, got %d' % (
+                literal_len, len(literal_text)))
+        return literal_text
+    if len(token) >= 2 and token[:1] == token[-1:] == b'"':
+        return token[1:-1]
+    if token.isdigit() and (token[:1] != b'0' or len(token) == 1):
+        return int(token)
+    return token
+
+
+def parse_tuple(src: TokenSource) ->_Atom:
+    out: List[_Atom] = []
+    for token in src:
+        if token == b')':
+            return tuple(out)
+        out.append(atom(src, token))
+    raise ProtocolError('Tuple incomplete before "(%s"' % _fmt_tuple(out))
+
+
+def _fmt_tuple(t: List[_Atom]) ->str:
+    return ' '.join(str(item) for item in t)
@@ -0,0 +1,255 @@
+"""
+Reading of server responses through a reusable buffer.
+
+imaplib reads responses a line at a time from a buffered file object
+and then strips each line, and it runs a regular expression over every
+line to look for literals. The classes here receive data with
+``recv_into`` into one growable ``bytearray``, find line endings and
+``{n}`` literal markers directly in that buffer, and copy each line
+out exactly once, already stripped of its CRLF.
+"""
+import imaplib
+import socket
+from typing import Any, Callable, Dict, List, Optional, Pattern, Tuple, Union
+_DEFAULT_BUFSIZE = 64 * 1024
+_MAXLINE = getattr(imaplib, '_MAXLINE', 1000000)
+_Item = Union[bytes, Tuple[bytes, Union[bytes, memoryview]]]
+# Not included in imaplib's type stubs.
+_UNTAGGED_RESPONSE: Pattern[bytes] = imaplib.Untagged_response  # type: ignore[attr-defined]
+_CONTINUATION: Pattern[bytes] = imaplib.Continuation  # type: ignore[attr-defined]
+_RESPONSE_CODE: Pattern[bytes] = imaplib.Response_code  # type: ignore[attr-defined]
+
+
+class ResponseReader:
+    """Reads lines and literals from *sock*.
+
+    Lines are returned as bytes without their CRLF. Literals are
+    returned as bytes, or as a memoryview if requested; a memoryview
+    literal larger than what is already buffered is received straight
+    into its own buffer, without any further copies.
+    """
+
+    def __init__(self, sock: socket.socket, bufsize: int=_DEFAULT_BUFSIZE
+        ) ->None:
+        self.sock = sock
+        self._bufsize = bufsize
+        self._buf = bytearray(bufsize)
+        self._view = memoryview(self._buf)
+        self._start = 0
+        self._end = 0
+
+    def _fill(self) ->int:
+        """Receive more data after what's buffered, making room first
+        if needed. Returns the number of bytes received.
+        """
+        unread = self._end - self._start
+        if self._start and (self._end == len(self._buf) or unread == 0):
+            self._buf[:unread] = self._view[self._start:self._end]
+            self._start = 0
+            self._end = unread
+        if (self._start == 0 and len(self._buf) > self._bufsize and self.
+            _end <= self._bufsize // 2):
+            # Give back the memory taken by an unusually long line.
+            self._view.release()
+            del self._buf[self._bufsize:]
+            self._view = memoryview(self._buf)
+        if self._end == len(self._buf):
+            self._view.release()
+            self._buf.extend(bytes(len(self._buf)))
+            self._view = memoryview(self._buf)
+        received = self.sock.recv_into(self._view[self._end:])
+        self._end += received
+        return received
+
+    def read_line(self) ->bytes:
+        """Return the next line without its CRLF.
+
+        Raises EOFError if the connection is closed before a complete
+        line is received.
+        """
+        scanned = 0
+        while True:
+            nl = self._buf.find(b'\n', self._start + scanned, self._end)
+            if nl >= 0:
+                break
+            # Kept relative to _start as _fill() may move the data.
+            scanned = self._end - self._start
+            if scanned > _MAXLINE:
+                raise imaplib.IMAP4.error('got more than %d bytes' % _MAXLINE)
+            if not self._fill():
+                raise EOFError('unterminated line' if scanned else 'EOF')
+        line_end = nl - 1 if nl > self._start and self._buf[nl - 1
+            ] == 13 else nl
+        line = self._view[self._start:line_end].tobytes()
+        self._start = nl + 1
+        return line
+
+    def readline(self) ->bytes:
+        """Return the next line including its line ending, as per
+        :py:meth:`io.BufferedReader.readline`.
+        """
+        try:
+            return self.read_line() + b'\r\n'
+        except EOFError:
+            line = self._view[self._start:self._end].tobytes()
+            self._start = self._end
+            return line
+
+    def read(self, size: int, as_memoryview: bool=False) ->Union[bytes,
+        memoryview]:
+        """Return the next *size* bytes, or fewer if the connection is
+        closed first.
+        """
+        buffered = self._end - self._start
+        if buffered >= size:
+            data = self._view[self._start:self._start + size]
+            self._start += size
+            if as_memoryview:
+                return memoryview(bytearray(data))
+            return data.tobytes()
+        out = bytearray(size)
+        view = memoryview(out)
+        view[:buffered] = self._view[self._start:self._end]
+        self._start = self._end = 0
+        pos = buffered
+        while pos < size:
+            received = self.sock.recv_into(view[pos:])
+            if not received:
+                view = view[:pos]
+                break
+            pos += received
+        if as_memoryview:
+            return view
+        return view.tobytes()
+
+    def read_response(self, as_memoryview: bool=False) ->List[_Item]:
+        """Read one complete response.
+
+        The response is returned in the form imaplib stores responses,
+        and the response parser consumes them: a list of lines, where a
+        line that introduces a literal is given as a ``(line, literal)``
+        tuple.
+        """
+        items: List[_Item] = []
+        while True:
+            line = self.read_line()
+            if not line.endswith(b'}'):
+                items.append(line)
+                return items
+            brace = line.rfind(b'{')
+            size = line[brace + 1:-1]
+            if brace < 0 or not size.isdigit():
+                items.append(line)
+                return items
+            items.append((line, self.read(int(size), as_memoryview)))
+
+
+class ResponseReaderMixin:
+    """Makes an :py:class:`imaplib.IMAP4` subclass read responses with
+    a :py:class:`ResponseReader` on ``self.sock`` instead of through
+    ``self.file``.
+
+    Whole responses, including their literals, are read in one go and
+    stored in ``untagged_responses`` in the same form as imaplib
+    stores them. Unlike imaplib, untagged responses aren't logged a
+    second time when they are stored.
+    """
+    _reader: Optional[ResponseReader] = None
+    # Provided by imaplib.IMAP4 and the class mixing this in.
+    sock: socket.socket
+    memoryview_literals: bool
+    debug: int
+    tagged_commands: Dict[bytes, Any]
+    untagged_responses: Dict[str, List[Any]]
+    Untagged_status: Pattern[bytes]
+    _encoding: str
+    _mesg: Callable[[str], None]
+    _log: Callable[[str], None]
+    _append_untagged: Callable[[str, bytes], None]
+
+    def _response_reader(self) ->ResponseReader:
+        reader = self._reader
+        if reader is None or reader.sock is not self.sock:
+            # A new socket is in use after STARTTLS.
+            reader = self._reader = ResponseReader(self.sock)
+        return reader
+
+    def read(self, size: int) ->Union[bytes, memoryview]:
+        return self._response_reader().read(size, self.memoryview_literals)
+
+    def readline(self) ->bytes:
+        return self._response_reader().readline()
+
+    def _get_line(self) ->bytes:
+        try:
+            line = self._response_reader().read_line()
+        except EOFError as e:
+            raise imaplib.IMAP4.abort('socket error: %s' % e)
+        if __debug__:
+            self._log_line(line)
+        return line
+
+    def _log_line(self, line: bytes) ->None:
+        if self.debug >= 4:
+            self._mesg('< %r' % line)
+        else:
+            self._log('< %r' % line)
+
+    def _get_response(self) ->Optional[bytes]:
+        try:
+            record = self._response_reader().read_response(self.
+                memoryview_literals)
+        except EOFError as e:
+            raise imaplib.IMAP4.abort('socket error: %s' % e)
+        first = record[0]
+        resp = first if isinstance(first, bytes) else first[0]
+        if __debug__:
+            for item in record:
+                self._log_line(item if isinstance(item, bytes) else item[0])
+        # imaplib's type stubs give tagre and continuation_response as
+        # str, but bytes are used.
+        imap: Any = self
+        mo = imap.tagre.match(resp)
+        if mo is not None:
+            tag = mo.group('tag')
+            if tag not in self.tagged_commands:
+                raise imaplib.IMAP4.abort('unexpected tagged response: %r' % resp)
+            typ = str(mo.group('type'), self._encoding)
+            dat = mo.group('data')
+            self.tagged_commands[tag] = typ, [dat]
+        else:
+            dat2 = None
+            mo = _UNTAGGED_RESPONSE.match(resp)
+            if mo is None:
+                mo = self.Untagged_status.match(resp)
+                if mo is not None:
+                    dat2 = mo.group('data2')
+            if mo is None:
+                mo = _CONTINUATION.match(resp)
+                if mo is not None:
+                    imap.continuation_response = mo.group('data')
+                    return None
+                raise imaplib.IMAP4.abort('unexpected response: %r' % resp)
+            typ = str(mo.group('type'), self._encoding)
+            dat = mo.group('data')
+            if dat is None:
+                dat = b''
+            if dat2:
+                dat = dat + b' ' + dat2
+            record[0] = dat if isinstance(first, bytes) else (dat, first[1])
+            if len(record) > 1:
+                dat = record[-1]
+            ur = self.untagged_responses
+            if typ in ur:
+                ur[typ].extend(record)
+            else:
+                ur[typ] = record
+        if typ in ('OK', 'NO', 'BAD'):
+            mo = _RESPONSE_CODE.match(dat)
+            if mo is not None:
+                self._append_untagged(str(mo.group('type'), self._encoding),
+                    mo.group('data'))
+        if __debug__:
+            if self.debug >= 1 and typ in ('NO', 'BAD', 'BYE'):
+                self._mesg('%s response: %r' % (typ, dat))
+        return resp
@@ -1,7 +1,9 @@
 import dataclasses
 import datetime
+from array import array
+from bisect import bisect_left
 from email.utils import formataddr
-from typing import Any, List, Optional, Tuple, TYPE_CHECKING, Union
+from typing import Any, Callable, FrozenSet, Iterable, Iterator, List, Optional, overload, Sequence, Set, Tuple, TYPE_CHECKING, Union
 from .typing_imapclient import _Atom
 from .util import to_unicode
 
@@ -47,7 +49,12 @@ class Envelope:
 
     See :rfc:`3501#section-7.4.2` and :rfc:`2822` for further details.
 
+    Instances use ``__slots__`` rather than a per-instance ``__dict__``
+    to keep memory use down when many envelopes are held.
+
     """
+    __slots__ = ('date', 'subject', 'from_', 'sender', 'reply_to', 'to',
+        'cc', 'bcc', 'in_reply_to', 'message_id')
     date: Optional[datetime.datetime]
     subject: bytes
     from_: Optional[Tuple['Address', ...]]
@@ -60,6 +67,39 @@ class Envelope:
     message_id: bytes
 
 
+class LazyEnvelope(Envelope):
+    """
+    An :py:class:`Envelope` which holds the raw parsed ENVELOPE
+    response and only converts it when one of its attributes is first
+    accessed. Returned by ``fetch()`` when *lazy_fetch_structures* is
+    set on the client.
+
+    Behaves as the :py:class:`Envelope` it stands in for, including
+    comparisons against ordinary Envelope instances.
+    """
+
+    def __init__(self, response: Tuple[_Atom, ...], convert: Callable[[
+        Tuple[_Atom, ...]], Envelope]):
+        self._response: Optional[Tuple[_Atom, ...]] = response
+        self._convert = convert
+
+    def __getattr__(self, name: str) ->Any:
+        response = self.__dict__.get('_response')
+        if name.startswith('_') or response is None:
+            raise AttributeError(name)
+        envelope = self._convert(response)
+        for field in dataclasses.fields(Envelope):
+            setattr(self, field.name, getattr(envelope, field.name))
+        self._response = None
+        return getattr(self, name)
+
+    def __eq__(self, other: object) ->bool:
+        if not isinstance(other, Envelope):
+            return NotImplemented
+        return all(getattr(self, field.name) == getattr(other, field.name) for
+            field in dataclasses.fields(Envelope))
+
+
 @dataclasses.dataclass
 class Address:
     """Represents electronic mail addresses. Used to store addresses in
@@ -82,7 +122,12 @@ class Address:
 
     See also :py:class:`Envelope` for information about handling of
     "group syntax".
+
+    Like Envelope, instances use ``__slots__``. When created by the
+    FETCH parser, repeated *mailbox* and *host* values share a single
+    bytes object.
     """
+    __slots__ = ('name', 'route', 'mailbox', 'host')
     name: bytes
     route: bytes
     mailbox: bytes
@@ -110,6 +155,132 @@ class SearchIds(List[int]):
         self.modseq: Optional[int] = None
 
 
+# Message ids are nz-numbers which fit in 32 bits (RFC 3501).
+_ID_TYPECODE = 'I' if array('I').itemsize >= 4 else 'L'
+
+
+class CompactSearchIds(Sequence[int]):
+    """
+    A memory efficient alternative to :py:class:`SearchIds`, returned
+    by ``IMAPClient.search(..., compact=True)``.
+
+    Message ids are held in an ``array.array`` of unsigned integers,
+    using 4 bytes per id instead of a pointer to a separate Python
+    int. The order of the ids is preserved. Iteration, ``len()``,
+    indexing, slicing and membership tests work as for a list and
+    instances compare equal to lists containing the same ids.
+    Membership tests use a binary search when the ids are in
+    ascending order, as they normally are for SEARCH results.
+
+    Results can be combined using :py:meth:`intersection`,
+    :py:meth:`difference` and :py:meth:`union` (or ``&``, ``-`` and
+    ``|``). These accept any iterable of message ids and keep the
+    order of this instance.
+
+    Use ``list()`` to obtain an ordinary list if required.
+
+    The *modseq* attribute is as for :py:class:`SearchIds`.
+    """
+
+    def __init__(self, ids: Iterable[int]=()):
+        self._ids = ids if isinstance(ids, array) else array(_ID_TYPECODE,
+            ids)
+        self.modseq: Optional[int] = None
+        self._ascending: Optional[bool] = None
+
+    def __len__(self) ->int:
+        return len(self._ids)
+
+    def __iter__(self) ->Iterator[int]:
+        return iter(self._ids)
+
+    def __reversed__(self) ->Iterator[int]:
+        return reversed(self._ids)
+
+    @overload
+    def __getitem__(self, index: int) ->int:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) ->'CompactSearchIds':
+        ...
+
+    def __getitem__(self, index: Union[int, slice]) ->Union[int,
+        'CompactSearchIds']:
+        if isinstance(index, slice):
+            return CompactSearchIds(self._ids[index])
+        return self._ids[index]
+
+    def __contains__(self, msgid: object) ->bool:
+        if not isinstance(msgid, int):
+            return False
+        if not self._is_ascending():
+            return msgid in self._ids
+        ids = self._ids
+        i = bisect_left(ids, msgid)
+        return i < len(ids) and ids[i] == msgid
+
+    def _is_ascending(self) ->bool:
+        if self._ascending is None:
+            ids = self._ids
+            self._ascending = all(a < b for a, b in zip(ids, ids[1:]))
+        return self._ascending
+
+    def append(self, msgid: int) ->None:
+        self._ids.append(msgid)
+        self._ascending = None
+
+    def extend(self, ids: Iterable[int]) ->None:
+        self._ids.extend(ids)
+        self._ascending = None
+
+    def intersection(self, other: Iterable[int]) ->'CompactSearchIds':
+        """Return the ids in this result which are also in *other*."""
+        keep = _as_set(other)
+        return CompactSearchIds(array(_ID_TYPECODE, (i for i in self._ids if
+            i in keep)))
+
+    def difference(self, other: Iterable[int]) ->'CompactSearchIds':
+        """Return the ids in this result which are not in *other*."""
+        drop = _as_set(other)
+        return CompactSearchIds(array(_ID_TYPECODE, (i for i in self._ids if
+            i not in drop)))
+
+    def union(self, other: Iterable[int]) ->'CompactSearchIds':
+        """Return the ids in this result followed by those in *other*
+        which aren't already present."""
+        seen = set(self._ids)
+        out = array(_ID_TYPECODE, self._ids)
+        for i in other:
+            if i not in seen:
+                seen.add(i)
+                out.append(i)
+        return CompactSearchIds(out)
+
+    __and__ = intersection
+    __sub__ = difference
+    __or__ = union
+
+    def __eq__(self, other: object) ->bool:
+        if isinstance(other, CompactSearchIds):
+            return self._ids == other._ids
+        if isinstance(other, list):
+            return len(self._ids) == len(other) and all(a == b for a, b in
+                zip(self._ids, other))
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) ->str:
+        return '%s(%r)' % (self.__class__.__name__, self._ids.tolist())
+
+
+def _as_set(ids: Iterable[int]) ->Union[Set[int], FrozenSet[int]]:
+    if isinstance(ids, (set, frozenset)):
+        return ids
+    return set(ids)
+
+
 _BodyDataType = Tuple[Union[bytes, int, 'BodyData'], '_BodyDataType']
 
 
@@ -117,3 +288,65 @@ class BodyData(_BodyDataType):
     """
     Returned when parsing BODY and BODYSTRUCTURE responses.
     """
+
+    @classmethod
+    def create(cls, response: Tuple[_Atom, ...]) ->'BodyData':
+        if isinstance(response[0], tuple):
+            parts = []
+            for i, part in enumerate(response):
+                if isinstance(part, bytes):
+                    break
+                if TYPE_CHECKING:
+                    assert isinstance(part, tuple)
+                parts.append(part)
+            return cls(([cls.create(part) for part in parts],) + response[i:])
+        return cls(response)
+
+    @property
+    def is_multipart(self) ->bool:
+        return isinstance(self[0], list)
+
+
+class LazyBodyData(Sequence[Union[bytes, int, BodyData]]):
+    """
+    Stands in for a :py:class:`BodyData` instance, holding the raw
+    parsed BODY or BODYSTRUCTURE response and only building the
+    BodyData tree when it is first used. Returned by ``fetch()`` when
+    *lazy_fetch_structures* is set on the client.
+
+    Indexing, iteration, ``len()``, comparisons and *is_multipart*
+    work as for BodyData. Use :py:meth:`resolve` to obtain the
+    BodyData instance itself.
+    """
+
+    def __init__(self, response: Tuple[_Atom, ...]):
+        self._response = response
+        self._body: Optional[BodyData] = None
+
+    def resolve(self) ->BodyData:
+        if self._body is None:
+            self._body = BodyData.create(self._response)
+        return self._body
+
+    @property
+    def is_multipart(self) ->bool:
+        return isinstance(self._response[0], tuple)
+
+    def __len__(self) ->int:
+        return len(self.resolve())
+
+    def __iter__(self) ->Iterator[Any]:
+        return iter(self.resolve())
+
+    def __getitem__(self, index: Any) ->Any:
+        return self.resolve()[index]
+
+    def __eq__(self, other: object) ->bool:
+        if isinstance(other, LazyBodyData):
+            other = other.resolve()
+        return self.resolve() == other
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) ->str:
+        return '%s(%r)' % (self.__class__.__name__, self.resolve())
@@ -0,0 +1,121 @@
+"""
+Answering searches from message data held on the client.
+
+Many searches (``UNSEEN``, ``SINCE <date>``, ``FROM <someone>``) only
+look at data a client which keeps folders synchronised already has.
+:py:class:`SearchCache` keeps that data per folder and evaluates
+searches itself, only sending the server the parts of a search it
+can't evaluate.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+from .exceptions import UnsupportedCriteriaError
+from .search_criteria import And, compile_criteria, parse_criteria, to_criteria
+from .sync import FolderSync, SyncResult
+__all__ = ['SearchCache']
+_SEARCH_CACHE_ITEMS = ('FLAGS', 'INTERNALDATE', 'RFC822.SIZE', 'ENVELOPE')
+
+
+class SearchCache:
+    """Keeps *fetch_items* for the messages of folders, synchronised
+    with :py:class:`FolderSync <imapclient.FolderSync>`, and answers
+    searches on them::
+
+        cache = SearchCache(client)
+        cache.search("INBOX", ["UNSEEN", "SINCE", date(2024, 1, 1)])
+
+    A folder is synchronised by the first search of it, and after that
+    only when :py:meth:`refresh` is called (eg. after IDLE reports a
+    change), so results are as of the last refresh.
+
+    Criteria are evaluated as described for
+    :py:func:`compile_criteria
+    <imapclient.search_criteria.compile_criteria>`. When some of the
+    criteria joined by AND can't be evaluated locally (eg. ``TEXT``),
+    only those are sent to the server with ``UID SEARCH`` and its
+    results are filtered with the rest. If a search key which can't be
+    evaluated is inside ``OR`` or ``NOT`` the whole search is sent to
+    the server.
+
+    Dates are fetched with their time zone kept (as if *normalise_times*
+    were False) so that they are compared on the same day the server
+    would use.
+    """
+
+    def __init__(self, client: Any, fetch_items: Sequence[str]=
+        _SEARCH_CACHE_ITEMS) ->None:
+        self.client = client
+        self._sync = FolderSync(client, fetch_items=fetch_items,
+            normalise_times=False)
+        self._fields = [item.upper().encode('ascii') for item in self.
+            _sync.fetch_items]
+        self._messages: Dict[str, Dict[int, Dict[bytes, Any]]] = {}
+
+    def refresh(self, folder: str) ->SyncResult:
+        """Synchronise the data held for *folder* with the server,
+        returning the changes found.
+        """
+        result = self._sync.sync(folder)
+        if result.reset:
+            messages = self._messages[folder] = {}
+        else:
+            messages = self._messages.setdefault(folder, {})
+        for uid in result.vanished:
+            messages.pop(uid, None)
+        messages.update(result.new)
+        for uid, msg_data in result.changed.items():
+            if uid in messages:
+                messages[uid].update(msg_data)
+        return result
+
+    def messages(self, folder: str) ->Dict[int, Dict[bytes, Any]]:
+        """Return the data held for the messages in *folder*, keyed by
+        UID, synchronising it first if it isn't held yet.
+        """
+        if folder not in self._messages:
+            self.refresh(folder)
+        return self._messages[folder]
+
+    def search(self, folder: str, criteria: Any='ALL', charset: Optional[str]=None
+        ) ->List[int]:
+        """Return the UIDs of the messages in *folder* matching
+        *criteria*, as given to :py:meth:`IMAPClient.search
+        <imapclient.IMAPClient.search>`.
+        """
+        try:
+            node = parse_criteria(criteria, charset)
+        except UnsupportedCriteriaError:
+            return self._server_search(folder, criteria, charset)
+        local = []
+        remote = []
+        for operand in node.operands if isinstance(node, And) else [node]:
+            try:
+                compile_criteria(operand, fields=self._fields)
+            except UnsupportedCriteriaError:
+                remote.append(operand)
+            else:
+                local.append(operand)
+        if not local:
+            return self._server_search(folder, criteria, charset)
+        messages = self.messages(folder)
+        if remote:
+            uids = self._server_search(folder, to_criteria(And(tuple(
+                remote))), charset)
+            if any(uid not in messages for uid in uids):
+                self.refresh(folder)
+                messages = self._messages[folder]
+            max_uid = max(messages, default=None)
+            messages = {uid: messages[uid] for uid in uids if uid in messages}
+        else:
+            max_uid = max(messages, default=None)
+        compiled = compile_criteria(And(tuple(local)))
+        return [uid for uid in sorted(messages) if compiled.matches(uid,
+            messages[uid], max_uid)]
+
+    def _server_search(self, folder: str, criteria: Any, charset:
+        Optional[str]) ->List[int]:
+        client = self.client
+        selected = client._selected_folder
+        if selected is None or selected[0] != folder:
+            client.select_folder(folder, readonly=True)
+        uids: List[int] = list(client.search(criteria, charset))
+        return uids
@@ -0,0 +1,404 @@
+"""
+Parsing of search criteria into a tree of search keys.
+
+The criteria accepted by :py:meth:`IMAPClient.search
+<imapclient.IMAPClient.search>` (a string, or a possibly nested list
+of items) are parsed into :py:class:`SearchKey`, :py:class:`Not`,
+:py:class:`Or` and :py:class:`And` nodes so they can be answered
+without the server. See :rfc:`3501#section-6.4.4` for the meaning of
+each search key.
+"""
+import dataclasses
+import re
+from datetime import date, datetime
+from email.header import decode_header, make_header
+from email.utils import formataddr
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+from .exceptions import InvalidCriteriaError, ProtocolError, UnsupportedCriteriaError
+from .response_parser import parse_response
+from .util import to_bytes, to_unicode
+__all__ = ['And', 'CompiledCriteria', 'Not', 'Or', 'SearchKey',
+    'compile_criteria', 'parse_criteria', 'to_criteria']
+_FLAG_KEYS = frozenset(['ALL', 'ANSWERED', 'DELETED', 'DRAFT', 'FLAGGED',
+    'NEW', 'OLD', 'RECENT', 'SEEN', 'UNANSWERED', 'UNDELETED', 'UNDRAFT',
+    'UNFLAGGED', 'UNSEEN'])
+_STRING_KEYS = frozenset(['BCC', 'BODY', 'CC', 'FROM', 'KEYWORD', 'SUBJECT',
+    'TEXT', 'TO', 'UNKEYWORD'])
+_DATE_KEYS = frozenset(['BEFORE', 'ON', 'SINCE', 'SENTBEFORE', 'SENTON',
+    'SENTSINCE'])
+_NUMBER_KEYS = frozenset(['LARGER', 'SMALLER'])
+_RE_SEQUENCE_SET = re.compile('^(\\d+|\\*)(:(\\d+|\\*))?(,(\\d+|\\*)(:(\\d+|\\*))?)*$'
+    )
+_MONTHS = {name: i for i, name in enumerate(['JAN', 'FEB', 'MAR', 'APR',
+    'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC'], 1)}
+_Range = Tuple[Optional[int], Optional[int]]
+_SYSTEM_FLAGS = {'ANSWERED': b'\\answered', 'DELETED': b'\\deleted', 'DRAFT':
+    b'\\draft', 'FLAGGED': b'\\flagged', 'RECENT': b'\\recent', 'SEEN':
+    b'\\seen'}
+_ADDRESS_FIELDS = {'FROM': 'from_', 'TO': 'to', 'CC': 'cc', 'BCC': 'bcc'}
+_DATE_TESTS: Dict[str, Callable[[date, date], bool]] = {'BEFORE': lambda
+    a, b: a < b, 'ON': lambda a, b: a == b, 'SINCE': lambda a, b: a >= b}
+# Called with a message's UID, its FETCH data and the folder's highest UID.
+_Predicate = Callable[[int, Dict[bytes, Any], Optional[int]], bool]
+
+
+@dataclasses.dataclass(frozen=True)
+class SearchKey:
+    """A single search key such as ``SEEN`` or ``FROM "foo"``.
+
+    *name* is the upper case name of the key. *args* holds its
+    converted arguments: strings for string keys, :py:class:`date`
+    instances for date keys, ints for ``LARGER`` and ``SMALLER``, a
+    ``(field name, value)`` pair for ``HEADER``, and a list of
+    ``(first, last)`` ranges for ``UID`` and message sequence sets
+    (name ``SEQUENCE``), where *last* is None for ``n:*`` and both are
+    None for a lone ``*``.
+    """
+    name: str
+    args: Tuple[Any, ...] = ()
+
+
+@dataclasses.dataclass(frozen=True)
+class Not:
+    operand: 'Node'
+
+
+@dataclasses.dataclass(frozen=True)
+class Or:
+    left: 'Node'
+    right: 'Node'
+
+
+@dataclasses.dataclass(frozen=True)
+class And:
+    operands: Tuple['Node', ...]
+
+
+Node = Union[SearchKey, Not, Or, And]
+
+
+def parse_criteria(criteria: Any, charset: Optional[str]=None) ->Node:
+    """Parse search *criteria*, in any of the forms accepted by
+    :py:meth:`IMAPClient.search <imapclient.IMAPClient.search>`.
+
+    Raises :py:exc:`InvalidCriteriaError` if the criteria are malformed
+    and :py:exc:`UnsupportedCriteriaError` if they use search keys not
+    known here (eg. ``MODSEQ`` or ``X-GM-RAW``).
+    """
+    if not criteria:
+        raise InvalidCriteriaError('no criteria specified')
+    charset = charset or 'utf-8'
+    if isinstance(criteria, (str, bytes)):
+        try:
+            tokens = list(parse_response([to_bytes(criteria, charset)]))
+        except ProtocolError as e:
+            raise InvalidCriteriaError(str(e))
+    else:
+        tokens = list(criteria)
+    return _Parser(tokens, charset).parse_all()
+
+
+class _Parser:
+
+    def __init__(self, tokens: List[Any], charset: str) ->None:
+        self.tokens = tokens
+        self.charset = charset
+        self.pos = 0
+
+    def parse_all(self) ->Node:
+        nodes: List[Node] = []
+        while self.pos < len(self.tokens):
+            nodes.append(self.parse_one())
+        if len(nodes) == 1:
+            return nodes[0]
+        return And(tuple(nodes))
+
+    def next_token(self) ->Any:
+        if self.pos >= len(self.tokens):
+            raise InvalidCriteriaError('missing search key argument')
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def parse_one(self) ->Node:
+        token = self.next_token()
+        if isinstance(token, (list, tuple)):
+            if not token:
+                raise InvalidCriteriaError('empty criteria group')
+            return _Parser(list(token), self.charset).parse_all()
+        if isinstance(token, int):
+            return SearchKey('SEQUENCE', (_parse_sequence_set(str(token)),))
+        if isinstance(token, (date, datetime)):
+            raise InvalidCriteriaError('unexpected date: %r' % token)
+        name = self.text(token).upper()
+        if name == 'NOT':
+            return Not(self.parse_one())
+        if name == 'OR':
+            return Or(self.parse_one(), self.parse_one())
+        if name in _FLAG_KEYS:
+            return SearchKey(name)
+        if name in _STRING_KEYS:
+            return SearchKey(name, (self.text(self.next_token()),))
+        if name in _DATE_KEYS:
+            return SearchKey(name, (_parse_date(self.next_token()),))
+        if name in _NUMBER_KEYS:
+            return SearchKey(name, (self.number(self.next_token()),))
+        if name == 'HEADER':
+            field = self.text(self.next_token()).upper()
+            return SearchKey(name, (field, self.text(self.next_token())))
+        if name == 'UID':
+            return SearchKey(name, (_parse_sequence_set(self.text(self.
+                next_token())),))
+        if _RE_SEQUENCE_SET.match(name):
+            return SearchKey('SEQUENCE', (_parse_sequence_set(name),))
+        raise UnsupportedCriteriaError('unsupported search key: %s' % name)
+
+    def text(self, token: Any) ->str:
+        if isinstance(token, bytes):
+            return token.decode(self.charset, 'replace')
+        if isinstance(token, (str, int)):
+            return str(token)
+        raise InvalidCriteriaError('expected a string, got %r' % (token,))
+
+    def number(self, token: Any) ->int:
+        try:
+            return int(token)
+        except (TypeError, ValueError):
+            raise InvalidCriteriaError('expected a number, got %r' % (token,))
+
+
+def _parse_sequence_set(text: str) ->List[_Range]:
+    if not _RE_SEQUENCE_SET.match(text):
+        raise InvalidCriteriaError('invalid sequence set: %s' % text)
+    out: List[_Range] = []
+    for item in text.split(','):
+        first, _, last = item.partition(':')
+        start = None if first == '*' else int(first)
+        end = start if not last else None if last == '*' else int(last)
+        if start is None:
+            start, end = end, start
+        elif end is not None and end < start:
+            start, end = end, start
+        out.append((start, end))
+    return out
+
+
+def _parse_date(token: Any) ->date:
+    if isinstance(token, datetime):
+        return token.date()
+    if isinstance(token, date):
+        return token
+    if isinstance(token, bytes):
+        token = token.decode('ascii', 'replace')
+    parts = str(token).split('-')
+    try:
+        day, month, year = parts
+        return date(int(year), _MONTHS[month.upper()], int(day))
+    except (KeyError, ValueError):
+        raise InvalidCriteriaError('invalid date: %r' % (token,))
+
+
+class CompiledCriteria:
+    """Search criteria compiled into a Python predicate by
+    :py:func:`compile_criteria`.
+
+    :ivar fields: the FETCH response keys (eg. ``b'FLAGS'``) the
+        criteria need in each message's data
+    """
+
+    def __init__(self, predicate: _Predicate, fields: Iterable[bytes]
+        ) ->None:
+        self._predicate = predicate
+        self.fields = frozenset(fields)
+
+    def matches(self, uid: int, msg_data: Dict[bytes, Any], max_uid:
+        Optional[int]=None) ->bool:
+        """Return True if the message with *uid* and FETCH data
+        *msg_data* matches. *max_uid* is the highest UID in the folder,
+        which ``*`` in UID sets refers to.
+        """
+        return self._predicate(uid, msg_data, max_uid)
+
+    def search(self, messages: Dict[int, Dict[bytes, Any]]) ->List[int]:
+        """Return the sorted UIDs of the matching messages in
+        *messages*, a dict of FETCH data keyed by UID as returned by
+        :py:meth:`IMAPClient.fetch <imapclient.IMAPClient.fetch>`.
+        """
+        max_uid = max(messages, default=None)
+        predicate = self._predicate
+        return sorted(uid for uid, msg_data in messages.items() if
+            predicate(uid, msg_data, max_uid))
+
+
+def compile_criteria(criteria: Any, charset: Optional[str]=None, fields:
+    Optional[Iterable[bytes]]=None) ->CompiledCriteria:
+    """Compile search *criteria* (as accepted by :py:func:`parse_criteria`,
+    or an already parsed node) so they can be evaluated against FETCH
+    data held on the client.
+
+    Flag, date, size, UID, address and subject keys are supported.
+    Keys that need the text or headers of messages (``TEXT``,
+    ``BODY``, ``HEADER``) or message sequence numbers raise
+    :py:exc:`UnsupportedCriteriaError`, as do keys needing FETCH data
+    not in *fields*, if given.
+
+    Dates are compared on the day given by their own time zone, as the
+    server does, so INTERNALDATE and ENVELOPE should be fetched with
+    *normalise_times* False for the results to agree with the server's.
+    """
+    node = criteria if isinstance(criteria, (SearchKey, Not, Or, And)
+        ) else parse_criteria(criteria, charset)
+    needed: Set[bytes] = set()
+    predicate = _compile(node, needed)
+    if fields is not None:
+        missing = needed - {to_bytes(f).upper() for f in fields}
+        if missing:
+            raise UnsupportedCriteriaError('criteria need uncached %s' %
+                b', '.join(sorted(missing)).decode('ascii'))
+    return CompiledCriteria(predicate, needed)
+
+
+def _compile(node: Node, needed: Set[bytes]) ->_Predicate:
+    if isinstance(node, And):
+        parts = [_compile(operand, needed) for operand in node.operands]
+        return lambda uid, data, max_uid: all(p(uid, data, max_uid) for p in
+            parts)
+    if isinstance(node, Or):
+        left = _compile(node.left, needed)
+        right = _compile(node.right, needed)
+        return lambda uid, data, max_uid: left(uid, data, max_uid
+            ) or right(uid, data, max_uid)
+    if isinstance(node, Not):
+        operand = _compile(node.operand, needed)
+        return lambda uid, data, max_uid: not operand(uid, data, max_uid)
+    name = node.name
+    arg = node.args[0] if node.args else None
+    if name == 'ALL':
+        return lambda uid, data, max_uid: True
+    if name == 'UID':
+        return lambda uid, data, max_uid: _in_ranges(uid, arg, max_uid)
+    if name in ('NEW', 'OLD') or name in _SYSTEM_FLAGS or name.startswith(
+        'UN') and name[2:] in _SYSTEM_FLAGS or name in ('KEYWORD', 'UNKEYWORD'
+        ):
+        needed.add(b'FLAGS')
+        return _flag_predicate(name, arg)
+    if name in _ADDRESS_FIELDS or name == 'SUBJECT':
+        needed.add(b'ENVELOPE')
+        value = arg.lower()
+        text: Callable[[Any], Optional[str]]
+        if name == 'SUBJECT':
+            text = lambda env: _header_text(env.subject)
+        else:
+            attr = _ADDRESS_FIELDS[name]
+            text = lambda env: _addresses_text(getattr(env, attr))
+        return lambda uid, data, max_uid: value in (text(data[b'ENVELOPE']
+            ) or '').lower()
+    if name in _DATE_TESTS:
+        needed.add(b'INTERNALDATE')
+        test = _DATE_TESTS[name]
+        return lambda uid, data, max_uid: test(data[b'INTERNALDATE'].date(),
+            arg)
+    if name.startswith('SENT') and name[4:] in _DATE_TESTS:
+        needed.add(b'ENVELOPE')
+        test = _DATE_TESTS[name[4:]]
+        return lambda uid, data, max_uid: data[b'ENVELOPE'
+            ].date is not None and test(data[b'ENVELOPE'].date.date(), arg)
+    if name in _NUMBER_KEYS:
+        needed.add(b'RFC822.SIZE')
+        if name == 'LARGER':
+            return lambda uid, data, max_uid: data[b'RFC822.SIZE'] > arg
+        return lambda uid, data, max_uid: data[b'RFC822.SIZE'] < arg
+    raise UnsupportedCriteriaError(
+        "search key %s can't be evaluated locally" % name)
+
+
+def _flag_predicate(name: str, arg: Optional[str]) ->_Predicate:
+    if name == 'NEW':
+        return lambda uid, data, max_uid: b'\\recent' in _flags(data
+            ) and b'\\seen' not in _flags(data)
+    if name == 'OLD':
+        return lambda uid, data, max_uid: b'\\recent' not in _flags(data)
+    negate = name.startswith('UN')
+    if name.endswith('KEYWORD'):
+        assert arg is not None
+        flag = arg.lower().encode('utf-8')
+    else:
+        flag = _SYSTEM_FLAGS[name[2:] if negate else name]
+    return lambda uid, data, max_uid: (flag in _flags(data)) != negate
+
+
+def _flags(data: Dict[bytes, Any]) ->Set[bytes]:
+    return {bytes(flag).lower() for flag in data[b'FLAGS']}
+
+
+def _in_ranges(uid: int, ranges: List[_Range], max_uid: Optional[int]
+    ) ->bool:
+    for first, last in ranges:
+        if first is None:
+            if uid == max_uid:
+                return True
+        elif last is None:
+            if uid >= first or uid == max_uid:
+                return True
+        elif first <= uid <= last:
+            return True
+    return False
+
+
+def to_criteria(node: Node) ->List[Any]:
+    """Turn a parsed criteria node back into a criteria list which
+    can be passed to :py:meth:`IMAPClient.search
+    <imapclient.IMAPClient.search>`.
+    """
+    if isinstance(node, And):
+        out: List[Any] = []
+        for operand in node.operands:
+            out.extend(to_criteria(operand))
+        return out
+    if isinstance(node, Or):
+        return ['OR', _group(node.left), _group(node.right)]
+    if isinstance(node, Not):
+        return ['NOT', _group(node.operand)]
+    if node.name in ('UID', 'SEQUENCE'):
+        ranges = ','.join(_format_range(r) for r in node.args[0])
+        return [node.name, ranges] if node.name == 'UID' else [ranges]
+    return [node.name] + list(node.args)
+
+
+def _group(node: Node) ->Any:
+    criteria = to_criteria(node)
+    return criteria if len(criteria) > 1 else criteria[0]
+
+
+def _format_range(item: _Range) ->str:
+    first, last = item
+    if first is None:
+        return '*'
+    if last is None:
+        return '%d:*' % first
+    if first == last:
+        return str(first)
+    return '%d:%d' % (first, last)
+
+
+def _header_text(value: Optional[bytes]) ->Optional[str]:
+    if value is None:
+        return None
+    text = to_unicode(bytes(value))
+    try:
+        return str(make_header(decode_header(text)))
+    except (LookupError, ValueError):
+        return text
+
+
+def _addresses_text(addresses: Optional[Tuple[Any, ...]]) ->Optional[str]:
+    if not addresses:
+        return None
+    out = []
+    for address in addresses:
+        if address.mailbox and address.host:
+            addr = to_unicode(address.mailbox) + '@' + to_unicode(address.host)
+        else:
+            addr = to_unicode(address.mailbox or address.host or b'')
+        out.append(formataddr((_header_text(address.name) or '', addr)))
+    return ', '.join(out)
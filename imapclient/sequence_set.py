@@ -0,0 +1,69 @@
+"""
+Conversion between lists of message ids and the compact IMAP
+sequence-set form (eg. ``1:4,7,10:12``).
+
+See :rfc:`3501#section-9` (``sequence-set``) for details.
+"""
+from typing import Iterable, Iterator, List, Tuple, Union
+from .util import to_bytes
+
+
+def ranges(ids: Iterable[int]) ->Iterator[Tuple[int, int]]:
+    """Yield ``(first, last)`` pairs covering the runs of consecutive
+    values in *ids*.
+
+    The input is sorted and duplicates removed first.
+    """
+    it = iter(sorted(set(ids)))
+    for first in it:
+        last = first
+        for i in it:
+            if i != last + 1:
+                yield first, last
+                first = i
+            last = i
+        yield first, last
+
+
+def encode(ids: Iterable[int]) ->bytes:
+    """Encode message ids as a sequence-set, collapsing runs of
+    consecutive ids into ``first:last`` ranges.
+
+    The order of *ids* is not preserved and duplicates are removed.
+    """
+    return b','.join(b'%d' % first if first == last else b'%d:%d' % (
+        first, last) for first, last in ranges(ids))
+
+
+def parse_ranges(s: Union[str, bytes]) ->List[Tuple[int, int]]:
+    """Parse a sequence-set, as found in responses such as ``COPYUID``
+    or ``VANISHED``, returning a list of ``(first, last)`` pairs.
+
+    Ranges given in descending order (eg. ``5:3``) are normalised.
+    The ``*`` form isn't supported as it can't be expanded without
+    knowing the state of the mailbox.
+    """
+    out = []
+    for item in to_bytes(s).split(b','):
+        first, sep, last = item.partition(b':')
+        try:
+            start = int(first)
+            end = int(last) if sep else start
+        except ValueError:
+            raise ValueError('invalid sequence set: %r' % s)
+        if end < start:
+            start, end = end, start
+        out.append((start, end))
+    return out
+
+
+def decode(s: Union[str, bytes]) ->List[int]:
+    """Parse a sequence-set, returning the message ids it contains as
+    a list of integers.
+
+    Ranges are expanded. The ``*`` form isn't supported.
+    """
+    out: List[int] = []
+    for first, last in parse_ranges(s):
+        out.extend(range(first, last + 1))
+    return out
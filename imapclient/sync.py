@@ -0,0 +1,246 @@
+"""
+Incremental synchronisation of folders.
+
+Polling a folder by fetching the flags of every message costs time in
+proportion to the size of the folder. Servers supporting CONDSTORE
+(:rfc:`7162`) give each change a modification sequence number
+(MODSEQ), so a client that remembers the folder's HIGHESTMODSEQ can
+ask for only what changed since, and with QRESYNC also for the UIDs of
+the messages expunged since.
+"""
+import dataclasses
+from logging import getLogger
+from typing import Any, Dict, Iterable, List, MutableMapping, Optional, Sequence, Set, Tuple
+from .sequence_set import decode as decode_sequence_set
+logger = getLogger(__name__)
+__all__ = ['FolderState', 'FolderSync', 'SyncResult']
+
+
+@dataclasses.dataclass
+class FolderState:
+    """What :py:class:`FolderSync` remembers about a folder between
+    runs.
+
+    :ivar uidvalidity: the folder's UIDVALIDITY
+    :ivar highestmodseq: the folder's HIGHESTMODSEQ, or None if the
+        server doesn't support CONDSTORE for it
+    :ivar uids: the UIDs of the messages in the folder
+    :ivar flags: the flags of each message by UID, kept only when
+        *highestmodseq* is None as flag changes are then found by
+        comparing against them
+    """
+    uidvalidity: int
+    highestmodseq: Optional[int]
+    uids: Set[int]
+    flags: Optional[Dict[int, Tuple[bytes, ...]]] = None
+
+
+@dataclasses.dataclass
+class SyncResult:
+    """The changes to a folder found by :py:meth:`FolderSync.sync`.
+
+    :ivar folder: the folder synchronised
+    :ivar reset: True if nothing was known about the folder, or its
+        UIDVALIDITY changed. All of its messages are then reported as
+        new and anything held about the folder before should be
+        discarded.
+    :ivar new: the fetched data for each new message, by UID
+    :ivar changed: the new FLAGS (and MODSEQ, if supported) of each
+        message whose flags changed, by UID
+    :ivar vanished: the UIDs of messages which have been removed
+    """
+    folder: str
+    reset: bool
+    new: Dict[int, Dict[bytes, Any]]
+    changed: Dict[int, Dict[bytes, Any]]
+    vanished: List[int]
+
+
+class FolderSync:
+    """Finds what changed in folders since they were last synchronised.
+
+    *store* is a mapping from folder names to :py:class:`FolderState`
+    where the state of each folder is kept between runs. It defaults
+    to a dict; use a :py:mod:`shelve` to keep the state between
+    processes::
+
+        with shelve.open("sync-state") as store:
+            sync = FolderSync(client, store, fetch_items=["FLAGS", "ENVELOPE"])
+            for folder in folders:
+                result = sync.sync(folder)
+
+    *fetch_items* are fetched for each new message. FLAGS are always
+    included. If *normalise_times* is given it overrides the client's
+    :py:attr:`normalise_times <imapclient.IMAPClient.normalise_times>`
+    setting for these fetches; pass False to keep the time zone of
+    INTERNALDATE and ENVELOPE dates.
+
+    The cheapest strategy the server allows is used:
+
+    * with QRESYNC, a single ``UID FETCH 1:* (FLAGS) (CHANGEDSINCE n
+      VANISHED)`` returns both the changed messages and the UIDs of
+      the expunged ones;
+    * with CONDSTORE, changed messages are fetched with CHANGEDSINCE
+      and a ``UID SEARCH`` is only needed when the message count shows
+      messages were expunged;
+    * otherwise the UIDs returned by ``UID SEARCH ALL`` are compared
+      with the known UIDs and the flags of all messages are fetched and
+      compared with the stored flags.
+
+    QRESYNC and CONDSTORE are enabled on the connection by the first
+    call to :py:meth:`sync`, so it must be made before any folder is
+    selected for QRESYNC to be used. The client must use UIDs
+    (*use_uid* must be True). Folders are selected read-only unless
+    *readonly* is False.
+    """
+
+    def __init__(self, client: Any, store: Optional[MutableMapping[str,
+        FolderState]]=None, fetch_items: Sequence[str]=('FLAGS',), readonly:
+        bool=True, normalise_times: Optional[bool]=None) ->None:
+        if not client.use_uid:
+            raise ValueError('FolderSync requires a client using UIDs')
+        self.client = client
+        self.store = {} if store is None else store
+        self.fetch_items = list(fetch_items)
+        if not any(item.upper() == 'FLAGS' for item in self.fetch_items):
+            self.fetch_items.append('FLAGS')
+        self.readonly = readonly
+        self.normalise_times = normalise_times
+        self._condstore: Optional[bool] = None
+        self._qresync = False
+
+    def sync(self, folder: str) ->SyncResult:
+        """Select *folder* and return the changes made to it since the
+        last call for it, updating the stored state.
+        """
+        self._enable_extensions()
+        info = self.client.select_folder(folder, readonly=self.readonly)
+        uidvalidity = info[b'UIDVALIDITY']
+        modseq = info.get(b'HIGHESTMODSEQ') if self._condstore else None
+        old = self.store.get(folder)
+        if old is None or old.uidvalidity != uidvalidity:
+            if old is not None:
+                logger.debug('UIDVALIDITY of %s changed, resynchronising',
+                    folder)
+            state, result = self._full_sync(folder, uidvalidity, modseq)
+        elif modseq is not None and old.highestmodseq is not None:
+            state, result = self._sync_changes(folder, old, modseq, info[
+                b'EXISTS'])
+        else:
+            state, result = self._sync_uid_diff(folder, old, modseq)
+        self.store[folder] = state
+        return result
+
+    def _enable_extensions(self) ->None:
+        if self._condstore is not None:
+            return
+        client = self.client
+        self._condstore = client.has_capability('CONDSTORE')
+        wanted = ['QRESYNC'] if client.has_capability('QRESYNC') else []
+        if self._condstore:
+            wanted.append('CONDSTORE')
+        if not wanted or not client.has_capability('ENABLE'):
+            return
+        if client._imap.state != 'AUTH':
+            # ENABLE isn't allowed once a folder has been selected.
+            logger.debug('not enabling %s in state %s', ' '.join(wanted),
+                client._imap.state)
+            return
+        enabled = [c.upper() for c in client.enable(*wanted)]
+        self._qresync = b'QRESYNC' in enabled
+        self._condstore = self._condstore or self._qresync
+
+    def _full_sync(self, folder: str, uidvalidity: int, modseq: Optional[
+        int]) ->Tuple[FolderState, SyncResult]:
+        uids = self.client.search('ALL')
+        new = self._fetch_new(uids)
+        state = FolderState(uidvalidity, modseq, set(uids))
+        if modseq is None:
+            state.flags = {uid: data.get(b'FLAGS', ()) for uid, data in new
+                .items()}
+        return state, SyncResult(folder, True, new, {}, [])
+
+    def _sync_changes(self, folder: str, old: FolderState, modseq: int,
+        exists: int) ->Tuple[FolderState, SyncResult]:
+        assert old.highestmodseq is not None
+        client = self.client
+        vanished: Set[int] = set()
+        if modseq == old.highestmodseq:
+            fetched: Dict[int, Dict[bytes, Any]] = {}
+        else:
+            modifiers = ['CHANGEDSINCE %d' % old.highestmodseq]
+            if self._qresync:
+                modifiers.append('VANISHED')
+                client._imap.untagged_responses.pop('VANISHED', None)
+            fetched = client.fetch('1:*', ['FLAGS'], modifiers)
+            if self._qresync:
+                vanished = old.uids.intersection(_parse_vanished(client.
+                    _imap.untagged_responses.pop('VANISHED', [])))
+        uids = old.uids - vanished
+        new_uids = [uid for uid in fetched if uid not in uids]
+        uids.update(new_uids)
+        if not self._qresync and exists != len(uids):
+            current = set(client.search('ALL'))
+            vanished = uids - current
+            uids &= current
+        new = self._fetch_new([uid for uid in new_uids if uid in uids],
+            fetched)
+        changed = {uid: data for uid, data in fetched.items() if uid in old
+            .uids and uid not in vanished}
+        state = FolderState(old.uidvalidity, modseq, uids)
+        return state, SyncResult(folder, False, new, changed, sorted(vanished))
+
+    def _sync_uid_diff(self, folder: str, old: FolderState, modseq:
+        Optional[int]) ->Tuple[FolderState, SyncResult]:
+        client = self.client
+        current = set(client.search('ALL'))
+        vanished = sorted(old.uids - current)
+        known = sorted(old.uids & current)
+        new = self._fetch_new(sorted(current - old.uids))
+        old_flags = old.flags or {}
+        flags = {}
+        changed = {}
+        if known:
+            for uid, data in client.fetch_batched(known, ['FLAGS']).items():
+                flags[uid] = data.get(b'FLAGS', ())
+                if set(flags[uid]) != set(old_flags.get(uid, ())):
+                    changed[uid] = data
+        for uid, data in new.items():
+            flags[uid] = data.get(b'FLAGS', ())
+        state = FolderState(old.uidvalidity, modseq, current, None if
+            modseq is not None else flags)
+        return state, SyncResult(folder, False, new, changed, vanished)
+
+    def _fetch_new(self, uids: Sequence[int], fetched: Optional[Dict[int,
+        Dict[bytes, Any]]]=None) ->Dict[int, Dict[bytes, Any]]:
+        """Return *fetch_items* for each of *uids*, reusing the FLAGS
+        in *fetched* if that's all that is wanted.
+        """
+        if not uids:
+            return {}
+        if fetched is not None and all(item.upper() == 'FLAGS' for item in
+            self.fetch_items):
+            return {uid: fetched[uid] for uid in uids}
+        client = self.client
+        if self.normalise_times is None:
+            return dict(client.fetch_batched(uids, self.fetch_items))
+        saved = client.normalise_times
+        client.normalise_times = self.normalise_times
+        try:
+            return dict(client.fetch_batched(uids, self.fetch_items))
+        finally:
+            client.normalise_times = saved
+
+
+def _parse_vanished(responses: Iterable[bytes]) ->List[int]:
+    """Return the UIDs in ``VANISHED (EARLIER) <sequence-set>``
+    responses.
+    """
+    out = []
+    for data in responses:
+        data = data.strip()
+        if data.upper().startswith(b'(EARLIER)'):
+            data = data[9:].strip()
+        if data:
+            out.extend(decode_sequence_set(data))
+    return out
@@ -15,6 +15,9 @@ class TestableIMAPClient(IMAPClient):
     def __init__(self) ->None:
         super().__init__('somehost')
 
+    def _create_IMAP4(self) ->'MockIMAP4':
+        return MockIMAP4()
+
 
 class MockIMAP4(Mock):
 
@@ -24,3 +27,9 @@ class MockIMAP4(Mock):
         self.sent = b''
         self.tagged_commands: Dict[Any, Any] = {}
         self._starttls_done = False
+
+    def send(self, data: bytes) ->None:
+        self.sent += data
+
+    def _new_tag(self) ->str:
+        return 'tag'
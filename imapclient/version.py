@@ -1,4 +1,14 @@
 from typing import Tuple
+
+
+def _imapclient_version_string(vinfo: Tuple[int, int, int, str]) ->str:
+    major, minor, micro, releaselevel = vinfo
+    v = '%d.%d.%d' % (major, minor, micro)
+    if releaselevel != 'final':
+        v += '-' + releaselevel
+    return v
+
+
 version_info = 3, 0, 1, 'final'
 version = _imapclient_version_string(version_info)
 maintainer = 'IMAPClient Maintainers'
@@ -0,0 +1,365 @@
+# Copyright (c) 2014, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+import asyncio
+import unittest
+from datetime import datetime
+
+from imapclient.async_imapclient import AsyncIMAPClient
+from imapclient.exceptions import (
+    CapabilityError,
+    IMAPClientAbortError,
+    IMAPClientError,
+    InvalidCriteriaError,
+    LoginError,
+)
+from imapclient.fixed_offset import FixedOffset
+from imapclient.response_types import Envelope
+
+
+class FakeWriter:
+    def __init__(self):
+        self.sent = b""
+        self.closed = False
+
+    def write(self, data):
+        self.sent += data
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    async def wait_closed(self):
+        pass
+
+
+class ScriptedAsyncIMAPClient(AsyncIMAPClient):
+    """AsyncIMAPClient reading pre-canned server output."""
+
+    def __init__(self, script, eof=True):
+        super().__init__("somehost")
+        self.script = script
+        self.eof = eof
+        self.reader = None
+        self.writer = FakeWriter()
+
+    async def _open_connection(self, ssl_context):
+        self.reader = asyncio.StreamReader()
+        self.reader.feed_data(self.script)
+        if self.eof:
+            self.reader.feed_eof()
+        return self.reader, self.writer
+
+
+GREETING = b"* OK [CAPABILITY IMAP4rev1 IDLE] Server ready\r\n"
+
+
+def run(script, func, eof=True):
+    """Connect a scripted client then run *func* with it."""
+
+    async def main():
+        client = ScriptedAsyncIMAPClient(GREETING + script, eof)
+        await client.connect()
+        return client, await func(client)
+
+    return asyncio.run(main())
+
+
+class TestConnect(unittest.TestCase):
+    def test_greeting(self):
+        client, _ = run(b"", lambda c: asyncio.sleep(0))
+        self.assertEqual(client.welcome, GREETING.rstrip())
+        self.assertEqual(client._cached_capabilities, (b"IMAP4REV1", b"IDLE"))
+
+    def test_refused(self):
+        async def main():
+            client = ScriptedAsyncIMAPClient(b"* BYE go away\r\n")
+            await client.connect()
+
+        self.assertRaises(IMAPClientAbortError, asyncio.run, main())
+
+    def test_connection_closed(self):
+        self.assertRaises(IMAPClientAbortError, run, b"", lambda c: c.noop())
+
+
+class TestCommands(unittest.TestCase):
+    def test_login(self):
+        client, out = run(
+            b"A1 OK [CAPABILITY IMAP4rev1 MOVE] Logged in\r\n",
+            lambda c: c.login("user", 'pa"ss'),
+        )
+        self.assertEqual(client.writer.sent, b'A1 LOGIN "user" "pa\\"ss"\r\n')
+        self.assertEqual(out, "[CAPABILITY IMAP4rev1 MOVE] Logged in")
+        self.assertEqual(client._cached_capabilities, (b"IMAP4REV1", b"MOVE"))
+
+    def test_login_failure(self):
+        self.assertRaises(
+            LoginError,
+            run,
+            b"A1 NO bad password\r\n",
+            lambda c: c.login("user", "pass"),
+        )
+
+    def test_8bit_argument_sent_as_literal(self):
+        client, out = run(
+            b"+ go ahead\r\n* SEARCH 2 5\r\nA1 OK done\r\n",
+            lambda c: c.search(["TEXT", "\u00e9"], charset="UTF-8"),
+        )
+        self.assertEqual(
+            client.writer.sent,
+            b"A1 UID SEARCH CHARSET UTF-8 TEXT {2}\r\n\xc3\xa9\r\n",
+        )
+        self.assertEqual(out, [2, 5])
+
+    def test_quoted_8bit_argument_sent_as_literal(self):
+        client, _ = run(
+            b"+ go ahead\r\nA1 OK done\r\n",
+            lambda c: c.search(["SUBJECT", "caf\u00e9 bar"], charset="UTF-8"),
+        )
+        self.assertEqual(
+            client.writer.sent,
+            b"A1 UID SEARCH CHARSET UTF-8 SUBJECT {9}\r\ncaf\xc3\xa9 bar\r\n",
+        )
+
+    def test_search_bad_criteria(self):
+        self.assertRaises(
+            InvalidCriteriaError,
+            run,
+            b"A1 BAD [CLIENTBUG] Unknown argument TOO\r\n",
+            lambda c: c.search("TOO"),
+        )
+
+    def test_search_no_badcharset(self):
+        with self.assertRaises(IMAPClientError) as cm:
+            run(
+                b"A1 NO [BADCHARSET (UTF-8)] Unsupported charset\r\n",
+                lambda c: c.search(["TEXT", "foo"], "KOI8-R"),
+            )
+        self.assertNotIsInstance(cm.exception, InvalidCriteriaError)
+
+    def test_select_folder(self):
+        client, out = run(
+            b"* 3 EXISTS\r\n"
+            b"* 0 RECENT\r\n"
+            b"* FLAGS (\\Answered \\Seen)\r\n"
+            b"* OK [PERMANENTFLAGS (\\Answered \\Seen \\*)] Limited\r\n"
+            b"* OK [UIDVALIDITY 1239278212] UIDs valid\r\n"
+            b"* OK [UIDNEXT 11] Predicted next UID\r\n"
+            b"A1 OK [READ-WRITE] Select completed\r\n",
+            lambda c: c.select_folder("INBOX"),
+        )
+        self.assertEqual(client.writer.sent, b'A1 SELECT "INBOX"\r\n')
+        self.assertEqual(
+            out,
+            {
+                b"EXISTS": 3,
+                b"RECENT": 0,
+                b"FLAGS": (b"\\Answered", b"\\Seen"),
+                b"PERMANENTFLAGS": (b"\\Answered", b"\\Seen", b"\\*"),
+                b"UIDVALIDITY": 1239278212,
+                b"UIDNEXT": 11,
+                b"READ-WRITE": True,
+            },
+        )
+
+    def test_list_folders(self):
+        _, out = run(
+            b'* LIST (\\HasNoChildren) "/" INBOX\r\n'
+            b'* LIST (\\HasNoChildren) "/" {3}\r\nfoo\r\n'
+            b"A1 OK done\r\n",
+            lambda c: c.list_folders(),
+        )
+        self.assertEqual(
+            out,
+            [
+                ((b"\\HasNoChildren",), b"/", "INBOX"),
+                ((b"\\HasNoChildren",), b"/", "foo"),
+            ],
+        )
+
+    def test_folder_status(self):
+        client, out = run(
+            b"* STATUS INBOX (MESSAGES 3 UIDNEXT 11)\r\nA1 OK done\r\n",
+            lambda c: c.folder_status("INBOX", ["MESSAGES", "UIDNEXT"]),
+        )
+        self.assertEqual(
+            client.writer.sent, b'A1 STATUS "INBOX" (MESSAGES UIDNEXT)\r\n'
+        )
+        self.assertEqual(out, {b"MESSAGES": 3, b"UIDNEXT": 11})
+
+    def test_fetch(self):
+        client, out = run(
+            b'* 1 FETCH (UID 11 RFC822 {4}\r\nbody FLAGS (\\Seen) INTERNALDATE "09-Feb-2007 17:08:08 +0000")\r\n'
+            b'* 2 FETCH (UID 12 ENVELOPE (NIL "subject" NIL NIL NIL NIL NIL NIL NIL "<id>"))\r\n'
+            b"A1 OK done\r\n",
+            lambda c: self._fetch(c),
+        )
+        self.assertEqual(
+            client.writer.sent, b"A1 UID FETCH 11:12 (RFC822 FLAGS INTERNALDATE)\r\n"
+        )
+        self.assertEqual(
+            out,
+            {
+                11: {
+                    b"SEQ": 1,
+                    b"RFC822": b"body",
+                    b"FLAGS": (b"\\Seen",),
+                    b"INTERNALDATE": datetime(2007, 2, 9, 17, 8, 8, 0, FixedOffset(0)),
+                },
+                12: {
+                    b"SEQ": 2,
+                    b"ENVELOPE": Envelope(
+                        None,
+                        b"subject",
+                        None,
+                        None,
+                        None,
+                        None,
+                        None,
+                        None,
+                        None,
+                        b"<id>",
+                    ),
+                },
+            },
+        )
+
+    @staticmethod
+    async def _fetch(client):
+        client.normalise_times = False
+        return await client.fetch([11, 12], ["RFC822", "FLAGS", "INTERNALDATE"])
+
+    def test_iter_fetch(self):
+        async def collect(client):
+            return [item async for item in client.iter_fetch([11, 12], ["FLAGS"])]
+
+        _, out = run(
+            b"* 1 FETCH (UID 11 FLAGS ())\r\n"
+            b"* 3 EXISTS\r\n"
+            b"* 2 FETCH (UID 12 FLAGS (\\Seen))\r\n"
+            b"A1 OK done\r\n",
+            collect,
+        )
+        self.assertEqual(
+            out,
+            [
+                (11, {b"SEQ": 1, b"FLAGS": ()}),
+                (12, {b"SEQ": 2, b"FLAGS": (b"\\Seen",)}),
+            ],
+        )
+
+    def test_iter_fetch_closed_early(self):
+        async def first_then_noop(client):
+            agen = client.iter_fetch([11, 12], ["FLAGS"])
+            first = await agen.__anext__()
+            await agen.aclose()
+            return first, await client.noop()
+
+        client, (first, noop) = run(
+            b"* 1 FETCH (UID 11 FLAGS ())\r\n"
+            b"* 2 FETCH (UID 12 FLAGS (\\Seen))\r\n"
+            b"A1 OK done\r\n"
+            b"A2 OK noop done\r\n",
+            first_then_noop,
+        )
+        self.assertEqual(first, (11, {b"SEQ": 1, b"FLAGS": ()}))
+        self.assertEqual(noop, (b"noop done", []))
+
+    def test_add_flags(self):
+        client, out = run(
+            b"* 1 FETCH (FLAGS (\\Seen \\Flagged) UID 11)\r\nA1 OK done\r\n",
+            lambda c: c.add_flags([11], ["\\Flagged"]),
+        )
+        self.assertEqual(client.writer.sent, b"A1 UID STORE 11 +FLAGS (\\Flagged)\r\n")
+        self.assertEqual(out, {11: (b"\\Seen", b"\\Flagged")})
+
+    def test_command_failure(self):
+        self.assertRaises(
+            IMAPClientError,
+            run,
+            b"A1 NO no such folder\r\n",
+            lambda c: c.select_folder("nope"),
+        )
+
+    def test_concurrent_commands_are_serialised(self):
+        async def both(client):
+            return await asyncio.gather(
+                client.folder_status("a", ["MESSAGES"]),
+                client.folder_status("b", ["MESSAGES"]),
+            )
+
+        client, out = run(
+            b"* STATUS a (MESSAGES 1)\r\nA1 OK done\r\n"
+            b"* STATUS b (MESSAGES 2)\r\nA2 OK done\r\n",
+            both,
+        )
+        self.assertEqual(out, [{b"MESSAGES": 1}, {b"MESSAGES": 2}])
+
+    def test_logout(self):
+        client, out = run(
+            b"* BYE bye\r\nA1 OK Logout completed\r\n",
+            lambda c: c.logout(),
+        )
+        self.assertEqual(out, b"Logout completed")
+        self.assertTrue(client.writer.closed)
+
+
+class TestIdle(unittest.TestCase):
+    def test_idle(self):
+        async def idle(client):
+            await client.idle()
+            checked = await client.idle_check(timeout=1)
+            timed_out = await client.idle_check(timeout=0.01)
+            client.reader.feed_data(b"* OK Still here\r\nA1 OK Idle terminated\r\n")
+            done = await client.idle_done()
+            return checked, timed_out, done
+
+        client, (checked, timed_out, done) = run(
+            b"+ idling\r\n* 1 EXISTS\r\n* 1 FETCH (FLAGS (\\Seen))\r\n",
+            idle,
+            eof=False,
+        )
+        self.assertEqual(client.writer.sent, b"A1 IDLE\r\nDONE\r\n")
+        self.assertEqual(
+            checked,
+            [(1, b"EXISTS"), (1, b"FETCH", (b"FLAGS", (b"\\Seen",)))],
+        )
+        self.assertEqual(timed_out, [])
+        self.assertEqual(done, (b"Idle terminated", [(b"OK", b"Still here")]))
+
+    def test_check_timeout_waits_for_literal(self):
+        async def idle(client):
+            await client.idle()
+            loop = asyncio.get_running_loop()
+            loop.call_later(0.05, client.reader.feed_data, b"foo)\r\n")
+            checked = await client.idle_check(timeout=0.01)
+            client.reader.feed_data(b"A1 OK Idle terminated\r\n")
+            done = await client.idle_done()
+            return checked, done
+
+        _, (checked, done) = run(
+            b"+ idling\r\n* 1 FETCH (BODY[] {3}\r\n", idle, eof=False
+        )
+        self.assertEqual(checked, [(1, b"FETCH", (b"BODY[]", b"foo"))])
+        self.assertEqual(done, (b"Idle terminated", []))
+
+    def test_commands_rejected_while_idle(self):
+        async def idle(client):
+            await client.idle()
+            await client.noop()
+
+        self.assertRaises(IMAPClientError, run, b"+ idling\r\n", idle)
+
+    def test_no_idle_capability(self):
+        async def idle(client):
+            client._cached_capabilities = (b"IMAP4REV1",)
+            await client.idle()
+
+        self.assertRaises(CapabilityError, run, b"", idle)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -11,6 +11,7 @@ from imapclient.datetime_util import (
     datetime_to_native,
     format_criteria_date,
     parse_to_datetime,
+    parse_to_datetimes,
 )
 from imapclient.fixed_offset import FixedOffset
 
@@ -58,6 +59,55 @@ class TestParsing(unittest.TestCase):
     def test_invalid(self):
         self.assertRaises(ValueError, parse_to_datetime, b"ABC")
 
+    def test_internaldate_style_month_case(self):
+        self.check_normalised_and_not(
+            b"09-FEB-2007 17:08:08 +0000",
+            datetime(2007, 2, 9, 17, 8, 8, 0, FixedOffset(0)),
+        )
+
+    def test_internaldate_invalid_day(self):
+        self.assertRaises(ValueError, parse_to_datetime, b"30-Feb-2007 17:08:08 +0000")
+
+
+class TestParsingBatch(unittest.TestCase):
+    def test_not_normalised(self):
+        self.assertEqual(
+            parse_to_datetimes(
+                [
+                    b" 9-Feb-2007 17:08:08 -0430",
+                    b"Sun, 24 Mar 2013 22:06:10 +0200",
+                    b" 9-Feb-2007 17:08:08 -0430",
+                ],
+                normalise=False,
+            ),
+            [
+                datetime(2007, 2, 9, 17, 8, 8, 0, FixedOffset(-4 * 60 - 30)),
+                datetime(2013, 3, 24, 22, 6, 10, 0, FixedOffset(120)),
+                datetime(2007, 2, 9, 17, 8, 8, 0, FixedOffset(-4 * 60 - 30)),
+            ],
+        )
+
+    def test_normalised(self):
+        for timestamp in [
+            b" 9-Feb-2007 17:08:08 -0430",
+            b"Sat, 8 May 2010 16.03.09 +0200",
+        ]:
+            [dt] = parse_to_datetimes([timestamp])
+            self.assertIsNone(dt.tzinfo)
+            self.assertEqual(dt, parse_to_datetime(timestamp))
+
+    @patch("imapclient.datetime_util.FixedOffset.for_system")
+    def test_system_timezone_looked_up_once(self, for_system):
+        for_system.return_value = FixedOffset(-5 * 60)
+        out = parse_to_datetimes(
+            [b"01-Jan-2020 12:00:00 +0000", b"01-Jan-2020 13:00:00 +0100"]
+        )
+        self.assertEqual(out, [datetime(2020, 1, 1, 7), datetime(2020, 1, 1, 7)])
+        self.assertEqual(for_system.call_count, 1)
+
+    def test_invalid_and_None(self):
+        self.assertEqual(parse_to_datetimes([b"ABC", None]), [None, None])
+
 
 class TestDatetimeToINTERNALDATE(unittest.TestCase):
     def test_with_timezone(self):
@@ -0,0 +1,218 @@
+# Copyright (c) 2014, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock
+
+from imapclient.fetch_cache import MemoryFetchCache, SQLiteFetchCache
+from imapclient.response_parser import parse_fetch_response
+from imapclient.sequence_set import decode
+
+from .imapclient_test import IMAPClientTest
+
+
+class FetchCacheTests:
+    def make_cache(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.cache = self.make_cache()
+        self.cache.validate("INBOX", 10)
+        self.cache.put_many(
+            "INBOX",
+            10,
+            {
+                1: {b"RFC822.SIZE": 100, b"ENVELOPE": (b"subject", None)},
+                2: {b"RFC822.SIZE": 200},
+            },
+        )
+
+    def test_get_many(self):
+        self.assertEqual(
+            self.cache.get_many("INBOX", 10, [1, 2, 3], [b"RFC822.SIZE"]),
+            {1: {b"RFC822.SIZE": 100}, 2: {b"RFC822.SIZE": 200}},
+        )
+
+    def test_only_complete_entries_returned(self):
+        self.assertEqual(
+            self.cache.get_many("INBOX", 10, [1, 2], [b"RFC822.SIZE", b"ENVELOPE"]),
+            {1: {b"RFC822.SIZE": 100, b"ENVELOPE": (b"subject", None)}},
+        )
+
+    def test_keyed_by_folder_and_uidvalidity(self):
+        self.assertEqual(self.cache.get_many("INBOX", 11, [1], [b"RFC822.SIZE"]), {})
+        self.assertEqual(self.cache.get_many("Sent", 10, [1], [b"RFC822.SIZE"]), {})
+
+    def test_uidvalidity_change(self):
+        self.cache.validate("INBOX", 10)
+        self.assertEqual(
+            len(self.cache.get_many("INBOX", 10, [1, 2], [b"RFC822.SIZE"])), 2
+        )
+
+        self.cache.validate("INBOX", 11)
+        self.cache.validate("INBOX", 10)
+        self.assertEqual(self.cache.get_many("INBOX", 10, [1, 2], [b"RFC822.SIZE"]), {})
+
+    def test_invalidate(self):
+        self.cache.put_many("Sent", 5, {1: {b"RFC822.SIZE": 1}})
+        self.cache.invalidate("INBOX")
+        self.assertEqual(self.cache.get_many("INBOX", 10, [1], [b"RFC822.SIZE"]), {})
+        self.assertEqual(len(self.cache.get_many("Sent", 5, [1], [b"RFC822.SIZE"])), 1)
+
+        self.cache.invalidate()
+        self.assertEqual(self.cache.get_many("Sent", 5, [1], [b"RFC822.SIZE"]), {})
+
+
+class TestMemoryFetchCache(FetchCacheTests, unittest.TestCase):
+    def make_cache(self):
+        return MemoryFetchCache(max_messages=3)
+
+    def test_least_recently_used_dropped(self):
+        self.cache.get_many("INBOX", 10, [1], [b"RFC822.SIZE"])
+        self.cache.put_many(
+            "INBOX", 10, {3: {b"RFC822.SIZE": 3}, 4: {b"RFC822.SIZE": 4}}
+        )
+
+        self.assertEqual(len(self.cache), 3)
+        self.assertEqual(
+            sorted(self.cache.get_many("INBOX", 10, [1, 2, 3, 4], [b"RFC822.SIZE"])),
+            [1, 3, 4],
+        )
+
+
+class TestSQLiteFetchCache(FetchCacheTests, unittest.TestCase):
+    def make_cache(self):
+        fd, self.path = tempfile.mkstemp(suffix=".sqlite")
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+        cache = SQLiteFetchCache(self.path)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_persists(self):
+        reopened = SQLiteFetchCache(self.path)
+        self.addCleanup(reopened.close)
+        self.assertEqual(
+            reopened.get_many("INBOX", 10, [2], [b"RFC822.SIZE"]),
+            {2: {b"RFC822.SIZE": 200}},
+        )
+
+    def test_unnormalised_envelope(self):
+        envelope = parse_fetch_response(
+            [
+                b"1 (UID 3 ENVELOPE "
+                b'("Sun, 24 Mar 2013 22:06:10 +0200" "subject" '
+                b"NIL NIL NIL NIL NIL NIL NIL NIL))"
+            ],
+            normalise_times=False,
+        )[3][b"ENVELOPE"]
+        self.cache.put_many("INBOX", 10, {3: {b"ENVELOPE": envelope}})
+
+        cached = self.cache.get_many("INBOX", 10, [3], [b"ENVELOPE"])[3][b"ENVELOPE"]
+        self.assertEqual(cached, envelope)
+        self.assertEqual(cached.date.utcoffset(), envelope.date.utcoffset())
+
+
+class TestFetchWithCache(IMAPClientTest):
+    def setUp(self):
+        super().setUp()
+        self.client.fetch_cache = MemoryFetchCache()
+        self.client._command_and_check = Mock()
+        self.select(631062293)
+        self.client._imap._command_complete.return_value = ("OK", [b"done"])
+        self.client._imap._untagged_response.side_effect = self.untagged_response
+
+    def select(self, uidvalidity):
+        self.client._imap.untagged_responses = {
+            b"EXISTS": [b"3"],
+            b"UIDVALIDITY": [str(uidvalidity).encode("ascii")],
+        }
+        self.client.select_folder("INBOX")
+
+    def untagged_response(self, typ, data, name):
+        args = self.client._imap._command.call_args[0]
+        items = args[3][1:-1].split()
+        out = []
+        for uid in decode(args[2]):
+            parts = [b"UID %d" % uid]
+            if "RFC822.SIZE" in items:
+                parts.append(b"RFC822.SIZE %d" % (uid * 100))
+            if "FLAGS" in items:
+                parts.append(b"FLAGS (foo)")
+            out.append(b"%d (%s)" % (uid, b" ".join(parts)))
+        return "OK", out
+
+    def sent_commands(self):
+        return [c[0][2:4] for c in self.client._imap._command.call_args_list]
+
+    def test_hits_not_fetched(self):
+        self.client.fetch([1, 2], ["RFC822.SIZE"])
+        out = self.client.fetch([1, 2, 3], ["RFC822.SIZE"])
+
+        self.assertEqual(
+            self.sent_commands(), [(b"1:2", "(RFC822.SIZE)"), (b"3", "(RFC822.SIZE)")]
+        )
+        self.assertEqual(out[1], {b"RFC822.SIZE": 100})
+        self.assertEqual(out[3], {b"RFC822.SIZE": 300, b"SEQ": 3})
+
+    def test_uncacheable_items_still_fetched(self):
+        self.client.fetch([1], ["RFC822.SIZE"])
+        out = self.client.fetch([1, 2], ["RFC822.SIZE", "FLAGS"])
+
+        self.assertEqual(
+            self.sent_commands()[1:],
+            [(b"2", "(RFC822.SIZE FLAGS)"), (b"1", "(FLAGS)")],
+        )
+        self.assertEqual(out[1], {b"RFC822.SIZE": 100, b"FLAGS": (b"foo",), b"SEQ": 1})
+        self.assertEqual(out[2], {b"RFC822.SIZE": 200, b"FLAGS": (b"foo",), b"SEQ": 2})
+
+    def test_uidvalidity_change_invalidates(self):
+        self.client.fetch([1], ["RFC822.SIZE"])
+        self.select(631062294)
+        self.client.fetch([1], ["RFC822.SIZE"])
+
+        self.assertEqual(len(self.sent_commands()), 2)
+
+    def test_not_used_without_selected_folder(self):
+        self.client.fetch([1], ["RFC822.SIZE"])
+        self.client.close_folder()
+        self.client.fetch([1], ["RFC822.SIZE"])
+
+        self.assertEqual(len(self.sent_commands()), 2)
+
+    def test_not_used_for_ranges_or_modifiers(self):
+        self.client.fetch([1], ["RFC822.SIZE"])
+        self.client.fetch("1:3", ["RFC822.SIZE"])
+        self.client.fetch([1], ["RFC822.SIZE"], modifiers=["CHANGEDSINCE 5"])
+
+        self.assertEqual(len(self.sent_commands()), 3)
+
+    def test_generator_of_messages(self):
+        self.client.fetch([1], ["RFC822.SIZE"])
+        self.client.fetch((uid for uid in [1, 2]), ["RFC822.SIZE"])
+        self.client.fetch(
+            (uid for uid in [1, 2]), ["RFC822.SIZE"], modifiers=["CHANGEDSINCE 5"]
+        )
+
+        self.assertEqual(
+            self.sent_commands()[1:],
+            [(b"2", "(RFC822.SIZE)"), (b"1:2", "(RFC822.SIZE)")],
+        )
+
+    def test_header_peek_cached_under_response_key(self):
+        cache = self.client.fetch_cache
+        cache.put_many(
+            "INBOX", 631062293, {1: {b"BODY[HEADER.FIELDS (SUBJECT)]": b"Subject: hi"}}
+        )
+
+        out = self.client.fetch([1], ["BODY.PEEK[HEADER.FIELDS (SUBJECT)]"])
+
+        self.assertEqual(out[1], {b"BODY[HEADER.FIELDS (SUBJECT)]": b"Subject: hi"})
+        self.assertFalse(self.client._imap._command.called)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,6 +2,7 @@
 # Released subject to the New BSD License
 # Please see http://en.wikipedia.org/wiki/BSD_licenses
 
+import pickle
 import unittest
 from datetime import timedelta
 from unittest.mock import DEFAULT, Mock, patch
@@ -30,6 +31,17 @@ class TestFixedOffset(unittest.TestCase):
             FixedOffset(-11 * 60 - 30), timedelta(minutes=(-11 * 60) - 30), "-1130"
         )
 
+    def test_for_minutes(self):
+        offset = FixedOffset.for_minutes(-4 * 60 - 30)
+        self._check(offset, timedelta(minutes=-4 * 60 - 30), "-0430")
+        self.assertIs(FixedOffset.for_minutes(-4 * 60 - 30), offset)
+        self.assertIsNot(FixedOffset.for_minutes(60), offset)
+
+    def test_pickle(self):
+        offset = pickle.loads(pickle.dumps(FixedOffset(-90)))
+        self._check(offset, timedelta(minutes=-90), "-0130")
+        self.assertIs(offset, FixedOffset.for_minutes(-90))
+
     @patch.multiple(
         "imapclient.fixed_offset.time",
         daylight=True,
@@ -5,23 +5,37 @@
 import io
 import itertools
 import logging
+import re
+import shutil
 import socket
 import sys
+import tempfile
+import unittest
 import warnings
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
 from select import POLLIN
 from unittest.mock import Mock, patch, sentinel
 
-from imapclient.exceptions import CapabilityError, IMAPClientError, ProtocolError
+from imapclient.exceptions import (
+    CapabilityError,
+    IMAPClientAbortError,
+    IMAPClientError,
+    ProtocolError,
+)
 from imapclient.fixed_offset import FixedOffset
+from imapclient.imap4 import IMAP4WithTimeout
 from imapclient.imapclient import (
+    _adaptive_batches,
     _literal,
     _parse_quota,
     IMAPlibLoggerAdapter,
     MailboxQuotaRoots,
+    MessageStream,
     Quota,
     require_capability,
 )
+from imapclient.sequence_set import decode
 from imapclient.testable_imapclient import TestableIMAPClient as IMAPClient
 
 from .imapclient_test import IMAPClientTest
@@ -414,6 +428,149 @@ class TestAppend(IMAPClientTest):
         )
 
 
+class TestAppendStream(IMAPClientTest):
+    def setUp(self):
+        super().setUp()
+        self.client._imap._get_response.return_value = None
+        self.client._imap._command_complete.return_value = ("OK", [b"appended"])
+        self.client._cached_capabilities = (b"MULTIAPPEND",)
+
+    def test_file_object(self):
+        msg = io.BytesIO(b"skip:Subject: hi\r\n\r\nbody")
+        msg.read(5)
+
+        result = self.client.append("foobar", msg, ["FLAG"])
+
+        self.assertEqual(result, b"appended")
+        self.assertEqual(
+            self.client._imap.sent,
+            b'tag APPEND "foobar" (FLAG) {19}\r\nSubject: hi\r\n\r\nbody\r\n',
+        )
+
+    def test_chunks_with_literal_plus(self):
+        self.client._cached_capabilities = (b"LITERAL+",)
+        msg = MessageStream(iter([b"Subject: hi\r\n", b"\r\n", b"body"]), 19)
+
+        self.client.append(
+            "foobar", msg, (), datetime(2009, 4, 5, 11, 0, 5, 0, FixedOffset(2 * 60))
+        )
+
+        self.assertEqual(
+            self.client._imap.sent,
+            b'tag APPEND "foobar" () "05-Apr-2009 11:00:05 +0200" {19+}\r\n'
+            b"Subject: hi\r\n\r\nbody\r\n",
+        )
+        self.assertFalse(self.client._imap._get_response.called)
+
+    def test_literal_minus(self):
+        self.client._cached_capabilities = (b"LITERAL-",)
+        self.client.append("foobar", MessageStream(iter([b"small"]), 5))
+        self.assertFalse(self.client._imap._get_response.called)
+
+        self.client._imap.sent = b""
+        big = MessageStream(iter([b"x" * 5000]), 5000)
+        self.client.append("foobar", big)
+        self.assertTrue(self.client._imap._get_response.called)
+        self.assertTrue(
+            self.client._imap.sent.startswith(b'tag APPEND "foobar" () {5000}')
+        )
+
+    def test_multiappend(self):
+        self.client.multiappend(
+            "foobar", ["msg1", {"msg": io.BytesIO(b"msg2"), "flags": ["FLAG"]}]
+        )
+        self.assertEqual(
+            self.client._imap.sent,
+            b'tag APPEND "foobar" {4}\r\nmsg1 (FLAG) {4}\r\nmsg2\r\n',
+        )
+
+    def test_wrong_size(self):
+        self.assertRaises(
+            IMAPClientAbortError,
+            self.client.append,
+            "foobar",
+            MessageStream(iter([b"short"]), 10),
+        )
+        self.assertRaises(
+            IMAPClientAbortError,
+            self.client.append,
+            "foobar",
+            MessageStream(iter([b"too long"]), 3),
+        )
+
+    def test_size_required(self):
+        self.assertRaises(ValueError, MessageStream, iter([b"data"]))
+
+    def test_sendfile(self):
+        ours, theirs = socket.socketpair()
+        self.addCleanup(ours.close)
+        self.addCleanup(theirs.close)
+        self.client._imap.sock = ours
+        msg = tempfile.TemporaryFile()
+        self.addCleanup(msg.close)
+        msg.write(b"Subject: hi\r\n\r\nbody")
+        msg.seek(0)
+
+        self.client.append("foobar", msg)
+
+        self.assertEqual(theirs.recv(100), b"Subject: hi\r\n\r\nbody")
+        self.assertEqual(self.client._imap.sent, b'tag APPEND "foobar" () {19}\r\n\r\n')
+
+
+class TestBulkAppend(IMAPClientTest):
+    def setUp(self):
+        super().setUp()
+        self.client._imap._get_response.return_value = None
+        self.client._cached_capabilities = (b"MULTIAPPEND", b"LITERAL+")
+        self.completions = []
+        self.client._imap._command_complete.side_effect = self.complete
+
+    def complete(self, command, tag):
+        self.completions.append(self.client._imap.sent)
+        self.client._imap.sent = b""
+        return "OK", [b"[APPENDUID 38505 %d:%d] done" % self.uids.pop(0)]
+
+    def test_batches(self):
+        self.uids = [(10, 12), (13, 13)]
+        progress = []
+        msgs = (m for m in [b"a" * 4, b"b" * 4, {"msg": b"c" * 2, "flags": ["F"]}, "d"])
+
+        out = self.client.bulk_append(
+            "foobar", msgs, max_batch_bytes=10, progress=progress.append
+        )
+
+        self.assertEqual(
+            self.completions,
+            [
+                b'tag APPEND "foobar" {4+}\r\naaaa  {4+}\r\nbbbb (F) {2+}\r\ncc\r\n',
+                b'tag APPEND "foobar" {1+}\r\nd\r\n',
+            ],
+        )
+        self.assertEqual(out, [(38505, 10), (38505, 11), (38505, 12), (38505, 13)])
+        self.assertEqual([(p.messages, p.bytes) for p in progress], [(3, 10), (4, 11)])
+        self.assertGreaterEqual(progress[-1].bytes_per_second, 0)
+
+    def test_large_message_sent_alone(self):
+        self.uids = [(1, 1), (2, 2)]
+        self.client.bulk_append("foobar", [b"x" * 20, b"y"], max_batch_bytes=10)
+        self.assertEqual(len(self.completions), 2)
+
+    def test_without_multiappend_or_uidplus(self):
+        self.client._cached_capabilities = (b"IMAP4REV1",)
+        self.client._imap._command_complete.side_effect = None
+        self.client._imap._command_complete.return_value = ("OK", [b"done"])
+
+        out = self.client.bulk_append("foobar", ["one", "two"])
+
+        self.assertEqual(out, [None, None])
+        self.assertEqual(self.client._imap._command_complete.call_count, 2)
+
+    def test_failure(self):
+        self.client._imap._command_complete.side_effect = None
+        self.client._imap._command_complete.return_value = ("NO", [b"over quota"])
+        self.assertRaises(IMAPClientError, self.client.bulk_append, "foobar", ["one"])
+
+
 class TestAclMethods(IMAPClientTest):
     def setUp(self):
         super(TestAclMethods, self).setUp()
@@ -781,7 +938,7 @@ class TestTimeNormalisation(IMAPClientTest):
         def check(expected):
             self.client.fetch(22, ["SOMETHING"])
             parse_fetch_response.assert_called_with(
-                sentinel.fetch_data, expected, sentinel.use_uid
+                sentinel.fetch_data, expected, sentinel.use_uid, False
             )
 
         self.client.normalise_times = True
@@ -791,6 +948,376 @@ class TestTimeNormalisation(IMAPClientTest):
         check(False)
 
 
+class TestLazyFetchStructures(IMAPClientTest):
+    def test_default(self):
+        self.assertFalse(self.client.lazy_fetch_structures)
+
+    @patch("imapclient.imapclient.parse_fetch_response")
+    def test_pass_through(self, parse_fetch_response):
+        self.client._imap._command_complete.return_value = ("OK", sentinel.data)
+        self.client._imap._untagged_response.return_value = ("OK", sentinel.fetch_data)
+        self.client.lazy_fetch_structures = True
+
+        self.client.fetch(22, ["ENVELOPE"])
+
+        parse_fetch_response.assert_called_with(
+            sentinel.fetch_data, True, self.client.use_uid, True
+        )
+
+
+class TestMemoryviewLiterals(IMAPClientTest):
+    def test_default(self):
+        self.assertFalse(self.client.memoryview_literals)
+
+    def test_enabled_only_during_fetch(self):
+        body = memoryview(b"Subject: test\r\n\r\nbody")
+        enabled = []
+
+        def command_complete(*args):
+            enabled.append(self.client._imap.memoryview_literals)
+            return "OK", [b"done"]
+
+        self.client._imap._command_complete.side_effect = command_complete
+        self.client._imap._untagged_response.return_value = (
+            "OK",
+            [(b"1 (UID 22 RFC822 {21}", body), b")"],
+        )
+        self.client.memoryview_literals = True
+
+        out = self.client.fetch(22, ["RFC822"])
+
+        self.assertEqual(enabled, [True])
+        self.assertFalse(self.client._imap.memoryview_literals)
+        self.assertIs(out[22][b"RFC822"], body)
+
+    def test_IMAP4_read(self):
+        imap = IMAP4WithTimeout.__new__(IMAP4WithTimeout)
+        imap.sock, server = socket.socketpair()
+        self.addCleanup(imap.sock.close)
+        self.addCleanup(server.close)
+        server.sendall(b"0123456789")
+
+        imap.memoryview_literals = False
+        self.assertEqual(imap.read(4), b"0123")
+
+        imap.memoryview_literals = True
+        data = imap.read(4)
+        self.assertIsInstance(data, memoryview)
+        self.assertEqual(data, b"4567")
+
+
+class TestIterFetch(IMAPClientTest):
+    def setUp(self):
+        super().setUp()
+        self.client._imap._command.return_value = "tag"
+        self.client._imap._command_complete.return_value = ("OK", [b"done"])
+        self.client._imap.tagged_commands = {"tag": None}
+        self.client._imap.untagged_responses = {}
+
+    def set_responses(self, *responses):
+        responses = list(responses)
+
+        def get_response():
+            if responses:
+                self.client._imap.untagged_responses.setdefault("FETCH", []).extend(
+                    responses.pop(0)
+                )
+            else:
+                self.client._imap.tagged_commands["tag"] = ("OK", [b"done"])
+
+        self.client._imap._get_response.side_effect = get_response
+
+    def test_yields_as_responses_arrive(self):
+        self.set_responses(
+            [b"1 (UID 11 FLAGS (foo))"],
+            [(b"2 (UID 22 RFC822 {4}", b"body"), b")"],
+        )
+
+        out = self.client.iter_fetch([11, 22], ["FLAGS", "RFC822"])
+
+        self.assertEqual(next(out), (11, {b"SEQ": 1, b"FLAGS": (b"foo",)}))
+        self.assertEqual(self.client._imap._get_response.call_count, 1)
+        self.assertEqual(next(out), (22, {b"SEQ": 2, b"RFC822": b"body"}))
+        self.assertRaises(StopIteration, next, out)
+        self.client._imap._command.assert_called_once_with(
+            "UID", "FETCH", b"11,22", "(FLAGS RFC822)", None
+        )
+        self.client._imap._command_complete.assert_called_once_with("FETCH", "tag")
+
+    def test_no_messages(self):
+        self.assertEqual(list(self.client.iter_fetch([], ["FLAGS"])), [])
+        self.assertFalse(self.client._imap._command.called)
+
+    def test_failure(self):
+        self.set_responses()
+        self.client._imap._command_complete.return_value = ("NO", [b"nope"])
+
+        self.assertRaises(IMAPClientError, list, self.client.iter_fetch(1, ["FLAGS"]))
+
+    def test_close_early_discards_remaining_responses(self):
+        self.set_responses(
+            [b"1 (UID 11 FLAGS (foo))"],
+            [b"2 (UID 22 FLAGS (bar))"],
+            [b"3 (UID 33 FLAGS (baz))"],
+        )
+
+        out = self.client.iter_fetch([11, 22, 33], ["FLAGS"])
+        next(out)
+        out.close()
+
+        self.assertEqual(self.client._imap._get_response.call_count, 4)
+        self.assertEqual(self.client._imap.untagged_responses, {})
+        self.client._imap._command_complete.assert_called_once_with("FETCH", "tag")
+
+
+class TestFetchParseExecutor(IMAPClientTest):
+    def setUp(self):
+        super().setUp()
+        self.client._imap._command.return_value = "tag"
+        self.client._imap._command_complete.return_value = ("OK", [b"done"])
+        self.client._imap.tagged_commands = {"tag": None}
+        self.client._imap.untagged_responses = {}
+        self.client.normalise_times = False
+
+    def set_responses(self, *responses):
+        responses = list(responses)
+
+        def get_response():
+            if responses:
+                self.client._imap.untagged_responses.setdefault("FETCH", []).extend(
+                    responses.pop(0)
+                )
+            else:
+                self.client._imap.tagged_commands["tag"] = ("OK", [b"done"])
+
+        self.client._imap._get_response.side_effect = get_response
+
+    def test_batches_submitted_while_reading(self):
+        submitted = []
+
+        class RecordingExecutor(ThreadPoolExecutor):
+            def submit(self, fn, *args):
+                submitted.append(list(args[0]))
+                return super().submit(fn, *args)
+
+        self.set_responses(
+            [b"1 (UID 11 FLAGS (foo))"],
+            [(b"2 (UID 22 RFC822 {4}", b"body"), b")"],
+            [b"3 (UID 33 FLAGS (bar))"],
+            [b"1 (UID 11 INTERNALDATE " b'"09-Feb-2007 17:08:08 +0000")'],
+        )
+        with RecordingExecutor(2) as executor:
+            self.client.fetch_parse_executor = executor
+            self.client.fetch_parse_batch_size = 2
+            out = self.client.fetch([11, 22, 33], ["FLAGS", "RFC822"])
+
+        self.assertEqual(
+            submitted,
+            [
+                [b"1 (UID 11 FLAGS (foo))", (b"2 (UID 22 RFC822 {4}", b"body"), b")"],
+                [
+                    b"3 (UID 33 FLAGS (bar))",
+                    b"1 (UID 11 INTERNALDATE " b'"09-Feb-2007 17:08:08 +0000")',
+                ],
+            ],
+        )
+        self.assertEqual(
+            out,
+            {
+                11: {
+                    b"SEQ": 1,
+                    b"FLAGS": (b"foo",),
+                    b"INTERNALDATE": datetime(2007, 2, 9, 17, 8, 8, 0, FixedOffset(0)),
+                },
+                22: {b"SEQ": 2, b"RFC822": b"body"},
+                33: {b"SEQ": 3, b"FLAGS": (b"bar",)},
+            },
+        )
+        self.client._imap._command_complete.assert_called_once_with("FETCH", "tag")
+
+    def test_process_pool(self):
+        self.set_responses(
+            [b'1 (UID 11 ENVELOPE (NIL "subject" NIL NIL NIL NIL NIL NIL NIL NIL))'],
+        )
+        with ProcessPoolExecutor(1) as executor:
+            self.client.fetch_parse_executor = executor
+            out = self.client.fetch([11], ["ENVELOPE"])
+
+        self.assertEqual(out[11][b"ENVELOPE"].subject, b"subject")
+
+    def test_process_pool_without_normalised_times(self):
+        self.set_responses(
+            [b'1 (UID 11 INTERNALDATE "09-Feb-2007 17:08:08 +0100")'],
+        )
+        self.client.normalise_times = False
+        with ProcessPoolExecutor(1) as executor:
+            self.client.fetch_parse_executor = executor
+            out = self.client.fetch([11], ["INTERNALDATE"])
+
+        self.assertEqual(
+            out[11][b"INTERNALDATE"],
+            datetime(2007, 2, 9, 17, 8, 8, 0, FixedOffset(60)),
+        )
+        self.assertEqual(out[11][b"INTERNALDATE"].utcoffset(), timedelta(hours=1))
+
+    def test_failure(self):
+        self.set_responses([b"1 (UID 11 FLAGS (foo))"])
+        self.client._imap._command_complete.return_value = ("NO", [b"nope"])
+        with ThreadPoolExecutor(1) as executor:
+            self.client.fetch_parse_executor = executor
+            self.assertRaises(IMAPClientError, self.client.fetch, [11], ["FLAGS"])
+
+
+class TestFetchBodyStream(IMAPClientTest):
+    body = b"0123456789"
+
+    def setUp(self):
+        super().setUp()
+        self.commands = []
+        self.completed = []
+        self.client._imap._command.side_effect = self.command
+        self.client._imap._command_complete.side_effect = self.complete
+        self.client._imap._untagged_response.side_effect = self.untagged_response
+
+    def command(self, *args):
+        self.commands.append(args)
+        return "tag%d" % len(self.commands)
+
+    def complete(self, name, tag):
+        self.completed.append(tag)
+        return "OK", [b"done"]
+
+    def untagged_response(self, typ, data, name):
+        args = self.commands[int(self.completed[-1][3:]) - 1]
+        offset, size = map(int, re.search(r"<(\d+)\.(\d+)>", args[3]).groups())
+        chunk = self.body[offset : offset + size]
+        return "OK", [
+            (b"1 (UID 5 BODY[1]<%d> {%d}" % (offset, len(chunk)), chunk),
+            b")",
+        ]
+
+    def test_read_in_chunks(self):
+        with self.client.fetch_body_stream(5, "1", chunk_size=4) as stream:
+            self.assertEqual(stream.read(3), b"012")
+            self.assertEqual(len(self.commands), 1)
+            self.assertEqual(stream.read(), b"3456789")
+            self.assertEqual(stream.tell(), 10)
+            self.assertEqual(stream.read(), b"")
+
+        self.assertEqual(
+            [c[3] for c in self.commands],
+            ["(BODY.PEEK[1]<0.4>)", "(BODY.PEEK[1]<4.4>)", "(BODY.PEEK[1]<8.4>)"],
+        )
+        self.assertEqual(self.commands[0][:3], ("UID", "FETCH", b"5"))
+
+    def test_exact_multiple_of_chunk_size(self):
+        stream = self.client.fetch_body_stream(5, "1", chunk_size=5, peek=False)
+        self.assertEqual(stream.read(), self.body)
+        self.assertEqual(
+            [c[3] for c in self.commands],
+            ["(BODY[1]<0.5>)", "(BODY[1]<5.5>)", "(BODY[1]<10.5>)"],
+        )
+
+    def test_prefetch(self):
+        stream = self.client.fetch_body_stream(5, "1", chunk_size=4, prefetch=True)
+        self.assertEqual(stream.read(2), b"01")
+        # the next chunk is requested before it's needed
+        self.assertEqual(len(self.commands), 2)
+        self.assertEqual(self.completed, ["tag1"])
+
+        stream.close()
+        self.assertEqual(self.completed, ["tag1", "tag2"])
+        self.assertRaises(ValueError, stream.read)
+
+    def test_copy(self):
+        out = io.BytesIO()
+        shutil.copyfileobj(
+            self.client.fetch_body_stream(5, "1", chunk_size=3, prefetch=True), out
+        )
+        self.assertEqual(out.getvalue(), self.body)
+
+    def test_message_missing(self):
+        self.client._imap._untagged_response.side_effect = None
+        self.client._imap._untagged_response.return_value = ("OK", [])
+        stream = self.client.fetch_body_stream(5)
+        self.assertRaises(IMAPClientError, stream.read)
+
+
+class TestFetchBatched(IMAPClientTest):
+    def setUp(self):
+        super().setUp()
+        self.client._imap._command_complete.return_value = ("OK", [b"done"])
+        self.client._imap._untagged_response.side_effect = self.untagged_response
+
+    def untagged_response(self, typ, data, name):
+        args = self.client._imap._command.call_args[0]
+        return "OK", [
+            b"%d (UID %d FLAGS (foo))" % (uid, uid) for uid in decode(args[2])
+        ]
+
+    def sent_message_sets(self):
+        return [c[0][2] for c in self.client._imap._command.call_args_list]
+
+    def test_fixed_batch_size(self):
+        out = self.client.fetch_batched([5, 1, 3, 3, 2], ["FLAGS"], batch_size=2)
+
+        self.assertEqual(self.sent_message_sets(), [b"1:2", b"3,5"])
+        self.assertEqual(sorted(out), [1, 2, 3, 5])
+        self.assertEqual(out[5], {b"SEQ": 5, b"FLAGS": (b"foo",)})
+
+    def test_auto_batch_size(self):
+        messages = list(range(1, 201))
+        out = self.client.fetch_batched(messages, ["FLAGS"], target_bytes=600)
+
+        # The first batch is a fixed size, after that batches are
+        # sized to keep each response close to the target.
+        sizes = [len(decode(s)) for s in self.sent_message_sets()]
+        self.assertEqual(sizes[0], 25)
+        self.assertTrue(all(20 <= size <= 30 for size in sizes[1:]), sizes)
+        self.assertEqual(sorted(out), messages)
+
+    def test_mixed_message_specs(self):
+        out = self.client.fetch_batched([7, "1:3", 7, 5], ["FLAGS"], batch_size=2)
+
+        self.assertEqual(self.sent_message_sets(), [b"7,1:3", b"5"])
+        self.assertEqual(sorted(out), [1, 2, 3, 5, 7])
+
+    def test_single_id(self):
+        self.client.fetch_batched(3, ["FLAGS"])
+        self.assertEqual(self.sent_message_sets(), [b"3"])
+
+    def test_no_messages(self):
+        self.assertEqual(self.client.fetch_batched([], ["FLAGS"]), {})
+        self.assertFalse(self.client._imap._command.called)
+
+
+class TestAdaptiveBatches(unittest.TestCase):
+    def test_sizing(self):
+        batches = _adaptive_batches(list(range(10000)), 1000)
+        self.assertEqual(len(next(batches)), 25)
+        # 10 bytes per message: grow, but at most 4x at a time.
+        self.assertEqual(len(batches.send(250)), 100)
+        self.assertEqual(len(batches.send(1000)), 100)
+        # Much larger messages: shrink.
+        self.assertEqual(len(batches.send(100000)), 2)
+
+    def test_empty_responses(self):
+        batches = _adaptive_batches(list(range(10000)), 1000)
+        self.assertEqual(len(next(batches)), 25)
+        self.assertEqual(len(batches.send(0)), 100)
+        self.assertEqual(len(batches.send(0)), 400)
+        self.assertEqual(len(batches.send(0)), 1000)
+        self.assertEqual(len(batches.send(0)), 1000)
+
+    def test_covers_all_messages(self):
+        messages = list(range(1, 1000))
+        batches = _adaptive_batches(messages, 1000)
+        seen = list(next(batches))
+        for batch in iter(lambda: batches.send(500), None):
+            seen.extend(batch)
+        self.assertEqual(seen, messages)
+
+
 class TestNamespace(IMAPClientTest):
     def setUp(self):
         super(TestNamespace, self).setUp()
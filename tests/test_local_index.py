@@ -0,0 +1,179 @@
+# Copyright (c) 2014, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+import os
+import tempfile
+import unittest
+from datetime import date, datetime
+
+from imapclient.exceptions import UnsupportedCriteriaError
+from imapclient.fixed_offset import FixedOffset
+from imapclient.local_index import LocalIndex
+from imapclient.response_types import Address, Envelope
+
+from .test_sync import FakeClient
+
+
+def envelope(subject, sender, sent):
+    return Envelope(
+        date=sent,
+        subject=subject,
+        from_=(
+            Address(b"Some One", None, sender.split(b"@")[0], sender.split(b"@")[1]),
+        ),
+        sender=None,
+        reply_to=None,
+        to=(Address(None, None, b"me", b"example.com"),),
+        cc=None,
+        bcc=None,
+        in_reply_to=None,
+        message_id=b"<%s>" % subject.replace(b" ", b"."),
+    )
+
+
+class IndexClient(FakeClient):
+    def __init__(self, capabilities=()):
+        super().__init__(capabilities)
+        self.data = {}
+
+    def add(self, uid, flags=(), size=100, internaldate=None, envelope=None):
+        super().add(uid, flags)
+        self.data[uid] = {
+            b"RFC822.SIZE": size,
+            b"INTERNALDATE": internaldate or datetime(2020, 1, uid),
+            b"ENVELOPE": envelope,
+        }
+
+    def fetch_batched(self, messages, data):
+        self.commands.append(("FETCH_BATCHED", list(messages), data))
+        out = {}
+        for uid in messages:
+            msg_data = {**self.data[uid], b"FLAGS": self.messages[uid][0]}
+            internaldate = msg_data[b"INTERNALDATE"]
+            if self.normalise_times and internaldate.tzinfo is not None:
+                msg_data[b"INTERNALDATE"] = internaldate.astimezone().replace(
+                    tzinfo=None
+                )
+            out[uid] = msg_data
+        return out
+
+
+class LocalIndexTests:
+    capabilities = ()
+
+    def setUp(self):
+        self.client = IndexClient(self.capabilities)
+        self.client.add(
+            1,
+            (b"\\Seen",),
+            size=500,
+            envelope=envelope(
+                b"Hello there", b"alice@example.com", datetime(2019, 12, 31, 23, 0)
+            ),
+        )
+        self.client.add(
+            2,
+            (b"\\Flagged", b"$Work"),
+            size=5000,
+            envelope=envelope(
+                b"=?utf-8?q?Caf=C3=A9?=", b"bob@example.org", datetime(2020, 1, 2)
+            ),
+        )
+        self.client.add(3, (), size=50, envelope=None)
+        fd, self.path = tempfile.mkstemp(suffix=".sqlite")
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+        self.index = LocalIndex(self.client, self.path)
+        self.addCleanup(self.index.close)
+        self.index.refresh("INBOX")
+
+    def search(self, criteria):
+        return self.index.search("INBOX", criteria)
+
+    def test_flags(self):
+        self.assertEqual(self.search("ALL"), [1, 2, 3])
+        self.assertEqual(self.search(["UNSEEN"]), [2, 3])
+        self.assertEqual(self.search(["SEEN"]), [1])
+        self.assertEqual(self.search(["KEYWORD", "$work"]), [2])
+        self.assertEqual(self.search(["UNKEYWORD", "$Work", "UNSEEN"]), [3])
+
+    def test_strings(self):
+        self.assertEqual(self.search(["FROM", "ALICE"]), [1])
+        self.assertEqual(self.search(["FROM", "some one"]), [1, 2])
+        self.assertEqual(self.search(["SUBJECT", "café"]), [2])
+        self.assertEqual(self.search(["TO", "me@example"]), [1, 2])
+        self.assertEqual(self.search(["HEADER", "Message-ID", "<hello.there>"]), [1])
+
+    def test_dates_and_sizes(self):
+        self.assertEqual(self.search(["SINCE", date(2020, 1, 2)]), [2, 3])
+        self.assertEqual(self.search("ON 01-Jan-2020"), [1])
+        self.assertEqual(self.search(["SENTBEFORE", datetime(2020, 1, 1, 12, 0)]), [1])
+        self.assertEqual(self.search(["LARGER", 100]), [1, 2])
+        self.assertEqual(self.search("SMALLER 100"), [3])
+
+    def test_dates_compared_in_their_own_time_zone(self):
+        late = datetime(2020, 3, 1, 23, 30, tzinfo=FixedOffset(-10 * 60))
+        self.client.add(4, internaldate=late)
+        self.index.refresh("INBOX")
+
+        self.assertEqual(self.search(["ON", date(2020, 3, 1)]), [4])
+        self.assertTrue(self.client.normalise_times)
+
+    def test_combined(self):
+        self.assertEqual(
+            self.search(["OR", "SEEN", ["FLAGGED", "LARGER", 1000]]), [1, 2]
+        )
+        self.assertEqual(self.search(["NOT", ["OR", "SEEN", "FLAGGED"]]), [3])
+        self.assertEqual(self.search("UID 2:*"), [2, 3])
+        self.assertEqual(self.search(["UID", "1,3"]), [1, 3])
+        self.assertEqual(self.search(["UID", "*"]), [3])
+        self.assertEqual(self.search("UID 10:*"), [3])
+        self.assertEqual(self.search(["NOT", "UID", "10:*"]), [1, 2])
+
+    def test_unsupported(self):
+        self.assertRaises(UnsupportedCriteriaError, self.search, ["TEXT", "foo"])
+        self.assertRaises(
+            UnsupportedCriteriaError, self.search, ["HEADER", "X-Foo", "bar"]
+        )
+        self.assertRaises(UnsupportedCriteriaError, self.search, "1:2")
+        self.assertRaises(UnsupportedCriteriaError, self.search, ["X-GM-RAW", "foo"])
+
+    def test_refresh(self):
+        self.client.set_flags(3, (b"\\Seen",))
+        self.client.expunge(1)
+        self.client.add(
+            4, envelope=envelope(b"New", b"carol@example.com", datetime(2020, 2, 1))
+        )
+
+        result = self.index.refresh("INBOX")
+
+        self.assertEqual(list(result.new), [4])
+        self.assertEqual(self.search("ALL"), [2, 3, 4])
+        self.assertEqual(self.search("SEEN"), [3])
+        self.assertEqual(self.search(["FROM", "carol"]), [4])
+
+    def test_persisted(self):
+        index = LocalIndex(self.client, self.path)
+        self.addCleanup(index.close)
+        self.assertEqual(index.folders(), ["INBOX"])
+        self.assertEqual(index.search("INBOX", "UNSEEN"), [2, 3])
+
+    def test_uidvalidity_change(self):
+        self.client.uidvalidity = 2
+        self.client.expunge(2)
+
+        self.assertTrue(self.index.refresh("INBOX").reset)
+        self.assertEqual(self.search("ALL"), [1, 3])
+
+
+class TestLocalIndexQResync(LocalIndexTests, unittest.TestCase):
+    capabilities = ("ENABLE", "CONDSTORE", "QRESYNC")
+
+
+class TestLocalIndexUidDiff(LocalIndexTests, unittest.TestCase):
+    pass
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+# Copyright (c) 2014, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+import threading
+import time
+import unittest
+from unittest.mock import Mock
+
+from imapclient.exceptions import IMAPClientError
+from imapclient.parallel import parallel_fetch
+
+
+class FakeServer:
+    """Hands out mock clients that answer FETCH from *delays*."""
+
+    def __init__(self, delays=None):
+        self.delays = delays or {}
+        self.clients = []
+        self.fetched = []
+        self.lock = threading.Lock()
+
+    def connect(self):
+        client = Mock()
+        client.fetch.side_effect = self.fetch
+        with self.lock:
+            self.clients.append(client)
+        return client
+
+    def fetch(self, uids, data, modifiers):
+        time.sleep(self.delays.get(uids[0], 0))
+        with self.lock:
+            self.fetched.append(list(uids))
+        return {uid: {b"SEQ": uid, b"FLAGS": ()} for uid in reversed(uids)}
+
+
+class TestParallelFetch(unittest.TestCase):
+    def test_ordered(self):
+        server = FakeServer({1: 0.05})
+        out = list(
+            parallel_fetch(
+                server.connect,
+                [7, 3, 1, 2, 5, 4, 6, 3],
+                ["FLAGS"],
+                connections=3,
+                folder="INBOX",
+                batch_size=2,
+            )
+        )
+        self.assertEqual([uid for uid, _ in out], [1, 2, 3, 4, 5, 6, 7])
+        self.assertEqual(out[0], (1, {b"SEQ": 1, b"FLAGS": ()}))
+        self.assertEqual(sorted(server.fetched), [[1, 2], [3, 4], [5, 6], [7]])
+        self.assertEqual(len(server.clients), 3)
+        for client in server.clients:
+            client.select_folder.assert_called_once_with("INBOX", readonly=True)
+            client.logout.assert_called_once_with()
+
+    def test_as_completed(self):
+        server = FakeServer({1: 0.1})
+        out = list(
+            parallel_fetch(
+                server.connect,
+                range(1, 7),
+                ["FLAGS"],
+                connections=2,
+                ordered=False,
+                batch_size=2,
+            )
+        )
+        self.assertEqual(sorted(uid for uid, _ in out), [1, 2, 3, 4, 5, 6])
+        self.assertNotIn(out[0][0], (1, 2))
+
+    def test_modifiers_passed(self):
+        server = FakeServer()
+        list(parallel_fetch(server.connect, [1], ["FLAGS"], modifiers=["X"]))
+        server.clients[0].fetch.assert_called_once_with([1], ["FLAGS"], ["X"])
+
+    def test_no_messages(self):
+        server = FakeServer()
+        self.assertEqual(list(parallel_fetch(server.connect, [], ["FLAGS"])), [])
+        self.assertEqual(server.clients, [])
+
+    def test_fetch_ahead_is_bounded(self):
+        server = FakeServer()
+        gen = parallel_fetch(
+            server.connect,
+            range(1, 21),
+            ["FLAGS"],
+            connections=2,
+            batch_size=1,
+            max_pending=3,
+        )
+        next(gen)
+        time.sleep(0.05)
+        # one batch consumed, three more may be fetched ahead
+        self.assertEqual(len(server.fetched), 4)
+        gen.close()
+
+    def test_error_raised(self):
+        server = FakeServer()
+
+        def fetch(uids, data, modifiers):
+            raise IMAPClientError("fetch failed")
+
+        def connect():
+            client = server.connect()
+            client.fetch.side_effect = fetch
+            return client
+
+        gen = parallel_fetch(connect, [1, 2], ["FLAGS"], batch_size=1)
+        self.assertRaises(IMAPClientError, list, gen)
+
+    def test_close_stops_workers(self):
+        server = FakeServer()
+        gen = parallel_fetch(
+            server.connect, range(1, 101), ["FLAGS"], connections=2, batch_size=1
+        )
+        next(gen)
+        gen.close()
+        time.sleep(0.05)
+        self.assertLess(len(server.fetched), 10)
+        for client in server.clients:
+            client.logout.assert_called_once_with()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,210 @@
+# Copyright (c) 2014, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+import imaplib
+
+from imapclient.exceptions import CapabilityError, IllegalStateError, IMAPClientError
+
+from .imapclient_test import IMAPClientTest
+
+
+class TestPipeline(IMAPClientTest):
+    def setUp(self):
+        super().setUp()
+        imap = self.client._imap
+        imap.tagged_commands = {}
+        imap.untagged_responses = {}
+        self.tags = iter([b"A1", b"A2", b"A3", b"A4"])
+
+        def new_tag():
+            tag = next(self.tags)
+            imap.tagged_commands[tag] = None
+            return tag
+
+        imap._new_tag = new_tag
+
+    def set_responses(self, *responses):
+        """Each response is either (typ, data) for an untagged response
+        or (tag, typ, data) for a command completion."""
+        responses = list(responses)
+        imap = self.client._imap
+
+        def get_response():
+            resp = responses.pop(0)
+            if len(resp) == 3:
+                tag, typ, data = resp
+                imap.tagged_commands[tag] = (typ, [data])
+            else:
+                typ, data = resp
+                imap.untagged_responses.setdefault(typ, []).append(data)
+
+        imap._get_response.side_effect = get_response
+
+    def test_commands_sent_together(self):
+        self.set_responses(
+            ("EXISTS", b"3"),
+            ("FLAGS", rb"(\Seen)"),
+            ("READ-WRITE", b""),
+            (b"A1", "OK", b"[READ-WRITE] done"),
+            ("STATUS", b"foo (MESSAGES 3 UIDNEXT 4)"),
+            (b"A2", "OK", b"done"),
+            ("STATUS", b'"bar baz" (MESSAGES 1 UIDNEXT 2)'),
+            (b"A3", "OK", b"done"),
+        )
+
+        with self.client.pipeline() as p:
+            selected = p.select_folder("INBOX")
+            foo = p.folder_status("foo", ["MESSAGES", "UIDNEXT"])
+            bar = p.folder_status("bar baz", ["MESSAGES", "UIDNEXT"])
+            self.assertFalse(foo.ok)
+            self.assertRaises(IllegalStateError, getattr, foo, "value")
+
+        self.assertEqual(
+            self.client._imap.sent,
+            b'A1 SELECT "INBOX"\r\n'
+            b'A2 STATUS "foo" (MESSAGES UIDNEXT)\r\n'
+            b'A3 STATUS "bar baz" (MESSAGES UIDNEXT)\r\n',
+        )
+        self.assertEqual(
+            selected.value,
+            {b"EXISTS": 3, b"FLAGS": (rb"\Seen",), b"READ-WRITE": True},
+        )
+        self.assertEqual(foo.value, {b"MESSAGES": 3, b"UIDNEXT": 4})
+        self.assertEqual(bar.value, {b"MESSAGES": 1, b"UIDNEXT": 2})
+        self.assertEqual(self.client._imap.tagged_commands, {})
+
+    def test_client_usable_after_pipelined_select(self):
+        imap = self.client._imap
+        imap.state = "AUTH"
+        self.set_responses(
+            ("EXISTS", b"3"),
+            (b"A1", "OK", b"[READ-ONLY] done"),
+        )
+
+        with self.client.pipeline() as p:
+            p.select_folder("INBOX", readonly=True)
+
+        self.assertEqual(imap.state, "SELECTED")
+        self.assertTrue(imap.is_readonly)
+
+        def command(name, *args):
+            # imaplib refuses commands not allowed in its current state
+            self.assertIn(imap.state, imaplib.Commands[name])
+            return b"A2"
+
+        imap._command.side_effect = command
+        imap._command_complete.return_value = ("OK", [b"done"])
+        imap._untagged_response.return_value = ("OK", [b"1 (UID 11 FLAGS ())"])
+        self.assertEqual(
+            self.client.fetch([11], ["FLAGS"]), {11: {b"SEQ": 1, b"FLAGS": ()}}
+        )
+
+    def test_failed_select_leaves_no_folder_selected(self):
+        imap = self.client._imap
+        imap.state = "SELECTED"
+        self.set_responses((b"A1", "NO", b"no such folder"))
+
+        with self.client.pipeline() as p:
+            p.select_folder("missing")
+
+        self.assertEqual(imap.state, "AUTH")
+
+    def test_fetch_and_store(self):
+        self.set_responses(
+            ("FETCH", b"1 (UID 11 FLAGS ())"),
+            (b"A1", "OK", b"done"),
+            ("FETCH", rb"1 (UID 11 FLAGS (\Seen))"),
+            (b"A2", "OK", b"done"),
+            ("SEARCH", b"11 12"),
+            (b"A3", "OK", b"done"),
+            (b"A4", "OK", b"done"),
+        )
+
+        with self.client.pipeline() as p:
+            fetched = p.fetch([11], ["FLAGS"])
+            stored = p.add_flags([11], [rb"\Seen"])
+            found = p.search(["UNSEEN"])
+            silent = p.remove_flags([12], ["foo"], silent=True)
+
+        self.assertEqual(
+            self.client._imap.sent,
+            b"A1 UID FETCH 11 (FLAGS)\r\n"
+            b"A2 UID STORE 11 +FLAGS (\\Seen)\r\n"
+            b"A3 UID SEARCH UNSEEN\r\n"
+            b"A4 UID STORE 12 -FLAGS.SILENT (foo)\r\n",
+        )
+        self.assertEqual(fetched.value, {11: {b"SEQ": 1, b"FLAGS": ()}})
+        self.assertEqual(stored.value, {11: (rb"\Seen",)})
+        self.assertEqual(found.value, [11, 12])
+        self.assertIsNone(silent.value)
+
+    def test_saved_search_result(self):
+        self.client._cached_capabilities = [b"SEARCHRES", b"MOVE"]
+        self.set_responses(
+            (b"A1", "OK", b"done"),
+            ("FETCH", b"1 (UID 11 FLAGS ())"),
+            (b"A2", "OK", b"done"),
+            (b"A3", "OK", b"done"),
+            (b"A4", "OK", b"done"),
+        )
+
+        with self.client.pipeline() as p:
+            saved = p.search(["FROM", "spammer"], save=True)
+            fetched = p.fetch("$", ["FLAGS"])
+            copied = p.copy("$", "Archive")
+            moved = p.move("$", "Junk")
+
+        self.assertEqual(
+            self.client._imap.sent,
+            b"A1 UID SEARCH RETURN (SAVE) FROM spammer\r\n"
+            b"A2 UID FETCH $ (FLAGS)\r\n"
+            b'A3 UID COPY $ "Archive"\r\n'
+            b'A4 UID MOVE $ "Junk"\r\n',
+        )
+        self.assertIsNone(saved.value)
+        self.assertEqual(fetched.value, {11: {b"SEQ": 1, b"FLAGS": ()}})
+        self.assertIsNone(copied.value)
+        self.assertIsNone(moved.value)
+
+    def test_capabilities_checked_when_queued(self):
+        self.client._cached_capabilities = [b"IMAP4REV1"]
+        p = self.client.pipeline()
+        self.assertRaises(CapabilityError, p.search, "ALL", save=True)
+        self.assertRaises(CapabilityError, p.move, "$", "Junk")
+
+    def test_failure_only_affects_its_command(self):
+        self.set_responses(
+            (b"A1", "NO", b"no such folder"),
+            ("STATUS", b"foo (UIDNEXT 4)"),
+            (b"A2", "OK", b"done"),
+        )
+
+        with self.client.pipeline() as p:
+            missing = p.folder_status("missing", ["UIDNEXT"])
+            foo = p.folder_status("foo", ["UIDNEXT"])
+
+        self.assertFalse(missing.ok)
+        self.assertRaises(IMAPClientError, getattr, missing, "value")
+        self.assertEqual(foo.value, {b"UIDNEXT": 4})
+
+    def test_not_executed_on_exception(self):
+        try:
+            with self.client.pipeline() as p:
+                p.folder_status("foo")
+                raise ValueError()
+        except ValueError:
+            pass
+        self.assertEqual(self.client._imap.sent, b"")
+
+    def test_sequence_numbers_after_other_commands(self):
+        self.client.use_uid = False
+        p = self.client.pipeline()
+        p.fetch([1], ["FLAGS"])
+        p.add_flags([1], ["foo"])
+        p.select_folder("foo")
+        self.assertRaises(ValueError, p.fetch, [1], ["FLAGS"])
+
+    def test_8bit_arguments_rejected(self):
+        p = self.client.pipeline()
+        self.assertRaises(ValueError, p.search, ["TEXT", "é"], "utf-8")
@@ -0,0 +1,189 @@
+# Copyright (c) 2014, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+import threading
+import unittest
+from unittest.mock import Mock
+
+from imapclient.exceptions import (
+    IllegalStateError,
+    IMAPClientAbortError,
+    IMAPClientError,
+    PoolTimeoutError,
+)
+from imapclient.pool import IMAPClientPool
+
+
+class MockPool(IMAPClientPool):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.created = []
+
+    def _create_client(self, host, port):
+        client = Mock(name="%s:%d#%d" % (host, port, len(self.created)))
+        self.created.append(client)
+        return client
+
+
+class TestIMAPClientPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = MockPool(max_connections=2, wait_timeout=0.05)
+
+    def checkout(self, user="user", host="host", **kwargs):
+        return self.pool.connection(host, user, "pass", **kwargs)
+
+    def test_connection_reused(self):
+        with self.checkout() as first:
+            first.login.assert_called_once_with("user", "pass")
+        with self.checkout() as second:
+            pass
+        self.assertIs(first, second)
+        self.assertEqual(len(self.pool.created), 1)
+
+    def test_password_checked_before_reuse(self):
+        with self.checkout() as first:
+            pass
+        with self.pool.connection("host", "user", "wrong") as second:
+            second.login.assert_called_once_with("user", "wrong")
+        self.assertIsNot(first, second)
+
+    def test_accounts_kept_apart(self):
+        with self.checkout("a") as a:
+            pass
+        with self.checkout("b") as b:
+            pass
+        with self.checkout("a", port=143) as c:
+            pass
+        self.assertEqual(len({id(a), id(b), id(c)}), 3)
+
+    def test_redundant_select_skipped(self):
+        with self.checkout(folder="INBOX") as client:
+            pass
+        with self.checkout(folder="INBOX") as client:
+            pass
+        client.select_folder.assert_called_once_with("INBOX", False)
+
+        with self.checkout(folder="INBOX", readonly=True) as client:
+            pass
+        with self.checkout(folder="Sent") as client:
+            pass
+        self.assertEqual(client.select_folder.call_count, 3)
+
+    def test_selection_forgotten_after_error(self):
+        with self.assertRaises(IMAPClientError):
+            with self.checkout(folder="INBOX") as client:
+                raise IMAPClientError("boom")
+        with self.checkout(folder="INBOX") as again:
+            pass
+        self.assertIs(client, again)
+        self.assertEqual(client.select_folder.call_count, 2)
+
+    def test_no_health_check_when_recently_used(self):
+        with self.checkout() as client:
+            pass
+        with self.checkout():
+            pass
+        client.noop.assert_not_called()
+
+    def test_health_check_after_idle(self):
+        self.pool.check_interval = 0
+        with self.checkout() as client:
+            pass
+        with self.checkout() as again:
+            pass
+        self.assertIs(client, again)
+        client.noop.assert_called_once_with()
+
+    def test_dead_connection_replaced(self):
+        self.pool.check_interval = 0
+        with self.checkout(folder="INBOX") as client:
+            pass
+        client.noop.side_effect = IMAPClientAbortError("gone")
+        with self.checkout(folder="INBOX") as replacement:
+            pass
+        self.assertIsNot(client, replacement)
+        client.shutdown.assert_called_once_with()
+        replacement.select_folder.assert_called_once_with("INBOX", False)
+
+    def test_evicted_on_abort(self):
+        with self.assertRaises(IMAPClientAbortError):
+            with self.checkout() as client:
+                raise IMAPClientAbortError("gone")
+        client.shutdown.assert_called_once_with()
+        with self.checkout() as replacement:
+            pass
+        self.assertIsNot(client, replacement)
+
+    def test_evicted_on_socket_error(self):
+        with self.assertRaises(OSError):
+            with self.checkout() as client:
+                raise OSError("reset")
+        with self.checkout() as replacement:
+            pass
+        self.assertIsNot(client, replacement)
+
+    def test_failed_login_frees_slot(self):
+        pool = self.pool
+        failing = Mock()
+        failing.login.side_effect = IMAPClientError("bad password")
+        pool._create_client = Mock(side_effect=[failing, failing, Mock(), Mock()])
+        for _ in range(2):
+            with self.assertRaises(IMAPClientError):
+                with self.checkout():
+                    pass
+        with self.checkout("a"), self.checkout("b"):
+            pass
+
+    def test_limit_waits_then_times_out(self):
+        with self.checkout("a"), self.checkout("a"):
+            self.assertRaises(PoolTimeoutError, self.checkout("a").__enter__)
+            # other servers have their own limit
+            with self.checkout("a", host="other"):
+                pass
+
+    def test_server_limits(self):
+        self.pool.server_limits = {"host": 1}
+        with self.checkout():
+            self.assertRaises(PoolTimeoutError, self.checkout().__enter__)
+
+    def test_waiter_gets_returned_connection(self):
+        self.pool.wait_timeout = None
+        got = []
+        with self.checkout() as a1, self.checkout():
+            thread = threading.Thread(target=self._checkout_into, args=(got,))
+            thread.start()
+            thread.join(0.05)
+            self.assertTrue(thread.is_alive())
+        thread.join(1)
+        self.assertIn(got[0], (a1, self.pool.created[1]))
+        self.assertEqual(len(self.pool.created), 2)
+
+    def _checkout_into(self, got):
+        with self.checkout() as client:
+            got.append(client)
+
+    def test_idle_connection_for_other_account_closed_to_make_room(self):
+        with self.checkout("a") as a:
+            pass
+        with self.checkout("b"), self.checkout("c"):
+            pass
+        a.logout.assert_called_once_with()
+        self.assertEqual(len(self.pool.created), 3)
+
+    def test_close(self):
+        with self.checkout("a") as a:
+            with self.checkout("b") as b:
+                pass
+            self.pool.close()
+            b.logout.assert_called_once_with()
+            a.logout.assert_not_called()
+        a.logout.assert_called_once_with()
+        self.assertRaises(IllegalStateError, self.checkout().__enter__)
+
+    def test_stream_rejected(self):
+        self.assertRaises(ValueError, IMAPClientPool, stream=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
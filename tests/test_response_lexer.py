@@ -4,6 +4,7 @@
 
 import unittest
 
+from imapclient.exceptions import ProtocolError
 from imapclient.response_lexer import TokenSource
 
 
@@ -66,6 +67,36 @@ class TestTokenSource(unittest.TestCase):
         self.check_error([b"["], message)
         self.check_error([b"[aaa bbb"], message)
 
+    def test_unmatched_square_brackets_after_atom(self):
+        self.check_error([b"aaa[bbb"], "No closing ']'")
+
+    def test_control_chars(self):
+        self.check([b"aaa\x01bbb"], [b"aaa", b"\x01", b"bbb"])
+
+    def test_quote_after_atom(self):
+        self.assertRaises(ProtocolError, lambda: list(TokenSource([b'aaa"bbb"'])))
+
+    def test_escaping_in_long_response(self):
+        self.check(
+            [b'* 1 FETCH (FLAGS (\\Seen) ENVELOPE ("a \\"b\\" c" NIL))'],
+            [
+                b"*",
+                b"1",
+                b"FETCH",
+                b"(",
+                b"FLAGS",
+                b"(",
+                b"\\Seen",
+                b")",
+                b"ENVELOPE",
+                b"(",
+                b'"a "b" c"',
+                b"NIL",
+                b")",
+                b")",
+            ],
+        )
+
     def test_literal(self):
         source = TokenSource([(b"abc {7}", b"foo bar"), b")"])
         tokens = iter(source)
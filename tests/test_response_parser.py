@@ -10,6 +10,7 @@ import unittest
 from datetime import datetime
 from unittest.mock import patch
 
+from imapclient import response_parser
 from imapclient.datetime_util import datetime_to_native
 from imapclient.exceptions import ProtocolError
 from imapclient.fixed_offset import FixedOffset
@@ -18,7 +19,13 @@ from imapclient.response_parser import (
     parse_message_list,
     parse_response,
 )
-from imapclient.response_types import Address, Envelope
+from imapclient.response_types import (
+    Address,
+    CompactSearchIds,
+    Envelope,
+    LazyBodyData,
+    LazyEnvelope,
+)
 
 # TODO: test invalid dates and times
 
@@ -221,6 +228,36 @@ class TestParseMessageList(unittest.TestCase):
         self.assertSequenceEqual(out, [1, 2, 3, 4])
         self.assertEqual(out.modseq, 9)
 
+    def test_unicode(self):
+        self.assertSequenceEqual(parse_message_list(["1 2 3"]), [1, 2, 3])
+
+    def test_trailing_space(self):
+        out = parse_message_list([b"1 2 3 "])
+        self.assertSequenceEqual(out, [1, 2, 3])
+        self.assertEqual(out.modseq, None)
+
+    def test_multiple_spaces(self):
+        self.assertSequenceEqual(parse_message_list([b"1  2 3"]), [1, 2, 3])
+
+    def test_trailing_atom(self):
+        out = parse_message_list([b"1 2 FOO 3"])
+        self.assertSequenceEqual(out, [1, 2, 3])
+
+    def test_invalid(self):
+        for data in [b"FOO", b" 1 2", b"-1 2", b"(modseq 1)"]:
+            self.assertRaises(ValueError, parse_message_list, [data])
+
+    def test_compact(self):
+        out = parse_message_list([b"1 2 3 (modseq 999)"], compact=True)
+        self.assertIsInstance(out, CompactSearchIds)
+        self.assertSequenceEqual(out, [1, 2, 3])
+        self.assertEqual(out.modseq, 999)
+
+    def test_compact_empty(self):
+        out = parse_message_list([None], compact=True)
+        self.assertIsInstance(out, CompactSearchIds)
+        self.assertEqual(out, [])
+
 
 class TestParseFetchResponse(unittest.TestCase):
     def test_basic(self):
@@ -302,6 +339,11 @@ class TestParseFetchResponse(unittest.TestCase):
             },
         )
 
+    def test_memoryview_literals_are_not_copied(self):
+        body = memoryview(b"Subject: test\r\n\r\nbody")
+        out = parse_fetch_response([(b"1 (BODY[] {21}", body), b")"])
+        self.assertIs(out[1][b"BODY[]"], body)
+
     def test_literals_and_keys_with_square_brackets(self):
         self.assertEqual(
             parse_fetch_response([(b"1 (BODY[TEXT] {11}", b"Hi there.\r\n"), b")"]),
@@ -530,6 +572,83 @@ class TestParseFetchResponse(unittest.TestCase):
             ),
         )
 
+    def test_ENVELOPE_address_parts_are_shared(self):
+        envelope_str = (
+            b"1 (ENVELOPE ( "
+            b'NIL "subject" '
+            b'(("a" NIL "someone" "example.com")) '
+            b"NIL NIL "
+            b'(("b" NIL "someone" "example.com")) '
+            b'NIL NIL NIL "<msg_id>"))'
+        )
+
+        envelope = parse_fetch_response([envelope_str])[1][b"ENVELOPE"]
+
+        from_, to = envelope.from_[0], envelope.to[0]
+        self.assertEqual(from_.name, b"a")
+        self.assertEqual(to.name, b"b")
+        self.assertIs(from_.mailbox, to.mailbox)
+        self.assertIs(from_.host, to.host)
+
+    def test_ENVELOPE_lazy(self):
+        envelope_str = (
+            b"1 (ENVELOPE ( "
+            b'"Sun, 24 Mar 2013 22:06:10 +0200" '
+            b'"subject" '
+            b'(("name" NIL "address1" "domain1.com")) '
+            b"NIL NIL NIL NIL NIL "
+            b'"<reply-to-id>" "<msg_id>"))'
+        )
+
+        with patch(
+            "imapclient.response_parser._convert_ENVELOPE",
+            wraps=response_parser._convert_ENVELOPE,
+        ) as convert:
+            output = parse_fetch_response(
+                [envelope_str], normalise_times=False, lazy=True
+            )
+            envelope = output[1][b"ENVELOPE"]
+            self.assertIsInstance(envelope, LazyEnvelope)
+            self.assertIsInstance(envelope, Envelope)
+            self.assertEqual(convert.call_count, 0)
+
+            self.assertEqual(envelope.subject, b"subject")
+            self.assertEqual(
+                envelope.from_, (Address(b"name", None, b"address1", b"domain1.com"),)
+            )
+            self.assertEqual(convert.call_count, 1)
+
+        self.assertEqual(
+            envelope,
+            Envelope(
+                datetime(2013, 3, 24, 22, 6, 10, tzinfo=FixedOffset(120)),
+                b"subject",
+                (Address(b"name", None, b"address1", b"domain1.com"),),
+                None,
+                None,
+                None,
+                None,
+                None,
+                b"<reply-to-id>",
+                b"<msg_id>",
+            ),
+        )
+        self.assertRaises(AttributeError, getattr, envelope, "nope")
+
+    def test_BODYSTRUCTURE_lazy(self):
+        text = (
+            b'1 (BODYSTRUCTURE (("text" "plain" ("charset" "us-ascii") NIL NIL '
+            b'"7bit" 10 1 NIL NIL NIL) "mixed" ("boundary" "xyz") NIL NIL NIL))'
+        )
+
+        body = parse_fetch_response([text], lazy=True)[1][b"BODYSTRUCTURE"]
+
+        self.assertIsInstance(body, LazyBodyData)
+        self.assertTrue(body.is_multipart)
+        self.assertEqual(body, parse_fetch_response([text])[1][b"BODYSTRUCTURE"])
+        self.assertFalse(body[0][0].is_multipart)
+        self.assertEqual(body[1], b"mixed")
+
     def test_ENVELOPE_with_no_date(self):
         envelope_str = (
             b"1 (ENVELOPE ( "
@@ -648,6 +767,24 @@ class TestParseFetchResponse(unittest.TestCase):
         )
         self.assertEqual(dt, expected_dt)
 
+    def test_INTERNALDATE_many(self):
+        out = parse_fetch_response(
+            [
+                b'1 (INTERNALDATE " 9-Feb-2007 17:08:08 -0430" UID 11)',
+                b'2 (UID 12 INTERNALDATE "wtf")',
+                b'3 (INTERNALDATE "10-Feb-2007 17:08:08 +0000" UID 13)',
+            ],
+            normalise_times=False,
+        )
+        self.assertEqual(
+            out[11][b"INTERNALDATE"],
+            datetime(2007, 2, 9, 17, 8, 8, 0, FixedOffset(-4 * 60 - 30)),
+        )
+        self.assertEqual(out[12][b"INTERNALDATE"], None)
+        self.assertEqual(
+            out[13][b"INTERNALDATE"], datetime(2007, 2, 10, 17, 8, 8, 0, FixedOffset(0))
+        )
+
     def test_INTERNALDATE_NIL(self):
         out = parse_fetch_response([b"1 (INTERNALDATE NIL)"])
         self.assertEqual(out[1][b"INTERNALDATE"], None)
@@ -0,0 +1,140 @@
+# Copyright (c) 2014, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+import imaplib
+import io
+import re
+import socket
+import unittest
+
+from imapclient.imap4 import IMAP4WithTimeout
+from imapclient.response_reader import ResponseReader
+
+RESPONSES = (
+    b"* 3 EXISTS\r\n"
+    b"* OK [UIDVALIDITY 1239278212] UIDs valid\r\n"
+    b"* 1 FETCH (UID 11 RFC822 {6}\r\nab\r\ncd BODY[HEADER] {2}\r\nxy)\r\n"
+    b"* 2 FETCH (UID 12 FLAGS (\\Seen))\r\n"
+    b'* LIST () "/" {3}\r\nfoo\r\n'
+    b"A1 OK [READ-WRITE] done\r\n"
+)
+
+
+def socket_with(data):
+    ours, theirs = socket.socketpair()
+    theirs.sendall(data)
+    theirs.close()
+    return ours
+
+
+def prepare(imap):
+    imap.debug = 0
+    imap._cmd_log_len = 10
+    imap._cmd_log_idx = 0
+    imap._cmd_log = {}
+    imap._encoding = "ascii"
+    imap._mode_ascii()
+    imap.tagre = re.compile(rb"(?P<tag>A\d+) (?P<type>[A-Z]+) (?P<data>.*)", re.ASCII)
+    imap.tagged_commands = {b"A1": None}
+    imap.untagged_responses = {}
+    imap.memoryview_literals = False
+    return imap
+
+
+class TestResponseReader(unittest.TestCase):
+    def reader(self, data, bufsize=8):
+        sock = socket_with(data)
+        self.addCleanup(sock.close)
+        return ResponseReader(sock, bufsize)
+
+    def test_lines(self):
+        reader = self.reader(b"first line\r\n\r\nsecond line that is long\r\nlast")
+        self.assertEqual(reader.read_line(), b"first line")
+        self.assertEqual(reader.read_line(), b"")
+        self.assertEqual(reader.readline(), b"second line that is long\r\n")
+        self.assertRaises(EOFError, reader.read_line)
+        self.assertEqual(reader.readline(), b"last")
+        self.assertEqual(reader.readline(), b"")
+
+    def test_buffer_shrinks_after_long_line(self):
+        reader = self.reader(b"x" * 40 + b"\r\nab\r\ncd\r\n")
+        self.assertEqual(reader.read_line(), b"x" * 40)
+        self.assertGreater(len(reader._buf), 8)
+        self.assertEqual(reader.read_line(), b"ab")
+        self.assertEqual(reader.read_line(), b"cd")
+        self.assertRaises(EOFError, reader.read_line)
+        self.assertEqual(len(reader._buf), 8)
+
+    def test_read(self):
+        reader = self.reader(b"0123456789abcdefghij", bufsize=4)
+        self.assertEqual(reader.read(2), b"01")
+        data = reader.read(2, as_memoryview=True)
+        self.assertIsInstance(data, memoryview)
+        self.assertEqual(data, b"23")
+        self.assertEqual(reader.read(10), b"456789abcd")
+        data = reader.read(10, as_memoryview=True)
+        self.assertEqual(data, b"efghij")
+
+    def test_read_response(self):
+        reader = self.reader(RESPONSES)
+        responses = [reader.read_response() for _ in range(6)]
+        self.assertEqual(
+            responses[2],
+            [
+                (b"* 1 FETCH (UID 11 RFC822 {6}", b"ab\r\ncd"),
+                (b" BODY[HEADER] {2}", b"xy"),
+                b")",
+            ],
+        )
+        self.assertEqual(responses[5], [b"A1 OK [READ-WRITE] done"])
+        self.assertRaises(EOFError, reader.read_response)
+
+    def test_brace_without_literal(self):
+        reader = self.reader(b"* OK {not a literal}\r\n")
+        self.assertEqual(reader.read_response(), [b"* OK {not a literal}"])
+
+
+class TestResponseReaderMixin(unittest.TestCase):
+    def test_same_as_imaplib(self):
+        stock = prepare(imaplib.IMAP4.__new__(imaplib.IMAP4))
+        stock.file = io.BytesIO(RESPONSES)
+        ours = prepare(IMAP4WithTimeout.__new__(IMAP4WithTimeout))
+        ours.sock = socket_with(RESPONSES)
+        self.addCleanup(ours.sock.close)
+
+        while stock.tagged_commands[b"A1"] is None:
+            self.assertEqual(stock._get_response(), ours._get_response())
+
+        self.assertEqual(ours.untagged_responses, stock.untagged_responses)
+        self.assertEqual(ours.tagged_commands, stock.tagged_commands)
+        self.assertEqual(
+            ours.untagged_responses["FETCH"][0], (b"1 (UID 11 RFC822 {6}", b"ab\r\ncd")
+        )
+
+    def test_continuation(self):
+        imap = prepare(IMAP4WithTimeout.__new__(IMAP4WithTimeout))
+        imap.sock = socket_with(b"+ go ahead\r\n")
+        self.addCleanup(imap.sock.close)
+        self.assertIsNone(imap._get_response())
+        self.assertEqual(imap.continuation_response, b"go ahead")
+
+    def test_eof(self):
+        imap = prepare(IMAP4WithTimeout.__new__(IMAP4WithTimeout))
+        imap.sock = socket_with(b"* 1 EXI")
+        self.addCleanup(imap.sock.close)
+        self.assertRaises(imaplib.IMAP4.abort, imap._get_response)
+
+    def test_new_socket_after_starttls(self):
+        imap = prepare(IMAP4WithTimeout.__new__(IMAP4WithTimeout))
+        imap.sock = socket_with(b"* 1 EXISTS\r\n")
+        self.addCleanup(imap.sock.close)
+        imap._get_response()
+        imap.sock = socket_with(b"* 2 EXISTS\r\n")
+        self.addCleanup(imap.sock.close)
+        imap._get_response()
+        self.assertEqual(imap.untagged_responses["EXISTS"], [b"1", b"2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
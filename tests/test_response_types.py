@@ -0,0 +1,125 @@
+# Copyright (c) 2014, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+import unittest
+
+from imapclient.response_types import Address, CompactSearchIds, Envelope
+
+
+class TestAddress(unittest.TestCase):
+    def test_slots(self):
+        addr = Address(b"Mary Smith", None, b"mary", b"foo.com")
+        self.assertFalse(hasattr(addr, "__dict__"))
+        self.assertRaises(AttributeError, setattr, addr, "other", 1)
+
+    def test_str(self):
+        self.assertEqual(
+            str(Address(b"Mary Smith", None, b"mary", b"foo.com")),
+            "Mary Smith <mary@foo.com>",
+        )
+        self.assertEqual(str(Address(None, None, b"group", None)), "group")
+
+    def test_equality(self):
+        self.assertEqual(
+            Address(b"name", None, b"mbox", b"host"),
+            Address(b"name", None, b"mbox", b"host"),
+        )
+        self.assertNotEqual(
+            Address(b"name", None, b"mbox", b"host"),
+            Address(b"name", None, b"mbox", b"other"),
+        )
+
+
+class TestEnvelope(unittest.TestCase):
+    def test_slots(self):
+        env = Envelope(None, b"subject", None, None, None, None, None, None, None, None)
+        self.assertFalse(hasattr(env, "__dict__"))
+        self.assertEqual(env.subject, b"subject")
+        env.subject = b"changed"
+        self.assertEqual(env.subject, b"changed")
+
+
+class TestCompactSearchIds(unittest.TestCase):
+    def test_sequence(self):
+        ids = CompactSearchIds([3, 5, 8])
+        self.assertEqual(len(ids), 3)
+        self.assertEqual(list(ids), [3, 5, 8])
+        self.assertEqual(list(reversed(ids)), [8, 5, 3])
+        self.assertEqual(ids[0], 3)
+        self.assertEqual(ids[-1], 8)
+        self.assertEqual(ids.index(5), 1)
+        self.assertEqual(ids.count(8), 1)
+        self.assertTrue(ids)
+        self.assertFalse(CompactSearchIds())
+
+    def test_slice(self):
+        ids = CompactSearchIds([3, 5, 8, 13])
+        ids.modseq = 10
+        out = ids[1:3]
+        self.assertIsInstance(out, CompactSearchIds)
+        self.assertEqual(out, [5, 8])
+        self.assertEqual(out.modseq, None)
+
+    def test_modseq(self):
+        ids = CompactSearchIds([1])
+        self.assertEqual(ids.modseq, None)
+        ids.modseq = 123
+        self.assertEqual(ids.modseq, 123)
+
+    def test_contains_ascending(self):
+        ids = CompactSearchIds(range(10, 1000, 10))
+        self.assertIn(10, ids)
+        self.assertIn(990, ids)
+        self.assertNotIn(15, ids)
+        self.assertNotIn(0, ids)
+        self.assertNotIn(1000, ids)
+        self.assertNotIn("10", ids)
+
+    def test_contains_unordered(self):
+        # eg. SORT results
+        ids = CompactSearchIds([9, 2, 7])
+        self.assertIn(2, ids)
+        self.assertIn(9, ids)
+        self.assertNotIn(3, ids)
+
+    def test_contains_after_append(self):
+        ids = CompactSearchIds([1, 2])
+        self.assertNotIn(0, ids)
+        ids.append(0)
+        self.assertIn(0, ids)
+        ids.extend([9, 10])
+        self.assertIn(9, ids)
+        self.assertEqual(ids, [1, 2, 0, 9, 10])
+
+    def test_equality(self):
+        ids = CompactSearchIds([1, 2, 3])
+        self.assertEqual(ids, [1, 2, 3])
+        self.assertEqual([1, 2, 3], ids)
+        self.assertEqual(ids, CompactSearchIds([1, 2, 3]))
+        self.assertNotEqual(ids, [1, 2])
+        self.assertNotEqual(ids, [3, 2, 1])
+        self.assertNotEqual(ids, (1, 2, 3))
+
+    def test_set_operations(self):
+        a = CompactSearchIds([1, 2, 3, 4, 5])
+        b = CompactSearchIds([2, 4, 6])
+        self.assertEqual(a.intersection(b), [2, 4])
+        self.assertEqual(a & b, [2, 4])
+        self.assertEqual(a.difference(b), [1, 3, 5])
+        self.assertEqual(a - [1, 5], [2, 3, 4])
+        self.assertEqual(a.union(b), [1, 2, 3, 4, 5, 6])
+        self.assertEqual(a | {7}, [1, 2, 3, 4, 5, 7])
+        self.assertIsInstance(a & b, CompactSearchIds)
+
+    def test_set_operations_keep_order(self):
+        a = CompactSearchIds([5, 1, 4, 2])
+        self.assertEqual(a & [1, 2, 5], [5, 1, 2])
+        self.assertEqual(a - [4], [5, 1, 2])
+
+    def test_large_ids(self):
+        ids = CompactSearchIds([4294967295])
+        self.assertEqual(ids, [4294967295])
+
+    def test_repr(self):
+        self.assertEqual(repr(CompactSearchIds([1, 2])), "CompactSearchIds([1, 2])")
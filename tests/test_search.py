@@ -6,8 +6,9 @@ import imaplib
 from datetime import date, datetime
 from unittest.mock import Mock
 
-from imapclient.exceptions import InvalidCriteriaError
+from imapclient.exceptions import CapabilityError, InvalidCriteriaError
 from imapclient.imapclient import _quoted
+from imapclient.response_types import CompactSearchIds
 
 from .imapclient_test import IMAPClientTest
 
@@ -82,6 +83,16 @@ class TestSearch(TestSearchBase):
         self.assertEqual(result, [1, 2])
         self.assertEqual(result.modseq, 51101)
 
+    def test_compact(self):
+        self.client._raw_command_untagged.return_value = [b"1 2 (MODSEQ 51101)"]
+
+        result = self.client.search(["MODSEQ", "40000"], compact=True)
+
+        self.check_call([b"MODSEQ", b"40000"])
+        self.assertIsInstance(result, CompactSearchIds)
+        self.assertEqual(result, [1, 2])
+        self.assertEqual(result.modseq, 51101)
+
     def test_nested_empty(self):
         self.assertRaises(InvalidCriteriaError, self.client.search, [[]])
 
@@ -162,3 +173,89 @@ class TestGmailSearch(TestSearchBase):
         self.check_call(
             [b"CHARSET", b"utf-8", b"X-GM-RAW", _quoted(b'"foo \xe2\x98\xb9"')]
         )
+
+
+class TestESearch(IMAPClientTest):
+    def setUp(self):
+        super(TestESearch, self).setUp()
+        self.client._cached_capabilities = [b"ESEARCH"]
+        self.client._raw_command_untagged = Mock()
+        self.client._raw_command_untagged.return_value = [
+            b'(TAG "A282") UID MIN 2 MAX 2000 COUNT 6 ALL 2,10:13,2000'
+        ]
+
+    def check_call(self, expected_args):
+        self.client._raw_command_untagged.assert_called_once_with(
+            b"SEARCH", expected_args, response_name="ESEARCH"
+        )
+
+    def test_defaults(self):
+        result = self.client.esearch()
+
+        self.check_call([b"RETURN", b"(MIN MAX COUNT ALL)", b"ALL"])
+        self.assertEqual(
+            result,
+            {b"MIN": 2, b"MAX": 2000, b"COUNT": 6, b"ALL": b"2,10:13,2000"},
+        )
+
+    def test_criteria_and_charset(self):
+        self.client._raw_command_untagged.return_value = [b'(TAG "A1") UID COUNT 3']
+
+        result = self.client.esearch(["SUBJECT", "foo bar"], "utf-8", return_=["count"])
+
+        self.check_call(
+            [
+                b"RETURN",
+                b"(COUNT)",
+                b"CHARSET",
+                b"utf-8",
+                b"SUBJECT",
+                _quoted(b'"foo bar"'),
+            ]
+        )
+        self.assertEqual(result, {b"COUNT": 3})
+
+    def test_no_matches(self):
+        self.client._raw_command_untagged.return_value = [b'(TAG "A1") UID COUNT 0']
+        self.assertEqual(self.client.esearch(["UNSEEN"]), {b"COUNT": 0})
+
+        self.client._raw_command_untagged.return_value = [None]
+        self.assertEqual(self.client.esearch(["UNSEEN"]), {})
+
+    def test_single_id_all(self):
+        self.client._raw_command_untagged.return_value = [
+            b'(TAG "A1") ALL 7 MODSEQ 917162500'
+        ]
+        self.assertEqual(
+            self.client.esearch(return_=["ALL"]),
+            {b"ALL": b"7", b"MODSEQ": 917162500},
+        )
+
+    def test_invalid_criteria(self):
+        self.client._raw_command_untagged.side_effect = imaplib.IMAP4.error(
+            'SEARCH command error: BAD ["Unknown argument TOO"]'
+        )
+        with self.assertRaises(InvalidCriteriaError):
+            self.client.esearch("TOO")
+
+    def test_requires_capability(self):
+        self.client._cached_capabilities = [b"IMAP4REV1"]
+        self.assertRaises(CapabilityError, self.client.esearch)
+
+
+class TestSearchSave(TestSearchBase):
+    def setUp(self):
+        super(TestSearchSave, self).setUp()
+        self.client._cached_capabilities = [b"SEARCHRES"]
+        self.client._raw_command_untagged.return_value = [None]
+
+    def test_save(self):
+        result = self.client.search(["UNSEEN"], "utf-8", save=True)
+
+        self.check_call([b"RETURN", b"(SAVE)", b"CHARSET", b"utf-8", b"UNSEEN"])
+        self.assertIsNone(result)
+
+    def test_requires_capability(self):
+        self.client._cached_capabilities = [b"IMAP4REV1"]
+        self.assertRaises(CapabilityError, self.client.search, "UNSEEN", save=True)
+        self.assertFalse(self.client._raw_command_untagged.called)
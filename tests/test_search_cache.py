@@ -0,0 +1,109 @@
+# Copyright (c) 2014, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+import unittest
+from datetime import date, datetime
+
+from imapclient.fixed_offset import FixedOffset
+from imapclient.search_cache import SearchCache
+
+from .test_local_index import IndexClient
+
+
+class SearchClient(IndexClient):
+    """Also answers TEXT searches, from a body held per message."""
+
+    def __init__(self, capabilities=()):
+        super().__init__(capabilities)
+        self.bodies = {}
+        self._selected_folder = None
+
+    def select_folder(self, folder, readonly=False):
+        out = super().select_folder(folder, readonly)
+        self._selected_folder = folder, self.uidvalidity
+        return out
+
+    def search(self, criteria, charset=None):
+        self.commands.append(("SEARCH", criteria))
+        if criteria == "ALL":
+            return sorted(self.messages)
+        assert criteria[0] == "TEXT" and len(criteria) == 2, criteria
+        return sorted(uid for uid, body in self.bodies.items() if criteria[1] in body)
+
+
+class TestSearchCache(unittest.TestCase):
+    def setUp(self):
+        self.client = SearchClient(("ENABLE", "CONDSTORE", "QRESYNC"))
+        self.client.add(1, (b"\\Seen",), internaldate=datetime(2020, 1, 1))
+        self.client.add(2, (), internaldate=datetime(2020, 1, 2))
+        self.client.add(3, (), internaldate=datetime(2020, 1, 3))
+        self.client.bodies = {1: "lunch", 2: "meeting", 3: "lunch meeting"}
+        self.cache = SearchCache(self.client, fetch_items=["FLAGS", "INTERNALDATE"])
+        self.cache.refresh("INBOX")
+        self.client.commands = []
+
+    def test_evaluated_locally(self):
+        self.assertEqual(self.cache.search("INBOX", ["UNSEEN"]), [2, 3])
+        self.assertEqual(
+            self.cache.search("INBOX", ["SINCE", date(2020, 1, 2), "SEEN"]), []
+        )
+        self.assertEqual(self.client.commands, [])
+
+    def test_unsupported_parts_sent_to_server(self):
+        result = self.cache.search("INBOX", ["UNSEEN", "TEXT", "lunch"])
+
+        self.assertEqual(result, [3])
+        self.assertEqual(self.client.commands, [("SEARCH", ["TEXT", "lunch"])])
+
+    def test_uncached_fields_sent_to_server(self):
+        self.client.search = lambda criteria, charset=None: [2]
+
+        self.assertEqual(self.cache.search("INBOX", ["FROM", "bob", "UNSEEN"]), [2])
+
+    def test_whole_search_sent_to_server(self):
+        result = self.cache.search("INBOX", ["TEXT", "meeting"])
+
+        self.assertEqual(result, [2, 3])
+        self.assertEqual(self.client.commands, [("SEARCH", ["TEXT", "meeting"])])
+
+    def test_server_search_selects_folder(self):
+        self.client._selected_folder = ("Other", 1)
+
+        self.cache.search("INBOX", ["TEXT", "meeting"])
+
+        self.assertEqual(self.client.commands[0], ("SELECT", "INBOX", True))
+
+    def test_dates_compared_in_their_own_time_zone(self):
+        late = datetime(2020, 3, 1, 23, 30, tzinfo=FixedOffset(-10 * 60))
+        self.client.add(4, internaldate=late)
+        self.cache.refresh("INBOX")
+
+        self.assertEqual(self.cache.search("INBOX", ["ON", date(2020, 3, 1)]), [4])
+        self.assertTrue(self.client.normalise_times)
+
+    def test_refresh(self):
+        self.client.set_flags(2, (b"\\Seen",))
+        self.client.add(4)
+        self.client.expunge(3)
+
+        self.cache.refresh("INBOX")
+
+        self.assertEqual(self.cache.search("INBOX", "UNSEEN"), [4])
+        self.assertEqual(sorted(self.cache.messages("INBOX")), [1, 2, 4])
+
+    def test_refreshed_when_server_returns_unknown_uids(self):
+        self.client.add(4)
+        self.client.bodies[4] = "lunch"
+
+        self.assertEqual(
+            self.cache.search("INBOX", ["UNSEEN", "TEXT", "lunch"]), [3, 4]
+        )
+
+    def test_first_search_syncs_folder(self):
+        cache = SearchCache(self.client, fetch_items=["FLAGS"])
+        self.assertEqual(cache.search("INBOX", "SEEN"), [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
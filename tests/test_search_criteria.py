@@ -0,0 +1,182 @@
+# Copyright (c) 2014, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+import unittest
+from datetime import date, datetime
+
+from imapclient.exceptions import InvalidCriteriaError, UnsupportedCriteriaError
+from imapclient.response_types import Address, Envelope
+from imapclient.search_criteria import (
+    And,
+    compile_criteria,
+    Not,
+    Or,
+    parse_criteria,
+    SearchKey,
+    to_criteria,
+)
+
+
+class TestParseCriteria(unittest.TestCase):
+    def test_list(self):
+        self.assertEqual(
+            parse_criteria(
+                ["UNSEEN", "FROM", "foo bar", "SINCE", datetime(2020, 3, 4, 5, 6)]
+            ),
+            And(
+                (
+                    SearchKey("UNSEEN"),
+                    SearchKey("FROM", ("foo bar",)),
+                    SearchKey("SINCE", (date(2020, 3, 4),)),
+                )
+            ),
+        )
+
+    def test_string(self):
+        self.assertEqual(
+            parse_criteria('NOT (SEEN SUBJECT "a b") smaller 500'),
+            And(
+                (
+                    Not(And((SearchKey("SEEN"), SearchKey("SUBJECT", ("a b",))))),
+                    SearchKey("SMALLER", (500,)),
+                )
+            ),
+        )
+
+    def test_or_and_nesting(self):
+        self.assertEqual(
+            parse_criteria(["OR", ["FLAGGED", "DRAFT"], "SENTON", "03-Apr-2005"]),
+            Or(
+                And((SearchKey("FLAGGED"), SearchKey("DRAFT"))),
+                SearchKey("SENTON", (date(2005, 4, 3),)),
+            ),
+        )
+
+    def test_sequence_sets(self):
+        self.assertEqual(
+            parse_criteria("UID 1,3:5,9:*"),
+            SearchKey("UID", ([(1, 1), (3, 5), (9, None)],)),
+        )
+        self.assertEqual(parse_criteria(["UID", 7]), SearchKey("UID", ([(7, 7)],)))
+        self.assertEqual(
+            parse_criteria("*:4,*"), SearchKey("SEQUENCE", ([(4, None), (None, None)],))
+        )
+
+    def test_header(self):
+        self.assertEqual(
+            parse_criteria(["HEADER", "Message-Id", "<x@y>"]),
+            SearchKey("HEADER", ("MESSAGE-ID", "<x@y>")),
+        )
+
+    def test_invalid(self):
+        self.assertRaises(InvalidCriteriaError, parse_criteria, [])
+        self.assertRaises(InvalidCriteriaError, parse_criteria, ["FROM"])
+        self.assertRaises(InvalidCriteriaError, parse_criteria, ["SINCE", "yesterday"])
+        self.assertRaises(InvalidCriteriaError, parse_criteria, ["LARGER", "big"])
+
+    def test_unsupported(self):
+        self.assertRaises(UnsupportedCriteriaError, parse_criteria, ["MODSEQ", 5])
+
+
+MESSAGES = {
+    1: {
+        b"FLAGS": (b"\\Seen", b"$Work"),
+        b"INTERNALDATE": datetime(2020, 1, 1, 10, 0),
+        b"RFC822.SIZE": 500,
+        b"ENVELOPE": Envelope(
+            datetime(2019, 12, 31),
+            b"=?utf-8?q?Caf=C3=A9?=",
+            (Address(b"Alice", None, b"alice", b"example.com"),),
+            None,
+            None,
+            None,
+            None,
+            None,
+            None,
+            None,
+        ),
+    },
+    2: {
+        b"FLAGS": (b"\\Recent",),
+        b"INTERNALDATE": datetime(2020, 1, 2, 10, 0),
+        b"RFC822.SIZE": 5000,
+        b"ENVELOPE": Envelope(
+            None, None, None, None, None, None, None, None, None, None
+        ),
+    },
+    5: {
+        b"FLAGS": (b"\\Flagged",),
+        b"INTERNALDATE": datetime(2020, 1, 3, 10, 0),
+        b"RFC822.SIZE": 50,
+        b"ENVELOPE": Envelope(
+            None, b"Hello", None, None, None, None, None, None, None, None
+        ),
+    },
+}
+
+
+class TestCompileCriteria(unittest.TestCase):
+    def search(self, criteria):
+        return compile_criteria(criteria).search(MESSAGES)
+
+    def test_flags(self):
+        self.assertEqual(self.search("UNSEEN"), [2, 5])
+        self.assertEqual(self.search(["KEYWORD", "$work"]), [1])
+        self.assertEqual(self.search("NEW"), [2])
+        self.assertEqual(self.search("OLD"), [1, 5])
+        self.assertEqual(self.search(["UNFLAGGED", "UNKEYWORD", "$Work"]), [2])
+
+    def test_dates_and_sizes(self):
+        self.assertEqual(self.search(["SINCE", date(2020, 1, 2)]), [2, 5])
+        self.assertEqual(self.search("BEFORE 02-Jan-2020"), [1])
+        self.assertEqual(self.search(["ON", date(2020, 1, 3)]), [5])
+        self.assertEqual(self.search(["SENTBEFORE", date(2020, 1, 1)]), [1])
+        self.assertEqual(self.search("LARGER 100 SMALLER 1000"), [1])
+
+    def test_envelope(self):
+        self.assertEqual(self.search(["FROM", "ALICE@"]), [1])
+        self.assertEqual(self.search(["SUBJECT", "café"]), [1])
+        self.assertEqual(self.search(["NOT", "SUBJECT", "hello"]), [1, 2])
+
+    def test_uid(self):
+        self.assertEqual(self.search("UID 2:*"), [2, 5])
+        self.assertEqual(self.search("UID *"), [5])
+        self.assertEqual(self.search(["OR", "UID", "1", "FLAGGED"]), [1, 5])
+
+    def test_fields(self):
+        self.assertEqual(
+            compile_criteria(["UNSEEN", "LARGER", 5]).fields, {b"FLAGS", b"RFC822.SIZE"}
+        )
+        self.assertRaises(
+            UnsupportedCriteriaError,
+            compile_criteria,
+            ["FROM", "x"],
+            fields=["FLAGS", "INTERNALDATE"],
+        )
+
+    def test_unsupported(self):
+        for criteria in (["TEXT", "x"], ["BODY", "x"], ["HEADER", "X-Foo", "y"], "1:3"):
+            self.assertRaises(UnsupportedCriteriaError, compile_criteria, criteria)
+
+
+class TestToCriteria(unittest.TestCase):
+    def test_round_trip(self):
+        criteria = [
+            "NOT",
+            ["OR", "SEEN", ["FROM", "x y"]],
+            "UID",
+            "1,3:*",
+            "SINCE",
+            date(2020, 1, 2),
+            "HEADER",
+            "X-FOO",
+            "bar",
+        ]
+        node = parse_criteria(criteria)
+        self.assertEqual(to_criteria(node), criteria)
+        self.assertEqual(parse_criteria(to_criteria(node)), node)
+
+
+if __name__ == "__main__":
+    unittest.main()
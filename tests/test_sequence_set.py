@@ -0,0 +1,63 @@
+# Copyright (c) 2014, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+import unittest
+
+from imapclient.sequence_set import decode, encode, parse_ranges, ranges
+
+
+class TestRanges(unittest.TestCase):
+    def test_empty(self):
+        self.assertEqual(list(ranges([])), [])
+
+    def test_single(self):
+        self.assertEqual(list(ranges([5])), [(5, 5)])
+
+    def test_runs(self):
+        self.assertEqual(
+            list(ranges([9, 1, 2, 3, 5, 6, 3, 11])),
+            [(1, 3), (5, 6), (9, 9), (11, 11)],
+        )
+
+
+class TestEncode(unittest.TestCase):
+    def test_empty(self):
+        self.assertEqual(encode([]), b"")
+
+    def test_single(self):
+        self.assertEqual(encode([42]), b"42")
+
+    def test_no_runs(self):
+        self.assertEqual(encode([5, 1, 3]), b"1,3,5")
+
+    def test_runs(self):
+        self.assertEqual(encode(range(1, 1001)), b"1:1000")
+        self.assertEqual(encode([1, 2, 3, 7, 9, 10, 2]), b"1:3,7,9:10")
+
+
+class TestDecode(unittest.TestCase):
+    def test_single(self):
+        self.assertEqual(decode(b"42"), [42])
+
+    def test_ranges(self):
+        self.assertEqual(decode(b"1:3,7,9:10"), [1, 2, 3, 7, 9, 10])
+
+    def test_unicode(self):
+        self.assertEqual(decode("1:3"), [1, 2, 3])
+
+    def test_descending_range(self):
+        self.assertEqual(parse_ranges(b"5:3"), [(3, 5)])
+        self.assertEqual(decode(b"5:3"), [3, 4, 5])
+
+    def test_star(self):
+        self.assertRaises(ValueError, decode, b"1:*")
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, decode, b"")
+        self.assertRaises(ValueError, decode, b"1,,2")
+        self.assertRaises(ValueError, decode, b"abc")
+
+    def test_roundtrip(self):
+        ids = [1, 2, 3, 10, 20, 21, 22, 100]
+        self.assertEqual(decode(encode(ids)), ids)
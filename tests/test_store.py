@@ -58,7 +58,7 @@ class TestFlags(IMAPClientTest):
             b"22 (UID 2 OTHER (care))",
         ]
         resp = meth([1, 2], "foo", silent=silent)
-        cc.assert_called_once_with("store", b"1,2", expected_command, "(foo)", uid=True)
+        cc.assert_called_once_with("store", b"1:2", expected_command, "(foo)", uid=True)
         if silent:
             self.assertIsNone(resp)
         else:
@@ -118,7 +118,7 @@ class TestGmailLabels(IMAPClientTest):
         ]
         resp = meth([1, 2], 'f"o"o', silent=silent)
         cc.assert_called_once_with(
-            "store", b"1,2", expected_command, '("f\\"o\\"o")', uid=True
+            "store", b"1:2", expected_command, '("f\\"o\\"o")', uid=True
         )
         if silent:
             self.assertIsNone(resp)
@@ -0,0 +1,212 @@
+# Copyright (c) 2014, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+import unittest
+from unittest.mock import Mock
+
+from imapclient.sync import _parse_vanished, FolderState, FolderSync
+
+
+class FakeClient:
+    """Serves a folder held as {uid: (flags, modseq)}."""
+
+    use_uid = True
+    normalise_times = True
+
+    def __init__(self, capabilities=()):
+        self.capabilities = {c.encode("ascii") for c in capabilities}
+        self.messages = {}
+        self.uidvalidity = 1
+        self.modseq = 1
+        self.expunged = []
+        self.commands = []
+        self._imap = Mock(state="AUTH", untagged_responses={})
+
+    def add(self, uid, flags=()):
+        self.modseq += 1
+        self.messages[uid] = (flags, self.modseq)
+
+    def set_flags(self, uid, flags):
+        self.modseq += 1
+        self.messages[uid] = (flags, self.modseq)
+
+    def expunge(self, uid):
+        self.modseq += 1
+        del self.messages[uid]
+        self.expunged.append(uid)
+
+    def has_capability(self, capability):
+        return capability.encode("ascii") in self.capabilities
+
+    def enable(self, *capabilities):
+        self.commands.append(("ENABLE",) + capabilities)
+        return [c.encode("ascii") for c in capabilities]
+
+    def select_folder(self, folder, readonly=False):
+        self.commands.append(("SELECT", folder, readonly))
+        self._imap.state = "SELECTED"
+        out = {b"EXISTS": len(self.messages), b"UIDVALIDITY": self.uidvalidity}
+        if b"CONDSTORE" in self.capabilities:
+            out[b"HIGHESTMODSEQ"] = self.modseq
+        return out
+
+    def search(self, criteria):
+        self.commands.append(("SEARCH", criteria))
+        return sorted(self.messages)
+
+    def fetch(self, messages, data, modifiers=None):
+        self.commands.append(("FETCH", messages, data, modifiers))
+        since = int(modifiers[0].split()[1])
+        if "VANISHED" in modifiers:
+            self._imap.untagged_responses["VANISHED"] = [
+                b"(EARLIER) " + b",".join(b"%d" % uid for uid in self.expunged)
+            ]
+        return {
+            uid: {b"FLAGS": flags, b"MODSEQ": (modseq,)}
+            for uid, (flags, modseq) in self.messages.items()
+            if modseq > since
+        }
+
+    def fetch_batched(self, messages, data):
+        self.commands.append(("FETCH_BATCHED", list(messages), data))
+        out = {}
+        for uid in messages:
+            out[uid] = {b"FLAGS": self.messages[uid][0]}
+            if "ENVELOPE" in data:
+                out[uid][b"ENVELOPE"] = b"envelope %d" % uid
+        return out
+
+
+class SyncTests:
+    capabilities = ()
+
+    def setUp(self):
+        self.client = FakeClient(self.capabilities)
+        for uid in (1, 2, 3):
+            self.client.add(uid)
+        self.store = {}
+        self.sync = FolderSync(self.client, self.store)
+        first = self.sync.sync("INBOX")
+        self.assertTrue(first.reset)
+        self.assertEqual(sorted(first.new), [1, 2, 3])
+        self.client.commands = []
+
+    def test_no_changes(self):
+        result = self.sync.sync("INBOX")
+
+        self.assertFalse(result.reset)
+        self.assertEqual((result.new, result.changed, result.vanished), ({}, {}, []))
+
+    def test_changes(self):
+        self.client.add(4, (b"\\Seen",))
+        self.client.set_flags(2, (b"\\Flagged",))
+        self.client.expunge(3)
+
+        result = self.sync.sync("INBOX")
+
+        self.assertEqual(list(result.new), [4])
+        self.assertEqual(result.new[4][b"FLAGS"], (b"\\Seen",))
+        self.assertEqual(list(result.changed), [2])
+        self.assertEqual(result.changed[2][b"FLAGS"], (b"\\Flagged",))
+        self.assertEqual(result.vanished, [3])
+        self.assertEqual(self.store["INBOX"].uids, {1, 2, 4})
+
+    def test_uidvalidity_change(self):
+        self.client.uidvalidity = 2
+
+        result = self.sync.sync("INBOX")
+
+        self.assertTrue(result.reset)
+        self.assertEqual(sorted(result.new), [1, 2, 3])
+
+
+class TestQResync(SyncTests, unittest.TestCase):
+    capabilities = ("ENABLE", "CONDSTORE", "QRESYNC")
+
+    def test_enabled_once(self):
+        self.sync.sync("INBOX")
+        self.assertEqual(self.client.commands, [("SELECT", "INBOX", True)])
+
+    def test_single_fetch_for_changes(self):
+        self.client.set_flags(2, (b"\\Flagged",))
+        self.client.expunge(3)
+
+        self.sync.sync("INBOX")
+
+        self.assertEqual(
+            self.client.commands,
+            [
+                ("SELECT", "INBOX", True),
+                ("FETCH", "1:*", ["FLAGS"], ["CHANGEDSINCE 4", "VANISHED"]),
+            ],
+        )
+
+
+class TestCondstore(SyncTests, unittest.TestCase):
+    capabilities = ("ENABLE", "CONDSTORE")
+
+    def test_search_only_after_expunge(self):
+        self.client.set_flags(2, (b"\\Flagged",))
+        self.sync.sync("INBOX")
+        self.assertNotIn(("SEARCH", "ALL"), self.client.commands)
+
+        self.client.expunge(3)
+        self.sync.sync("INBOX")
+        self.assertIn(("SEARCH", "ALL"), self.client.commands)
+
+
+class TestUidDiff(SyncTests, unittest.TestCase):
+    def test_flags_kept(self):
+        self.assertEqual(self.store["INBOX"].flags, {1: (), 2: (), 3: ()})
+        self.assertIsNone(self.store["INBOX"].highestmodseq)
+
+
+class TestFolderSync(unittest.TestCase):
+    def test_requires_uids(self):
+        client = FakeClient()
+        client.use_uid = False
+        self.assertRaises(ValueError, FolderSync, client)
+
+    def test_fetch_items_for_new_messages(self):
+        client = FakeClient(("ENABLE", "CONDSTORE", "QRESYNC"))
+        client.add(1)
+        sync = FolderSync(client, fetch_items=["ENVELOPE"])
+        sync.sync("INBOX")
+        client.add(2)
+
+        result = sync.sync("INBOX")
+
+        self.assertEqual(result.new, {2: {b"FLAGS": (), b"ENVELOPE": b"envelope 2"}})
+        self.assertEqual(
+            client.commands[-1], ("FETCH_BATCHED", [2], ["ENVELOPE", "FLAGS"])
+        )
+
+    def test_not_enabled_after_select(self):
+        client = FakeClient(("ENABLE", "CONDSTORE", "QRESYNC"))
+        client._imap.state = "SELECTED"
+        FolderSync(client).sync("INBOX")
+        self.assertNotIn("ENABLE", [c[0] for c in client.commands])
+
+    def test_persisted_state(self):
+        store = {"INBOX": FolderState(1, None, {1}, {1: ()})}
+        client = FakeClient()
+        client.add(1)
+        client.add(2)
+
+        result = FolderSync(client, store).sync("INBOX")
+
+        self.assertFalse(result.reset)
+        self.assertEqual(list(result.new), [2])
+
+
+class TestParseVanished(unittest.TestCase):
+    def test_earlier(self):
+        self.assertEqual(_parse_vanished([b"(EARLIER) 1:3,7", b"9"]), [1, 2, 3, 7, 9])
+
+    def test_empty(self):
+        self.assertEqual(_parse_vanished([b"(EARLIER) "]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -105,13 +105,16 @@ class Test_join_message_ids(unittest.TestCase):
         self.check(b"2:*", b"2:*")
 
     def test_tuple(self):
-        self.check((123, 99), b"123,99")
+        self.check((123, 99), b"99,123")
 
     def test_mixed_list(self):
         self.check(["2:3", 123, b"44"], b"2:3,123,44")
 
     def test_iter(self):
-        self.check(iter([123, 99]), b"123,99")
+        self.check(iter([123, 99]), b"99,123")
+
+    def test_ranges(self):
+        self.check([7, 3, 1, 2, 3, 4, 10, 9], b"1:4,7,9:10")
 
 
 class Test_normalise_search_criteria(unittest.TestCase):